@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+AES-CBC vs AES-GCM round-trip benchmark for the Wi-Fi Password Manager
+
+Times encrypting and decrypting vault-sized payloads with the legacy
+CBC functions and the authenticated GCM functions.
+"""
+
+import sys
+import os
+import time
+import argparse
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from Crypto.Random import get_random_bytes
+from encryption import encrypt_bytes, decrypt_bytes, aead_encrypt, aead_decrypt
+
+SIZES = [1 << 10, 16 << 10, 256 << 10, 1 << 20, 16 << 20]
+
+CIPHERS = {
+    "aes-256-cbc": (encrypt_bytes, decrypt_bytes),
+    "aes-256-gcm": (aead_encrypt, aead_decrypt),
+}
+
+def time_round_trip(encrypt, decrypt, payload, key, min_time):
+    """Return the average seconds per encrypt+decrypt round trip"""
+    rounds = 0
+    start = time.perf_counter()
+    while True:
+        decrypt(encrypt(payload, key), key)
+        rounds += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / rounds
+
+def run(min_time):
+    """Run the benchmark across every payload size"""
+    key = get_random_bytes(32)
+    print(f"{'size':>10} " + " ".join(f"{name:>24}" for name in CIPHERS))
+    for size in SIZES:
+        payload = get_random_bytes(size)
+        cells = []
+        for encrypt, decrypt in CIPHERS.values():
+            seconds = time_round_trip(encrypt, decrypt, payload, key, min_time)
+            cells.append(f"{seconds * 1e3:9.3f} ms {size / seconds / 1e6:8.1f} MB/s")
+        print(f"{size:>10} " + " ".join(f"{cell:>24}" for cell in cells))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--min-time", type=float, default=0.5,
+                        help="seconds to spend per measurement (default: 0.5)")
+    args = parser.parse_args()
+    run(args.min_time)
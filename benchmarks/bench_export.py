@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Export throughput benchmark for the Wi-Fi Password Manager
+
+Builds a synthetic vault and times a streaming export in each format,
+writing to a sink that discards its input.
+"""
+
+import sys
+import os
+import time
+import argparse
+import tempfile
+import shutil
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from database import DatabaseManager
+from exporter import EXPORT_FORMATS, export_wifi
+
+class NullWriter:
+    """Text sink that counts characters instead of keeping them"""
+    
+    def __init__(self):
+        self.size = 0
+    
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
+
+def build_vault(db, count):
+    """Fill the database with synthetic networks in one batch"""
+    db.add_many({"ssid": f"Site-{i:06d}", "password": f"password-{i:06d}", "security": "WPA2"}
+                for i in range(count))
+
+def run(count):
+    """Run the export benchmark on a vault of the given size"""
+    test_dir = tempfile.mkdtemp()
+    original_cwd = os.getcwd()
+    os.chdir(test_dir)
+    try:
+        db = DatabaseManager()
+        db.initialize_database("benchmark-password")
+        
+        start = time.perf_counter()
+        build_vault(db, count)
+        print(f"Built {count} record vault in {time.perf_counter() - start:.2f}s")
+        
+        for fmt in EXPORT_FORMATS:
+            sink = NullWriter()
+            start = time.perf_counter()
+            written = export_wifi(db, sink, fmt)
+            elapsed = time.perf_counter() - start
+            print(f"{fmt:>15}: {written / elapsed:10.0f} records/s "
+                  f"({elapsed:.2f}s, {sink.size / 1e6:.1f} MB)")
+    finally:
+        os.chdir(original_cwd)
+        shutil.rmtree(test_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=100000, help="vault size (default: 100000)")
+    args = parser.parse_args()
+    run(args.records)
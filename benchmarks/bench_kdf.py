@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Key derivation backend benchmark for the Wi-Fi Password Manager
+
+Times one unlock's worth of key derivation with every backend of each
+function and reports the saving of the backend get_kdf_backend chooses
+over pycryptodome, which derived every key before backends existed.
+"""
+
+import sys
+import os
+import argparse
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import timeit
+from encryption import (DEFAULT_KDF_PARAMS, KDF_BACKENDS, derive_key,
+                        get_kdf_backend, set_kdf_backend)
+
+SCRYPT_PARAMS = {'name': 'scrypt', 'n': 2 ** 15, 'r': 8, 'p': 1}
+
+def time_backend(name, backend, params, repeat):
+    """Return the best seconds per derive_key call with one backend"""
+    set_kdf_backend(name, backend)
+    salt = os.urandom(16)
+    return min(timeit.repeat(lambda: derive_key("benchmark password", salt, params),
+                             number=1, repeat=repeat))
+
+def run(repeat):
+    """Run the benchmark for every key derivation function"""
+    for name, params in (('pbkdf2-sha1', DEFAULT_KDF_PARAMS), ('scrypt', SCRYPT_PARAMS)):
+        chosen = get_kdf_backend(name)
+        timings = {backend: time_backend(name, backend, params, repeat)
+                   for backend in KDF_BACKENDS[name]}
+        set_kdf_backend(name, chosen)
+        
+        print(f"{name} {params}")
+        for backend, seconds in timings.items():
+            marker = " (chosen)" if backend == chosen else ""
+            print(f"  {backend:>14}: {seconds * 1e3:9.2f} ms per unlock{marker}")
+        saving = timings['pycryptodome'] - timings[chosen]
+        print(f"  {'saving':>14}: {saving * 1e3:9.2f} ms per unlock "
+              f"({saving / timings['pycryptodome'] * 100:.1f}%)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="derivations per backend, best one is kept (default: 5)")
+    args = parser.parse_args()
+    run(args.repeat)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Legacy vault migration benchmark for the Wi-Fi Password Manager
+
+Builds a synthetic legacy vault (one base64 AES-CBC snapshot line and a
+master key file, as written by the original version) and times
+migrate_legacy_vault converting it into a vault container. The migration
+and the vault build each run in a fresh interpreter, so the reported peak
+resident memory is the migration's own.
+
+    python benchmarks/bench_migrate.py --records 1000000
+"""
+
+import sys
+import os
+import json
+import time
+import base64
+import shutil
+import argparse
+import resource
+import tempfile
+import multiprocessing
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from encryption import LEGACY_KDF_PARAMS, derive_key, encrypt_data, make_key_verifier
+from migrate import MIGRATE_BATCH_SIZE, migrate_legacy_vault
+
+PASSWORD = "benchmark password"
+
+def build_legacy_vault(directory, records, results=None):
+    """Write a legacy vault with the given number of records; returns its size"""
+    key, salt = derive_key(PASSWORD, params=LEGACY_KDF_PARAMS)
+    snapshot = [{"ssid": f"Site-{i // 1000:04d}-AP-{i:07d}", "password": f"pw-{i:07d}-{i * 7919 % 100003}",
+                 "security": "WPA2"} for i in range(records)]
+    with open(os.path.join(directory, "wifi_data.enc"), "w") as f:
+        f.write(encrypt_data(json.dumps(snapshot), key))
+    with open(os.path.join(directory, "master_key.hash"), "w") as f:
+        json.dump({"hash": make_key_verifier(key), "salt": base64.b64encode(salt).decode("utf-8")}, f)
+    size = os.path.getsize(os.path.join(directory, "wifi_data.enc"))
+    if results is not None:
+        results.put(size)
+    return size
+
+def run_migration(directory, batch_size, results):
+    """Migrate the vault in directory and send the timings back (child process)"""
+    vault = os.path.join(directory, "wifi_data.enc")
+    started = time.perf_counter()
+    checkpoints = []
+    migrate_legacy_vault(PASSWORD, vault, os.path.join(directory, "master_key.hash"),
+                         lambda done, total: checkpoints.append(time.perf_counter()), batch_size)
+    results.put({
+        'seconds': time.perf_counter() - started,
+        'checkpoints': len(checkpoints),
+        'size': os.path.getsize(vault),
+        'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    })
+
+def in_child(target, *args):
+    """Run target in a fresh interpreter and return what it sends back"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    child = context.Process(target=target, args=args + (results,))
+    child.start()
+    result = results.get()
+    child.join()
+    return result
+
+def main(argv=None):
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=1000000,
+                        help="records in the synthetic vault (default: 1000000)")
+    parser.add_argument("--batch-size", type=int, default=MIGRATE_BATCH_SIZE,
+                        help=f"records per checkpoint (default: {MIGRATE_BATCH_SIZE})")
+    args = parser.parse_args(argv)
+    
+    directory = tempfile.mkdtemp()
+    try:
+        started = time.perf_counter()
+        legacy_size = in_child(build_legacy_vault, directory, args.records)
+        print(f"Built a {args.records}-record legacy vault of {legacy_size / 1024 / 1024:.1f} MB "
+              f"in {time.perf_counter() - started:.1f} s", flush=True)
+        
+        result = in_child(run_migration, directory, args.batch_size)
+        seconds = result['seconds']
+        print(f"Migrated in {seconds:.1f} s: {args.records / seconds:,.0f} records/s, "
+              f"{legacy_size / seconds / 1024 / 1024:.1f} MB/s of legacy vault")
+        print(f"{result['checkpoints']} checkpoints, new vault {result['size'] / 1024 / 1024:.1f} MB, "
+              f"peak resident memory {result['peak_rss'] / 1024 / 1024:.1f} MB")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
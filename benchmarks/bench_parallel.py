@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Worker pool scaling benchmark for the Wi-Fi Password Manager
+
+Times sealing every password of a synthetic vault with add_many and
+opening them again with iter_wifi(with_passwords=True), on thread and
+process pools of 1, 2, 4 and 8 workers.
+"""
+
+import sys
+import os
+import time
+import argparse
+import tempfile
+import shutil
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from database import DatabaseManager, POOL_TYPES
+
+WORKER_COUNTS = [1, 2, 4, 8]
+
+# A cheap key derivation keeps the measurement on the record crypto
+BENCH_KDF = {'name': 'pbkdf2-sha1', 'iterations': 1000}
+
+def measure(count, workers, pool):
+    """Return (seconds to add, seconds to read back) for one configuration"""
+    if os.path.exists("wifi_data.enc"):
+        os.remove("wifi_data.enc")
+    db = DatabaseManager(kdf_params=BENCH_KDF, workers=workers, pool=pool)
+    db.initialize_database("benchmark-password")
+    # Start the pool before timing so its startup is not counted
+    db._get_executor()
+    
+    start = time.perf_counter()
+    db.add_many({"ssid": f"Site-{i:06d}", "password": f"password-{i:06d}", "security": "WPA2"}
+                for i in range(count))
+    db.flush()
+    added = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    read = sum(1 for _ in db.iter_wifi(with_passwords=True))
+    opened = time.perf_counter() - start
+    db.lock_database()
+    
+    assert read == count
+    return added, opened
+
+def run(count):
+    """Run the scaling benchmark for every pool type and worker count"""
+    test_dir = tempfile.mkdtemp()
+    original_cwd = os.getcwd()
+    os.chdir(test_dir)
+    try:
+        print(f"{count} records, {os.cpu_count()} CPUs")
+        for pool in POOL_TYPES:
+            baseline = None
+            for workers in WORKER_COUNTS:
+                added, opened = measure(count, workers, pool)
+                if baseline is None:
+                    baseline = (added, opened)
+                print(f"{pool:>8} x{workers}: add_many {added:7.2f}s ({baseline[0] / added:4.2f}x)  "
+                      f"iter_wifi {opened:7.2f}s ({baseline[1] / opened:4.2f}x)")
+    finally:
+        os.chdir(original_cwd)
+        shutil.rmtree(test_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=100000, help="vault size (default: 100000)")
+    args = parser.parse_args()
+    run(args.records)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+SSID search and sort benchmark for the Wi-Fi Password Manager
+
+Indexes synthetic SSIDs with SsidSearchIndex and times each keystroke of a
+few typed queries, as the search box on the View and QR pages runs them,
+then times the sort orders behind the sortable column headings.
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from database import SORT_KEYS
+from indexes import SortedIndex, SsidSearchIndex
+
+WORDS = ["Home", "Office", "Guest", "Cafe", "Lab", "Lobby", "Floor", "Warehouse", "Mesh", "IoT"]
+
+QUERIES = ["guestlab-12", "site-0042-ap", "WAREHOUSE", "ap-0099999", "zzz"]
+
+def build_ssids(count):
+    """Half site/AP style names, half word pairs with a number"""
+    rng = random.Random(0)
+    ssids = {f"Site-{i // 1000:04d}-AP-{i:07d}" for i in range(count // 2)}
+    while len(ssids) < count:
+        ssids.add(f"{rng.choice(WORDS)}{rng.choice(WORDS)}-{rng.randrange(10 ** 6):06d}")
+    return list(ssids)
+
+def run(count):
+    """Run the search benchmark over the given number of SSIDs"""
+    ssids = build_ssids(count)
+    start = time.perf_counter()
+    index = SsidSearchIndex(ssids)
+    print(f"Indexed {count} SSIDs in {time.perf_counter() - start:.2f}s")
+    
+    for query in QUERIES:
+        timings = []
+        for end in range(1, len(query) + 1):
+            start = time.perf_counter()
+            results = index.search(query[:end])
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(f"{query:>15}: median {timings[len(timings) // 2]:.3f} ms, "
+              f"worst {timings[-1]:.3f} ms per keystroke, {len(results)} matches")
+    
+    start = time.perf_counter()
+    index.discard(ssids[0])
+    index.add(ssids[0])
+    print(f"Update: {(time.perf_counter() - start) * 1000:.3f} ms per delete and add")
+    
+    records = [{"ssid": ssid, "security": ("WPA2", "WPA3", "WPA", "NOPASS")[i % 4]}
+               for i, ssid in enumerate(ssids)]
+    for column, key in SORT_KEYS.items():
+        start = time.perf_counter()
+        order = SortedIndex(key, records)
+        built = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        order.ssids(descending=True)
+        toggled = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        order.add({"ssid": "Zz new network", "security": "WPA2"})
+        order.discard("Zz new network")
+        updated = time.perf_counter() - start
+        print(f"{column:>15}: sorted in {built:.2f}s, {toggled * 1000:.3f} ms per direction toggle, "
+              f"{updated * 1000:.3f} ms per add and delete")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=100000, help="number of SSIDs (default: 100000)")
+    args = parser.parse_args()
+    run(args.records)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Crypto and KDF benchmark suite for the Wi-Fi Password Manager
+
+Times one unlock's worth of key derivation, and encryption and decryption
+through the text API (encrypt_data/decrypt_data) and the stream API
+(encrypt_stream/decrypt_stream) at payload sizes from 100 B to 50 MB.
+Every case reports its best time, throughput and peak traced memory.
+
+Results can be written as JSON and compared with an earlier run; the
+script exits with status 1 when a case is slower, or uses more memory,
+than the baseline by more than the given thresholds.
+
+    python benchmarks/run_benchmarks.py --output baseline.json
+    python benchmarks/run_benchmarks.py --baseline baseline.json --threshold 0.2
+"""
+
+import sys
+import os
+import io
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from encryption import (DEFAULT_KDF_PARAMS, derive_key, encrypt_data, decrypt_data,
+                        encrypt_stream, decrypt_stream, get_kdf_backend)
+
+SIZES = [100, 10 * 1024, 1024 * 1024, 10 * 1024 * 1024, 50 * 1024 * 1024]
+
+KDF_CASES = {
+    'pbkdf2-sha1': DEFAULT_KDF_PARAMS,
+    'scrypt': {'name': 'scrypt', 'n': 2 ** 15, 'r': 8, 'p': 1},
+}
+
+RESULTS_FORMAT = 1
+
+# Peak memory may grow by this many bytes before the threshold applies, so
+# small cases are not failed over allocator noise
+MEMORY_SLACK = 64 * 1024
+
+class NullWriter:
+    """Binary sink that counts bytes instead of keeping them"""
+    
+    def __init__(self):
+        self.size = 0
+    
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
+
+def kdf_case(params):
+    """Build a case deriving one key with the given parameters"""
+    salt = os.urandom(16)
+    return lambda: derive_key("benchmark password", salt, params)
+
+def encrypt_data_case(payload, key):
+    """Build a case encrypting a payload with the text API"""
+    text = payload.decode('latin-1')
+    return lambda: encrypt_data(text, key)
+
+def decrypt_data_case(payload, key):
+    """Build a case decrypting a payload with the text API"""
+    encrypted = encrypt_data(payload.decode('latin-1'), key)
+    return lambda: decrypt_data(encrypted, key)
+
+def encrypt_stream_case(payload, key):
+    """Build a case encrypting a payload with the stream API"""
+    return lambda: encrypt_stream(io.BytesIO(payload), NullWriter(), key)
+
+def decrypt_stream_case(payload, key):
+    """Build a case decrypting a payload with the stream API"""
+    sealed = io.BytesIO()
+    encrypt_stream(io.BytesIO(payload), sealed, key)
+    sealed = sealed.getvalue()
+    return lambda: decrypt_stream(io.BytesIO(sealed), NullWriter(), key)
+
+PAYLOAD_CASES = {
+    'encrypt_data': encrypt_data_case,
+    'decrypt_data': decrypt_data_case,
+    'encrypt_stream': encrypt_stream_case,
+    'decrypt_stream': decrypt_stream_case,
+}
+
+def size_label(size):
+    """Format a payload size for a case name"""
+    for unit, scale in (("MB", 1024 * 1024), ("KB", 1024)):
+        if size >= scale and size % scale == 0:
+            return f"{size // scale}{unit}"
+    return f"{size}B"
+
+def iter_cases(sizes):
+    """Yield (name, payload size, case builder) for every benchmark case"""
+    for name, params in KDF_CASES.items():
+        yield f"kdf_unlock/{name}", 0, lambda params=params: kdf_case(params)
+    key = os.urandom(32)
+    for size in sizes:
+        for name, build in PAYLOAD_CASES.items():
+            yield (f"{name}/{size_label(size)}", size,
+                   lambda build=build, size=size: build(os.urandom(size), key))
+
+def measure(function, min_time, max_repeat):
+    """Return (best seconds per call, peak traced bytes of one call)"""
+    # Warm up first so one-time allocations are not counted as the case's
+    function()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < max_repeat and (not timings or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), peak
+
+def run(sizes, pattern, min_time, max_repeat):
+    """Run every case whose name contains pattern and collect the results"""
+    results = {}
+    for name, size, build in iter_cases(sizes):
+        if pattern and pattern not in name:
+            continue
+        function = build()
+        seconds, peak = measure(function, min_time, max_repeat)
+        result = {'seconds': seconds, 'peak_bytes': peak, 'size': size}
+        if size:
+            result['throughput_mb_s'] = size / seconds / (1024 * 1024)
+        results[name] = result
+        
+        throughput = f"{result['throughput_mb_s']:9.1f} MB/s" if size else " " * 14
+        print(f"{name:<26} {seconds * 1e3:10.3f} ms {throughput}  peak {peak / 1024:10.1f} KiB",
+              flush=True)
+    return results
+
+def compare(results, baseline, threshold, memory_threshold):
+    """
+    Compare results with a baseline run.
+    
+    Returns:
+        list: Descriptions of the cases that regressed past a threshold
+    """
+    regressions = []
+    print(f"\nCompared with baseline ({threshold:.0%} time, {memory_threshold:.0%} memory threshold):")
+    for name, result in results.items():
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            print(f"  {name:<26} new case")
+            continue
+        
+        slowdown = result['seconds'] / before['seconds'] - 1
+        growth = result['peak_bytes'] / max(before['peak_bytes'], 1) - 1
+        problems = []
+        if slowdown > threshold:
+            problems.append(f"{slowdown:+.1%} time")
+        if (memory_threshold >= 0 and growth > memory_threshold
+                and result['peak_bytes'] - before['peak_bytes'] > MEMORY_SLACK):
+            problems.append(f"{growth:+.1%} memory")
+        
+        status = "REGRESSION " + ", ".join(problems) if problems else "ok"
+        print(f"  {name:<26} time {slowdown:+7.1%}  memory {growth:+7.1%}  {status}")
+        if problems:
+            regressions.append(f"{name}: {', '.join(problems)}")
+    return regressions
+
+def environment():
+    """Describe the machine and libraries the results were measured with"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'kdf_backends': {name: get_kdf_backend(name) for name in KDF_CASES},
+        'time': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+def main(argv=None):
+    """Run the suite from the command line; returns the exit status"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help="payload sizes in bytes (default: 100 B to 50 MB)")
+    parser.add_argument("--filter", default="",
+                        help="only run cases whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=0.5,
+                        help="seconds to keep repeating each case (default: 0.5)")
+    parser.add_argument("--max-repeat", type=int, default=50,
+                        help="most timed runs per case (default: 50)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="fail when a case is this fraction slower than the baseline (default: 0.25)")
+    parser.add_argument("--memory-threshold", type=float, default=0.25,
+                        help="fail when a case's peak memory grows by this fraction; "
+                             "negative disables the check (default: 0.25)")
+    args = parser.parse_args(argv)
+    
+    results = run(args.sizes, args.filter, args.min_time, args.max_repeat)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'format': RESULTS_FORMAT, 'environment': environment(), 'results': results},
+                      f, indent=2, sort_keys=True)
+        print(f"\nResults written to {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.memory_threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s):")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
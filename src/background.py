@@ -0,0 +1,101 @@
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+# How often the Tk main loop checks for finished work (about 60 fps)
+POLL_MS = 16
+
+class BackgroundExecutor:
+    """
+    Runs slow work off the Tk main loop and hands the results back to it.
+    
+    Work runs on a single worker thread, one call at a time in the order
+    it was submitted, so calls that change the database never overlap.
+    Finished calls are put on a result queue that the main loop drains
+    with root.after while anything is in flight; their callbacks run there,
+    so they may update widgets.
+    """
+    
+    def __init__(self, root, on_error: Optional[Callable[[Exception], None]] = None,
+                 poll_ms: int = POLL_MS):
+        """
+        Args:
+            root: Tk root whose main loop runs the callbacks
+            on_error (Callable): Called with the exception of a call that
+                failed and was submitted without an on_error of its own
+            poll_ms (int): Milliseconds between checks for finished calls
+        """
+        self.root = root
+        self.on_error = on_error
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._results = queue.Queue()
+        self._pending = 0
+        self._poll_job = None
+    
+    def submit(self, function: Callable, *args, on_done: Optional[Callable] = None,
+               on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        """
+        Run function(*args) on the worker thread.
+        
+        Args:
+            function (Callable): Work to run; it must not touch widgets
+            *args: Arguments for the function
+            on_done (Callable): Called on the main loop with the result
+            on_error (Callable): Called on the main loop with the exception
+                if the function raises, instead of the executor's on_error
+            
+        Returns:
+            Future: The pending call
+        """
+        future = self._executor.submit(function, *args)
+        self._pending += 1
+        future.add_done_callback(lambda done: self._results.put((done, on_done, on_error)))
+        if self._poll_job is None:
+            self._poll_job = self.root.after(self.poll_ms, self._poll)
+        return future
+    
+    def busy(self) -> bool:
+        """
+        Check whether any submitted call has not been handed back yet.
+        
+        Returns:
+            bool: True while calls are running, queued or awaiting their callback
+        """
+        return self._pending > 0
+    
+    def shutdown(self, wait: bool = True):
+        """
+        Stop accepting work; calls already submitted still run.
+        
+        Args:
+            wait (bool): Whether to wait for them to finish
+        """
+        self._executor.shutdown(wait=wait)
+    
+    def _poll(self):
+        """Run the callbacks of finished calls, then check again while any are left"""
+        self._poll_job = None
+        try:
+            while True:
+                try:
+                    future, on_done, on_error = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                self._pending -= 1
+                self._dispatch(future, on_done, on_error)
+        finally:
+            if self._pending and self._poll_job is None:
+                self._poll_job = self.root.after(self.poll_ms, self._poll)
+    
+    def _dispatch(self, future: Future, on_done: Optional[Callable],
+                  on_error: Optional[Callable[[Exception], None]]):
+        error = future.exception()
+        if error is None:
+            if on_done is not None:
+                on_done(future.result())
+            return
+        on_error = on_error or self.on_error
+        if on_error is None:
+            raise error
+        on_error(error)
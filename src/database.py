@@ -1,147 +1,897 @@
-import json
+import io
 import os
+import hmac
 import base64
-from typing import Dict, List, Optional
-from encryption import derive_key, encrypt_data, decrypt_data
+import functools
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+from contextlib import contextmanager
+from itertools import islice
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+from encryption import (DEFAULT_KDF_PARAMS, derive_key, validate_kdf_params,
+                        aead_encrypt, aead_decrypt, aead_encrypt_many, aead_decrypt_many,
+                        AEAD_BATCH_SIZE, encrypt_stream, iter_decrypt_stream, TruncatedStreamError,
+                        key_check_value, generate_data_key, unwrap_key)
+from indexes import SortedIndex, SsidSearchIndex
+from migrate import migrate_legacy_vault
+from storage import (COMMIT_DELAY, VAULT_MAGIC, VaultWriter, ChunkReader, file_signature,
+                     read_container_header, is_container, check_entry_fields, pack_entry,
+                     iter_entries, make_key_slot, pack_vault_header, write_key_slot)
 
 DB_FILE = "wifi_data.enc"
-MASTER_KEY_FILE = "master_key.hash"
+MASTER_KEY_FILE = "master_key.hash"  # Only used by legacy vaults
+
+# Key derivation parameters for new vaults unless others are configured;
+# every vault records its own in its key slot
+KDF_PARAMS = DEFAULT_KDF_PARAMS
+
+# The journal is compacted once it holds more dead entries (overwritten
+# records and tombstones) than this minimum and than there are live records
+JOURNAL_COMPACT_MIN_DEAD = 64
+
+# Changed SSIDs remembered for changes_since; views further behind than
+# this compare every record instead
+CHANGELOG_SIZE = 1024
+
+# Worker pools that can encrypt and decrypt passwords in parallel
+POOL_TYPES = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+
+# Orders that sorted_ssids can list SSIDs in, as sort keys of a record
+SORT_KEYS = {
+    'ssid': lambda record: record['ssid'].casefold(),
+    'security': lambda record: (record['security'].casefold(), record['ssid'].casefold()),
+}
+
+def _synchronized(method):
+    """Run a DatabaseManager method while holding the manager's lock"""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return locked
+
+def _batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """Split an iterable into lists of at most size items, lazily."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
 
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, journal: bool = True, commit_delay: float = COMMIT_DELAY,
+                 kdf_params: Optional[Dict] = None, workers: int = 1, pool: str = 'thread'):
+        """
+        Args:
+            journal (bool): Append one encrypted entry per change instead of
+                rewriting the whole vault on every save
+            commit_delay (float): Longest time a save may wait so that saves
+                arriving close together are written with one fsync; 0 writes
+                every save immediately
+            kdf_params (Dict): Key derivation parameters for new vaults (see
+                encryption.calibrate_kdf); existing vaults keep their own
+            workers (int): Number of workers that encrypt and decrypt
+                passwords in batches for add_many and iter_wifi; 1 does all
+                the work in the calling thread
+            pool (str): 'thread' or 'process'; process workers are not held
+                back by the GIL but receive a copy of the key with each batch
+        """
+        if pool not in POOL_TYPES:
+            raise ValueError(f"Unknown pool type: {pool}")
+        
         self.key = None
         self.salt = None
+        self.journal = journal
         
-    def initialize_database(self, master_password: str) -> bool:
+        # Held by every public method, so a GUI worker thread and the main
+        # loop can share the manager
+        self._lock = threading.RLock()
+        self.kdf_params = validate_kdf_params(kdf_params or KDF_PARAMS)
+        self.workers = workers
+        self.pool = pool
+        
+        # Worker pool, started on first use while unlocked
+        self._executor = None
+        
+        # Key slot holding the data key wrapped by the master password, and
+        # the encoded container header written in front of every full rewrite
+        self._key_slot = None
+        self._header = None
+        
+        # Vault paths, resolved once so that reads and the writer keep using
+        # the same files if the working directory changes
+        self.path = os.path.abspath(DB_FILE)
+        self.master_key_path = os.path.abspath(MASTER_KEY_FILE)
+        
+        # Crash-safe writer shared by every save, and how many of its commits
+        # the cached stat signature already accounts for
+        self._writer = VaultWriter(self.path, commit_delay)
+        self._writer_seen = 0
+        
+        # Decrypted records and the stat signature of the file they came from
+        self._cache = None
+        self._cache_stat = None
+        
+        # Journal bookkeeping for the cached file
+        self._entry_count = 0
+        self._dead_count = 0
+        self._needs_compaction = False
+        
+        # Changes buffered by an open transaction
+        self._txn = None
+        
+        # Revision counter and the SSIDs changed at recent revisions, so views
+        # can refresh only what changed; revisions up to _changes_base are
+        # no longer fully logged
+        self._revision = 0
+        self._changes = deque(maxlen=CHANGELOG_SIZE)
+        self._changes_base = 0
+        
+        # Substring index and sort orders over the cached records, each
+        # built the first time it is used
+        self._search_index = None
+        self._sort_indexes = {}
+        
+    @_synchronized
+    def initialize_database(self, master_password: str, kdf_params: Optional[Dict] = None) -> bool:
         """
         Initialize the database with a master password.
         
         Args:
             master_password (str): The master password
+            kdf_params (Dict): Key derivation parameters for the new vault;
+                defaults to the manager's kdf_params
             
         Returns:
             bool: True if initialization successful, False otherwise
         """
         # Check if database already exists
-        if os.path.exists(DB_FILE):
+        if os.path.exists(self.path):
             return self.unlock_database(master_password)
         else:
-            # Create new database
-            key, salt = derive_key(master_password)
-            self.key = key
-            self.salt = salt
-            
-            # Create empty database
-            empty_db = encrypt_data(json.dumps([]), key)
-            with open(DB_FILE, 'w') as f:
-                f.write(empty_db)
-            
-            # Save key hash for verification
-            self._save_master_key_hash(master_password, salt)
+            # Create new database; the password only wraps a random data key,
+            # so it is derived exactly once
+            try:
+                params = validate_kdf_params(kdf_params or self.kdf_params)
+            except ValueError:
+                return False
+            key = generate_data_key()
+            wrapping_key, salt = derive_key(master_password, params=params)
+            self._set_key(key, make_key_slot(key, wrapping_key, salt, params))
+            
+            # Create empty database with the key slot and key check in its header
+            try:
+                self._save_data({})
+                self._writer.flush()
+            except Exception:
+                self.lock_database()
+                return False
             return True
     
+    @_synchronized
     def unlock_database(self, master_password: str) -> bool:
         """
         Unlock the database with the master password.
         
+        The vault file is opened once: its key slot supplies the key
+        derivation parameters, salt and wrapped data key, and the records are
+        then streamed from the same file a chunk at a time. Legacy vaults
+        are migrated on their first unlock.
+        
         Args:
             master_password (str): The master password
             
         Returns:
             bool: True if unlocked successfully, False otherwise
         """
-        # Verify master password
-        if not self._verify_master_password(master_password):
+        # Make sure our own queued saves are on disk before reading it
+        try:
+            self._writer.flush()
+        except Exception:
+            pass
+        
+        try:
+            f, signature = self._open_vault()
+        except FileNotFoundError:
             return False
+        
+        with f:
+            try:
+                container = read_container_header(f)
+                if container is not None:
+                    header = container[1]
+                    key = self._open_key_slot(master_password, header)
+            except (ValueError, KeyError, TypeError):
+                return False
             
-        # Load salt
-        if os.path.exists(MASTER_KEY_FILE):
-            with open(MASTER_KEY_FILE, 'r') as f:
-                data = json.load(f)
-                self.salt = base64.b64decode(data['salt'])
+            if container is not None:
+                self._set_key(key, header['key_slot'])
+                try:
+                    self._load_stream(f, signature)
+                except Exception:
+                    self.lock_database()
+                    return False
+                return True
         
-        # Derive key
-        self.key, _ = derive_key(master_password, self.salt)
+        # Migrating rewrites the vault, so it happens once the file is closed
+        return self._unlock_legacy(master_password)
+    
+    def _open_key_slot(self, master_password: str, header: Dict) -> bytes:
+        """
+        Recover the data key of a container with the master password.
         
-        # Test decryption
+        Args:
+            master_password (str): The master password
+            header (Dict): Container header
+            
+        Returns:
+            bytes: The data key
+            
+        Raises:
+            ValueError: If the password is wrong or the header is invalid
+        """
+        key_slot = header['key_slot']
+        params = validate_kdf_params(key_slot['kdf'])
+        wrapping_key, _ = derive_key(master_password, base64.b64decode(key_slot['salt']), params)
+        key = unwrap_key(base64.b64decode(key_slot['key']), wrapping_key)
+        if not hmac.compare_digest(key_check_value(key), base64.b64decode(header['check'])):
+            raise ValueError("Wrong master password")
+        return key
+    
+    def _unlock_legacy(self, master_password: str) -> bool:
+        """
+        Unlock a base64 text vault with its separate key file and migrate it.
+        
+        The vault is converted by migrate_legacy_vault, which resumes an
+        interrupted migration where it stopped. If another process was
+        migrating the vault, this waits for it and then opens its result.
+        
+        Args:
+            master_password (str): The master password
+            
+        Returns:
+            bool: True if unlocked and migrated successfully, False otherwise
+        """
+        try:
+            key, key_slot = migrate_legacy_vault(master_password, self.path, self.master_key_path,
+                                                 executor=self._get_executor())
+        except FileNotFoundError:
+            # The migration waited for might have converted the vault
+            try:
+                with open(self.path, 'rb') as f:
+                    migrated = is_container(f.read(len(VAULT_MAGIC)))
+            except OSError:
+                return False
+            return migrated and self.unlock_database(master_password)
+        except (ValueError, KeyError, TypeError, OSError):
+            return False
+        
+        self._set_key(key, key_slot)
         try:
             self._load_data()
+        except Exception:
+            self.lock_database()
+            return False
+        return True
+    
+    def _set_key(self, key: bytes, key_slot: Dict):
+        """
+        Start a session with a data key and build the matching header.
+        
+        Args:
+            key (bytes): The data key that encrypts the vault
+            key_slot (Dict): The slot holding it wrapped by the master password
+        """
+        self.key = key
+        self._set_key_slot(key_slot)
+        self._invalidate_cache()
+    
+    def _set_key_slot(self, key_slot: Dict):
+        """
+        Adopt a key slot for the current data key and rebuild the header.
+        
+        Args:
+            key_slot (Dict): The slot holding the data key
+        """
+        self.salt = base64.b64decode(key_slot['salt'])
+        self._key_slot = key_slot
+        self._header = pack_vault_header(self.key, key_slot)
+    
+    @_synchronized
+    def lock_database(self) -> bool:
+        """
+        Save queued changes, then forget the key and the records held in memory.
+        
+        Returns:
+            bool: True if every change was saved, False otherwise
+        """
+        try:
+            self._writer.flush()
+            saved = True
+        except Exception:
+            saved = False
+        self.key = None
+        self.salt = None
+        self._key_slot = None
+        self._header = None
+        self._invalidate_cache()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        return saved
+    
+    @_synchronized
+    def flush(self) -> bool:
+        """
+        Wait until every change made so far is durably on disk.
+        
+        Returns:
+            bool: True if every change was saved, False otherwise
+        """
+        try:
+            self._writer.flush()
             return True
         except Exception:
             return False
     
-    def _verify_master_password(self, master_password: str) -> bool:
+    def _read_key_slot(self, master_password: str) -> Optional[Tuple[Dict, int]]:
         """
-        Verify the master password against the saved hash.
+        Check the master password against the key slot on disk.
         
         Args:
-            master_password (str): The master password to verify
+            master_password (str): The current master password
             
         Returns:
-            bool: True if password is correct, False otherwise
+            Optional[Tuple[Dict, int]]: (key slot, file offset of the slots),
+                or None if the password does not open this session's data key
         """
-        if not os.path.exists(MASTER_KEY_FILE):
-            return True  # First time setup
+        self._writer.flush()
+        f, _ = self._open_vault()
+        with f:
+            container = read_container_header(f)
+        if container is None:
+            return None
+        header = container[1]
+        key = self._open_key_slot(master_password, header)
+        if not hmac.compare_digest(key, self.key):
+            return None
+        return header['key_slot'], header['key_slot_offset']
+    
+    @_synchronized
+    def change_master_password(self, old_password: str, new_password: str,
+                               kdf_params: Optional[Dict] = None) -> bool:
+        """
+        Change the master password of the unlocked vault.
+        
+        Only the data key is re-encrypted: its key slot is rewritten in
+        place, one copy at a time, so the cost does not depend on the size
+        of the vault and a crash leaves either the old or the new password
+        working. Use rotate_data_key to re-encrypt the records themselves.
+        
+        Args:
+            old_password (str): The current master password
+            new_password (str): The new master password
+            kdf_params (Dict): Key derivation parameters for the new password;
+                defaults to those of the current key slot
+                
+        Returns:
+            bool: True if the password was changed, False otherwise
+        """
+        if self.key is None or self._txn is not None:
+            return False
+        try:
+            opened = self._read_key_slot(old_password)
+            if opened is None:
+                return False
+            key_slot, offset = opened
+            params = validate_kdf_params(kdf_params or key_slot['kdf'])
+            # Bring the cache bookkeeping up to date before the file changes
+            self._load_data()
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        
+        wrapping_key, salt = derive_key(new_password, params=params)
+        new_slot = make_key_slot(self.key, wrapping_key, salt, params, key_slot['seq'] + 1)
+        cached = self._cache is not None and self._file_signature() == self._cache_stat
+        try:
+            write_key_slot(self.path, offset, new_slot)
+        except (OSError, ValueError):
+            self._invalidate_cache()
+            return False
+        
+        self._set_key_slot(new_slot)
+        if cached:
+            self._cache_stat = self._file_signature()
+        return True
+    
+    @_synchronized
+    def rotate_data_key(self, master_password: str) -> bool:
+        """
+        Re-encrypt the whole vault with a new random data key.
+        
+        Every password is opened with the old key and sealed with the new
+        one in batches, and the vault is rewritten as a stream, so only one
+        batch of plaintext passwords is held at a time. The new key is
+        wrapped with the same master password under a fresh salt.
+        
+        Args:
+            master_password (str): The current master password
+            
+        Returns:
+            bool: True if the vault was re-encrypted, False otherwise
+        """
+        if self.key is None or self._txn is not None:
+            return False
+        try:
+            opened = self._read_key_slot(master_password)
+            if opened is None:
+                return False
+            key_slot, _ = opened
+            params = validate_kdf_params(key_slot['kdf'])
+            records = self._load_data()
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        
+        old_key, old_slot = self.key, self._key_slot
+        new_key = generate_data_key()
+        executor = self._get_executor()
+        resealed = {}
+        try:
+            for batch in _batched(records.values(), AEAD_BATCH_SIZE * self.workers):
+                indexes = [i for i, record in enumerate(batch) if record['sealed']]
+                plain = aead_decrypt_many([batch[i]['sealed'] for i in indexes], old_key, executor)
+                sealed = [b""] * len(batch)
+                for i, blob in zip(indexes, aead_encrypt_many(plain, new_key, executor)):
+                    sealed[i] = blob
+                for record, blob in zip(batch, sealed):
+                    resealed[record['ssid']] = dict(record, sealed=blob)
+        except ValueError:
+            return False
+        
+        wrapping_key, salt = derive_key(master_password, params=params)
+        self._set_key(new_key, make_key_slot(new_key, wrapping_key, salt, params,
+                                                   key_slot['seq'] + 1))
+        try:
+            self._save_data(resealed)
+            self._writer.flush()
+        except Exception:
+            # The file still holds the old key unless the rewrite landed
+            self._set_key(old_key, old_slot)
+            return False
+        return True
+    
+    def _open_vault(self) -> Tuple[BinaryIO, tuple]:
+        """
+        Open the vault file for streaming reads.
+        
+        Returns:
+            Tuple[BinaryIO, tuple]: (open file, stat signature of that file)
+        """
+        f = open(self.path, 'rb')
+        st = os.fstat(f.fileno())
+        return f, (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    def _file_signature(self) -> Optional[tuple]:
+        """
+        Get the stat signature used to detect changes to the database file.
+        
+        Returns:
+            Optional[tuple]: (mtime_ns, size, inode), or None if the file is missing
+        """
+        return file_signature(self.path)
+    
+    def _invalidate_cache(self):
+        """Drop the cached records so the next read goes to disk."""
+        self._cache = None
+        self._cache_stat = None
+        self._entry_count = 0
+        self._dead_count = 0
+        self._needs_compaction = False
+        self._drop_indexes()
+    
+    def _load_data(self) -> Dict[str, Dict]:
+        """
+        Load and decrypt data from the database file.
+        
+        Records are indexed by SSID (in insertion order) and cached; they are
+        only reloaded when the file's stat signature changes, so repeated
+        reads cost a single stat call.
+        
+        Returns:
+            Dict[str, Dict]: Records with sealed passwords, keyed by SSID
+        """
+        if self._txn is not None:
+            return self._txn['records']
+        
+        if self._cache is not None:
+            # The cache already holds changes that are still being saved
+            if self._writer.busy():
+                return self._cache
+            if self._writer_seen != self._writer.committed:
+                # Our own saves have landed; adopt the file's stat after them
+                self._writer_seen = self._writer.committed
+                self._cache_stat = self._writer.signature
+            if self._file_signature() == self._cache_stat:
+                return self._cache
+        
+        self._writer.flush()
+        try:
+            f, signature = self._open_vault()
+        except FileNotFoundError:
+            return {}
+        
+        with f:
+            container = read_container_header(f)
+            if container is None:
+                raise ValueError("Not a vault container")
+            header = container[1]
+            if not hmac.compare_digest(base64.b64decode(header['check']), key_check_value(self.key)):
+                raise ValueError("The vault was re-keyed by another process")
+            if header['key_slot']['seq'] > self._key_slot['seq']:
+                # The master password was changed by another manager; keep
+                # its slot when this one rewrites the file
+                self._set_key_slot(header['key_slot'])
+            return self._load_stream(f, signature)
+    
+    def _load_stream(self, f: BinaryIO, signature: tuple) -> Dict[str, Dict]:
+        """
+        Replay the encrypted streams of a container into the record cache.
+        
+        The first stream is a snapshot of every record and each following
+        stream is one journal append. Streams are decrypted a chunk at a
+        time and their entries decoded straight from the chunks, so no more
+        than one chunk of the file is held in memory. The snapshot is
+        applied as it is read; an append is applied only once its final
+        chunk has been verified, so a crash while appending loses just that
+        append.
+        
+        Args:
+            f (BinaryIO): The open vault file, positioned after the header
+            signature (tuple): Stat signature of the open file
             
-        with open(MASTER_KEY_FILE, 'r') as f:
-            data = json.load(f)
-            saved_hash = data['hash']
-            salt = base64.b64decode(data['salt'])
+        Returns:
+            Dict[str, Dict]: Records with sealed passwords, keyed by SSID
+        """
+        size = signature[1]
+        records = {}
+        entry_count = 0
+        needs_compaction = False
+        
+        for entry in iter_entries(iter_decrypt_stream(f, self.key)):
+            self._apply_entry(records, entry)
+            entry_count += 1
+        
+        while f.tell() < size:
+            try:
+                entries = list(iter_entries(iter_decrypt_stream(f, self.key)))
+            except TruncatedStreamError:
+                # A crash while appending can leave a partial last stream
+                needs_compaction = True
+                break
+            for entry in entries:
+                self._apply_entry(records, entry)
+            entry_count += len(entries)
+        
+        return self._set_cache(records, signature, entry_count, needs_compaction)
+    
+    def _set_cache(self, records: Dict[str, Dict], signature: Optional[tuple],
+                   entry_count: int, needs_compaction: bool) -> Dict[str, Dict]:
+        """
+        Remember freshly loaded records and the file they were read from.
+        
+        Args:
+            records (Dict[str, Dict]): Records keyed by SSID
+            signature (Optional[tuple]): Stat signature of the file read
+            entry_count (int): Number of entries replayed
+            needs_compaction (bool): Whether the next change must rewrite the file
             
-        key, _ = derive_key(master_password, salt)
-        key_hash = base64.b64encode(key).decode('utf-8')
+        Returns:
+            Dict[str, Dict]: The records
+        """
+        self._writer_seen = self._writer.committed
+        self._cache = records
+        self._cache_stat = signature
+        self._entry_count = entry_count
+        self._dead_count = entry_count - len(records)
+        self._needs_compaction = needs_compaction
+        self._drop_indexes()
+        self._reset_changes()
+        return records
+    
+    def _log_changes(self, ssids: Iterable[str]):
+        """
+        Record the SSIDs changed by a commit, one revision each.
         
-        return key_hash == saved_hash
+        Args:
+            ssids (Iterable[str]): SSIDs put or deleted
+        """
+        for ssid in ssids:
+            self._revision += 1
+            if len(self._changes) == self._changes.maxlen:
+                self._changes_base = self._changes[0][0]
+            self._changes.append((self._revision, ssid))
     
-    def _save_master_key_hash(self, master_password: str, salt: bytes):
+    def _index_changes(self, entries: List[Dict]):
         """
-        Save the master key hash for verification.
+        Bring the search and sort indexes built so far up to date with a commit.
         
         Args:
-            master_password (str): The master password
-            salt (bytes): The salt used for key derivation
+            entries (List[Dict]): Journal entries in the order applied
         """
-        key, _ = derive_key(master_password, salt)
-        key_hash = base64.b64encode(key).decode('utf-8')
-        salt_b64 = base64.b64encode(salt).decode('utf-8')
+        search_index = self._search_index
+        sort_indexes = self._sort_indexes.values()
+        for entry in entries:
+            if entry['op'] == 'del':
+                if search_index is not None:
+                    search_index.discard(entry['ssid'])
+                for index in sort_indexes:
+                    index.discard(entry['ssid'])
+            else:
+                if search_index is not None:
+                    search_index.add(entry['ssid'])
+                for index in sort_indexes:
+                    index.add(entry)
+    
+    def _drop_indexes(self):
+        """Forget the search and sort indexes of records that are no longer cached."""
+        self._search_index = None
+        self._sort_indexes = {}
+    
+    def _reset_changes(self):
+        """Start a new revision whose differences from earlier ones are unknown."""
+        self._revision += 1
+        self._changes.clear()
+        self._changes_base = self._revision
+    
+    def _seal_password(self, password: str) -> bytes:
+        """
+        Encrypt a password into its own envelope.
         
-        with open(MASTER_KEY_FILE, 'w') as f:
-            json.dump({'hash': key_hash, 'salt': salt_b64}, f)
+        Args:
+            password (str): The plaintext password
+            
+        Returns:
+            bytes: The sealed password, or empty bytes for no password
+        """
+        if not password:
+            return b""
+        return aead_encrypt(password.encode('utf-8'), self.key)
     
-    def _load_data(self) -> List[Dict]:
+    def _open_password(self, sealed: bytes) -> str:
         """
-        Load and decrypt data from the database file.
+        Decrypt a password sealed by _seal_password.
         
+        Args:
+            sealed (bytes): The sealed password
+            
         Returns:
-            List[Dict]: Decrypted data
+            str: The plaintext password
         """
-        if not os.path.exists(DB_FILE):
-            return []
+        if not sealed:
+            return ""
+        return aead_decrypt(sealed, self.key).decode('utf-8')
+    
+    def _get_executor(self) -> Optional[Executor]:
+        """
+        Get the worker pool for batch encryption, starting it if needed.
+        
+        Returns:
+            Optional[Executor]: The pool, or None when running with one worker
+        """
+        if self.workers <= 1:
+            return None
+        if self._executor is None:
+            self._executor = POOL_TYPES[self.pool](max_workers=self.workers)
+        return self._executor
+    
+    def _seal_passwords(self, passwords: List[str]) -> List[bytes]:
+        """
+        Seal many passwords at once, spread over the worker pool.
+        
+        Args:
+            passwords (List[str]): Plaintext passwords
             
-        with open(DB_FILE, 'r') as f:
-            encrypted_data = f.read()
+        Returns:
+            List[bytes]: Sealed passwords in the same order
+        """
+        indexes = [i for i, password in enumerate(passwords) if password]
+        blobs = aead_encrypt_many([passwords[i].encode('utf-8') for i in indexes],
+                                  self.key, self._get_executor())
+        sealed = [b""] * len(passwords)
+        for i, blob in zip(indexes, blobs):
+            sealed[i] = blob
+        return sealed
+    
+    def _open_passwords(self, sealed: List[bytes]) -> List[str]:
+        """
+        Open many sealed passwords at once, spread over the worker pool.
+        
+        Args:
+            sealed (List[bytes]): Passwords sealed by _seal_password
             
-        if not encrypted_data:
-            return []
+        Returns:
+            List[str]: Plaintext passwords in the same order
             
-        decrypted_data = decrypt_data(encrypted_data, self.key)
-        return json.loads(decrypted_data)
+        Raises:
+            ValueError: For the first password, in order, that fails to decrypt
+        """
+        indexes = [i for i, value in enumerate(sealed) if value]
+        plain = aead_decrypt_many([sealed[i] for i in indexes], self.key, self._get_executor())
+        passwords = [""] * len(sealed)
+        for i, data in zip(indexes, plain):
+            passwords[i] = data.decode('utf-8')
+        return passwords
     
-    def _save_data(self, data: List[Dict]):
+    def _apply_entry(self, records: Dict[str, Dict], entry: Dict):
         """
-        Encrypt and save data to the database file.
+        Replay a single journal entry onto the record index.
         
         Args:
-            data (List[Dict]): Data to save
+            records (Dict[str, Dict]): Records keyed by SSID
+            entry (Dict): An upsert ('put') or tombstone ('del') entry
+        """
+        if entry['op'] == 'put':
+            records[entry['ssid']] = {
+                'ssid': entry['ssid'],
+                'security': entry['security'],
+                'sealed': entry['sealed']
+            }
+        elif entry['op'] == 'del':
+            records.pop(entry['ssid'], None)
+        else:
+            raise ValueError(f"Unknown journal entry: {entry['op']}")
+    
+    def _save_data(self, records: Dict[str, Dict]):
         """
-        encrypted_data = encrypt_data(json.dumps(data), self.key)
-        with open(DB_FILE, 'w') as f:
-            f.write(encrypted_data)
+        Encrypt and save every record as a snapshot stream, dropping the journal.
+        
+        The records are encoded and encrypted a chunk at a time while the
+        writer streams them into the new file, so the vault is never held
+        in memory as a whole.
+        
+        Args:
+            records (Dict[str, Dict]): Records keyed by SSID
+        """
+        header = self._header
+        key = self.key
+        # Records are replaced rather than modified, so a list of the
+        # current ones is a consistent snapshot for the writer
+        snapshot = list(records.values())
+        
+        def write_snapshot(f):
+            f.write(header)
+            entries = (pack_entry('put', record['ssid'], record['security'], record['sealed'])
+                       for record in snapshot)
+            encrypt_stream(ChunkReader(entries), f, key)
+        
+        try:
+            self._writer.replace(write_snapshot)
+        except Exception:
+            self._invalidate_cache()
+            raise
+        
+        self._cache = records
+        self._entry_count = len(records)
+        self._dead_count = 0
+        self._needs_compaction = False
+    
+    def _append_journal(self, entries: List[Dict], dead: int):
+        """
+        Append journal entries to the database file as one encrypted stream.
+        
+        The entries share a single stream, so they cost one write and are
+        replayed all or nothing.
+        
+        Args:
+            entries (List[Dict]): Journal entries to append
+            dead (int): Number of entries made obsolete by this append
+        """
+        encoded = (pack_entry(entry['op'], entry['ssid'], entry.get('security', ""),
+                              entry.get('sealed', b"")) for entry in entries)
+        stream = io.BytesIO()
+        try:
+            encrypt_stream(ChunkReader(encoded), stream, self.key)
+            self._writer.append(stream.getvalue())
+        except Exception:
+            self._invalidate_cache()
+            raise
+        
+        self._entry_count += len(entries)
+        self._dead_count += dead
+    
+    def _commit(self, records: Dict[str, Dict], entries: List[Dict], dead: int):
+        """
+        Persist changes already applied to the cached record index.
+        
+        Inside a transaction the changes are only buffered. In journal mode
+        they are appended as journal entries, and the file is compacted into
+        a new snapshot once dead entries pile up. Otherwise the whole vault
+        is rewritten.
+        
+        Args:
+            records (Dict[str, Dict]): Records keyed by SSID, already updated
+            entries (List[Dict]): Journal entries describing the changes
+            dead (int): Number of existing entries the changes make obsolete
+        """
+        if self._txn is not None:
+            self._txn['entries'].extend(entries)
+            self._txn['dead'] += dead
+            return
+        
+        if not entries:
+            return
+        
+        self._log_changes(entry['ssid'] for entry in entries)
+        self._index_changes(entries)
+        exists = self._writer.busy() or os.path.exists(self.path)
+        if not self.journal or self._needs_compaction or not exists:
+            self._save_data(records)
+            return
+        
+        self._append_journal(entries, dead)
+        if self._dead_count > max(JOURNAL_COMPACT_MIN_DEAD, len(records)):
+            self._save_data(records)
     
+    @contextmanager
+    def transaction(self):
+        """
+        Group changes so they are committed with a single write.
+        
+        Changes made inside the block are applied to the in-memory records
+        immediately but only written when the block exits. If the block
+        raises, the records are restored and nothing is written. Nested
+        transactions join the outermost one.
+        
+        Yields:
+            DatabaseManager: This database manager
+        """
+        with self._lock:
+            if self._txn is not None:
+                yield self
+                return
+            
+            records = self._load_data()
+            before = dict(records)
+            self._txn = {'records': records, 'entries': [], 'dead': 0}
+            try:
+                yield self
+                txn = self._txn
+                self._txn = None
+                self._commit(records, txn['entries'], txn['dead'])
+            except BaseException:
+                self._txn = None
+                records.clear()
+                records.update(before)
+                # An index built inside the block may hold the undone changes
+                self._drop_indexes()
+                raise
+    
+    @_synchronized
     def add_wifi(self, ssid: str, password: str, security: str) -> bool:
         """
         Add a new Wi-Fi credential to the database.
         
+        An existing entry with the same SSID is updated in place.
+        
+        Args:
+            ssid (str): Network SSID
+            password (str): Network password
+            security (str): Security type (WPA/WPA2/WEP)
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        return self.upsert_wifi(ssid, password, security)
+    
+    @_synchronized
+    def upsert_wifi(self, ssid: str, password: str, security: str) -> bool:
+        """
+        Insert or update a Wi-Fi credential by SSID.
+        
+        Updated entries keep their original position in the ordering.
+        
         Args:
             ssid (str): Network SSID
             password (str): Network password
@@ -151,29 +901,282 @@ class DatabaseManager:
             bool: True if successful, False otherwise
         """
         try:
-            data = self._load_data()
+            self._put(ssid, password, security)
+            return True
+        except Exception:
+            return False
+    
+    def _put(self, ssid: str, password: str, security: str):
+        """
+        Apply and commit an upsert, raising on failure.
+        
+        Args:
+            ssid (str): Network SSID
+            password (str): Network password
+            security (str): Security type (WPA/WPA2/WEP)
+        """
+        self._put_sealed(ssid, security, self._seal_password(password))
+    
+    def _put_sealed(self, ssid: str, security: str, sealed: bytes):
+        """
+        Apply and commit an upsert whose password is already sealed.
+        
+        Args:
+            ssid (str): Network SSID
+            security (str): Security type (WPA/WPA2/WEP)
+            sealed (bytes): Password sealed by _seal_password
             
-            # Check if SSID already exists
-            for item in data:
-                if item['ssid'] == ssid:
-                    # Update existing entry
-                    item['password'] = password
-                    item['security'] = security
-                    self._save_data(data)
-                    return True
+        Raises:
+            ValueError: If the SSID or security type is too long to store
+        """
+        check_entry_fields(ssid, security)
+        records = self._load_data()
+        dead = 1 if ssid in records else 0
+        entry = {
+            'op': 'put',
+            'ssid': ssid,
+            'security': security,
+            'sealed': sealed
+        }
+        self._apply_entry(records, entry)
+        self._commit(records, [entry], dead)
+    
+    @_synchronized
+    def add_many(self, records: Iterable[Dict]) -> List[Dict]:
+        """
+        Add or update many Wi-Fi credentials with a single write.
+        
+        Records are taken in batches whose passwords are sealed together,
+        on the worker pool when more than one worker is configured.
+        
+        Args:
+            records (Iterable[Dict]): Credentials with 'ssid', 'password'
+                and 'security' keys
             
-            # Add new entry
-            data.append({
-                'ssid': ssid,
-                'password': password,
-                'security': security
-            })
+        Returns:
+            List[Dict]: One result per record with its 'ssid', a 'status' of
+                'added', 'updated' or 'error', and an 'error' message
+        """
+        results = []
+        try:
+            with self.transaction():
+                existing = self._load_data()
+                for batch in _batched(records, AEAD_BATCH_SIZE * max(self.workers, 1)):
+                    valid = []
+                    for record in batch:
+                        ssid = record.get('ssid') if isinstance(record, dict) else None
+                        try:
+                            check_entry_fields(record['ssid'], record['security'])
+                            valid.append((len(results), record['ssid'], record['password'],
+                                          record['security']))
+                            results.append({'ssid': ssid, 'status': None, 'error': None})
+                        except (KeyError, TypeError, ValueError) as e:
+                            results.append({'ssid': ssid, 'status': 'error',
+                                            'error': f"Invalid record: {e}"})
+                    
+                    sealed = self._seal_passwords([password for _, _, password, _ in valid])
+                    for (index, ssid, _, security), password in zip(valid, sealed):
+                        results[index]['status'] = 'updated' if ssid in existing else 'added'
+                        self._put_sealed(ssid, security, password)
+        except Exception as e:
+            # Nothing was written, so every record failed
+            for result in results:
+                result['status'] = 'error'
+                result['error'] = result['error'] or str(e)
+        return results
+    
+    @_synchronized
+    def get_wifi(self, ssid: str, with_password: bool = True) -> Optional[Dict]:
+        """
+        Get a single Wi-Fi credential by SSID, decrypting its password.
+        
+        Args:
+            ssid (str): Network SSID
+            with_password (bool): Whether to decrypt and include the password
             
-            self._save_data(data)
-            return True
+        Returns:
+            Optional[Dict]: The credential, or None if not found
+        """
+        try:
+            record = self._load_data().get(ssid)
+            if record is None:
+                return None
+            return self._public_record(record, with_password)
+        except Exception:
+            return None
+    
+    @_synchronized
+    def get_ssids(self) -> List[str]:
+        """
+        Get every stored SSID in insertion order, without building records.
+        
+        Returns:
+            List[str]: SSIDs
+        """
+        try:
+            return list(self._load_data())
+        except Exception:
+            return []
+    
+    @_synchronized
+    def search_ssids(self, query: str) -> List[str]:
+        """
+        Find the stored SSIDs containing some text, ignoring case.
+        
+        The first search after the vault is loaded indexes every SSID; the
+        index then follows each commit, so later searches only look at the
+        SSIDs that share the query's rarest n-gram. Changes made inside an
+        open transaction are found once it commits.
+        
+        Args:
+            query (str): Text to look for; empty matches every SSID
+            
+        Returns:
+            List[str]: Matching SSIDs in insertion order; do not change the list
+        """
+        try:
+            records = self._load_data()
+            if self._search_index is None:
+                self._search_index = SsidSearchIndex(records)
+            return self._search_index.search(query)
+        except Exception:
+            return []
+    
+    @_synchronized
+    def sorted_ssids(self, column: str, descending: bool = False, query: str = "") -> List[str]:
+        """
+        List the stored SSIDs sorted by a column, optionally filtered by a search.
+        
+        Each column's order is sorted once, the first time it is asked for,
+        and then kept up to date by every commit, so changing column or
+        direction costs a list copy rather than a sort of the vault.
+        
+        Args:
+            column (str): A key of SORT_KEYS, such as 'ssid' or 'security'
+            descending (bool): Whether to sort from the largest value down
+            query (str): Only list SSIDs containing this text (see search_ssids)
+            
+        Returns:
+            List[str]: SSIDs in order
+        """
+        try:
+            records = self._load_data()
+            index = self._sort_indexes.get(column)
+            if index is None:
+                index = SortedIndex(SORT_KEYS[column], records.values())
+                self._sort_indexes[column] = index
+            if not query:
+                return index.ssids(descending)
+            return index.order(self.search_ssids(query), descending)
+        except Exception:
+            return []
+    
+    @_synchronized
+    def has_wifi(self, ssid: str) -> bool:
+        """
+        Check whether a Wi-Fi credential exists for an SSID.
+        
+        Args:
+            ssid (str): Network SSID
+            
+        Returns:
+            bool: True if the SSID is stored, False otherwise
+        """
+        try:
+            return ssid in self._load_data()
         except Exception:
             return False
     
+    def _public_record(self, record: Dict, with_password: bool) -> Dict:
+        """
+        Build the credential dict handed out to callers.
+        
+        Args:
+            record (Dict): Internal record with a sealed password
+            with_password (bool): Whether to decrypt and include the password
+            
+        Returns:
+            Dict: Credential with 'ssid', 'security' and optionally 'password'
+        """
+        item = {'ssid': record['ssid'], 'security': record['security']}
+        if with_password:
+            item['password'] = self._open_password(record['sealed'])
+        return item
+    
+    def iter_wifi(self, with_passwords: bool = False) -> Iterator[Dict]:
+        """
+        Stream Wi-Fi credentials one at a time in insertion order.
+        
+        Only SSID and security are returned unless passwords are requested,
+        in which case each password is decrypted as its record is reached,
+        or a batch at a time on the worker pool when there is one.
+        
+        Args:
+            with_passwords (bool): Whether to decrypt and include passwords
+            
+        Yields:
+            Dict: Credential with 'ssid', 'security' and optionally 'password'
+        """
+        try:
+            # Iterate over a snapshot, so other threads may change the
+            # records while the caller is consuming them
+            with self._lock:
+                records = list(self._load_data().values())
+        except Exception:
+            return
+        
+        if not with_passwords or self.workers <= 1:
+            for record in records:
+                yield self._public_record(record, with_passwords)
+            return
+        
+        for batch in _batched(records, AEAD_BATCH_SIZE * self.workers):
+            passwords = self._open_passwords([record['sealed'] for record in batch])
+            for record, password in zip(batch, passwords):
+                yield {'ssid': record['ssid'], 'security': record['security'],
+                       'password': password}
+    
+    @_synchronized
+    def changes_since(self, revision: Optional[int]) -> Tuple[int, Optional[Dict[str, Optional[Dict]]]]:
+        """
+        Get the credentials changed since a revision, for refreshing a view.
+        
+        Changes made through this manager are logged by SSID, so a view that
+        keeps the revision it shows only has to update the rows returned.
+        When the log no longer reaches back that far, for example after the
+        vault was reloaded because another process changed it, the caller
+        has to compare every record instead.
+        
+        Args:
+            revision (Optional[int]): Revision the caller last saw, or None
+            
+        Returns:
+            Tuple[int, Optional[Dict[str, Optional[Dict]]]]: (current revision,
+                changed credentials without passwords keyed by SSID, with None
+                for deleted ones, in the order they were first changed), where
+                the changes are None if they are not known
+        """
+        try:
+            records = self._load_data()
+        except Exception:
+            return self._revision, None
+        if revision is None or revision < self._changes_base:
+            return self._revision, None
+        
+        ssids = []
+        for changed, ssid in reversed(self._changes):
+            if changed <= revision:
+                break
+            ssids.append(ssid)
+        
+        changes = {}
+        for ssid in reversed(ssids):
+            if ssid not in changes:
+                record = records.get(ssid)
+                changes[ssid] = None if record is None else self._public_record(record, False)
+        return self._revision, changes
+    
+    @_synchronized
     def get_all_wifi(self) -> List[Dict]:
         """
         Get all Wi-Fi credentials from the database.
@@ -182,10 +1185,11 @@ class DatabaseManager:
             List[Dict]: List of Wi-Fi credentials
         """
         try:
-            return self._load_data()
+            return list(self.iter_wifi(with_passwords=True))
         except Exception:
             return []
     
+    @_synchronized
     def delete_wifi(self, ssid: str) -> bool:
         """
         Delete a Wi-Fi credential from the database.
@@ -197,16 +1201,16 @@ class DatabaseManager:
             bool: True if successful, False otherwise
         """
         try:
-            data = self._load_data()
+            records = self._load_data()
             
-            # Find and remove the entry
-            filtered_data = [item for item in data if item['ssid'] != ssid]
-            
-            # Check if anything was removed
-            if len(filtered_data) == len(data):
-                return False  # Nothing was removed
+            # Check if there is anything to remove
+            if ssid not in records:
+                return False
                 
-            self._save_data(filtered_data)
+            # The tombstone and the record it replaces are both dead
+            entry = {'op': 'del', 'ssid': ssid}
+            self._apply_entry(records, entry)
+            self._commit(records, [entry], 2)
             return True
         except Exception:
-            return False
\ No newline at end of file
+            return False
@@ -1,54 +1,804 @@
 import hashlib
+import hmac
 from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
-from Crypto.Protocol.KDF import PBKDF2
+from Crypto.Protocol.KDF import PBKDF2, scrypt
 import base64
 import os
+import time
+import struct
+from concurrent.futures import Executor
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence
 
-def derive_key(master_password: str, salt: bytes = None) -> tuple:
+# Key derivation parameters used by vaults that do not record their own
+LEGACY_KDF_PARAMS = {'name': 'pbkdf2-sha1', 'iterations': 100000, 'dklen': 32, 'salt_len': 16}
+
+# Parameters for new vaults when none are configured or calibrated
+DEFAULT_KDF_PARAMS = dict(LEGACY_KDF_PARAMS)
+
+KDF_NAMES = ('pbkdf2-sha1', 'scrypt')
+
+# Bounds on the cost a vault header may ask for, so a damaged or crafted
+# header cannot make an unlock run for hours or exhaust memory
+MIN_PBKDF2_ITERATIONS = 10000
+MAX_PBKDF2_ITERATIONS = 100000000
+MIN_SCRYPT_N = 2 ** 14
+MAX_SCRYPT_MEMORY = 1024 * 1024 * 1024
+
+# Unlock time calibrate_kdf aims for when no target is given
+DEFAULT_UNLOCK_SECONDS = 0.5
+
+def _scrypt_memory(n: int, r: int, p: int) -> int:
+    """Memory hashlib.scrypt needs for the given cost parameters."""
+    return 128 * r * (n + p + 2)
+
+def validate_kdf_params(params: Dict) -> Dict:
     """
-    Derive a key from the master password using PBKDF2.
+    Check key derivation parameters and fill in defaults.
+    
+    Args:
+        params (Dict): 'name' ('pbkdf2-sha1' or 'scrypt'), 'iterations' for
+            PBKDF2 or 'n', 'r' and 'p' for scrypt, and optionally 'dklen'
+            and 'salt_len'
+        
+    Returns:
+        Dict: Complete parameters
+        
+    Raises:
+        ValueError: If the parameters are unknown or out of bounds
+    """
+    try:
+        name = params['name']
+        checked = {'name': name, 'dklen': int(params.get('dklen', 32)),
+                   'salt_len': int(params.get('salt_len', 16))}
+        if name == 'pbkdf2-sha1':
+            checked['iterations'] = int(params['iterations'])
+        elif name == 'scrypt':
+            checked.update(n=int(params['n']), r=int(params.get('r', 8)), p=int(params.get('p', 1)))
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid key derivation parameters: {e}")
+    
+    if name not in KDF_NAMES:
+        raise ValueError(f"Unsupported key derivation function: {name}")
+    if checked['dklen'] != 32 or not 8 <= checked['salt_len'] <= 64:
+        raise ValueError("Invalid key or salt length")
+    if name == 'pbkdf2-sha1':
+        if not 1 <= checked['iterations'] <= MAX_PBKDF2_ITERATIONS:
+            raise ValueError("PBKDF2 iteration count out of range")
+    else:
+        n, r, p = checked['n'], checked['r'], checked['p']
+        if n < 2 or n & (n - 1) or r < 1 or p < 1:
+            raise ValueError("Invalid scrypt cost parameters")
+        if _scrypt_memory(n, r, p) > MAX_SCRYPT_MEMORY:
+            raise ValueError("scrypt parameters need too much memory")
+    return checked
+
+def _pbkdf2_hashlib(password: bytes, salt: bytes, params: Dict) -> bytes:
+    """PBKDF2-HMAC-SHA1 through hashlib, which uses OpenSSL where available."""
+    return hashlib.pbkdf2_hmac('sha1', password, salt, params['iterations'], params['dklen'])
+
+def _pbkdf2_pycryptodome(password: bytes, salt: bytes, params: Dict) -> bytes:
+    """PBKDF2-HMAC-SHA1 through pycryptodome."""
+    return PBKDF2(password, salt, dkLen=params['dklen'], count=params['iterations'])
+
+def _scrypt_hashlib(password: bytes, salt: bytes, params: Dict) -> bytes:
+    """scrypt through hashlib, which needs OpenSSL 1.1 or newer."""
+    n, r, p = params['n'], params['r'], params['p']
+    return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p,
+                          maxmem=_scrypt_memory(n, r, p) + 1024 * 1024, dklen=params['dklen'])
+
+def _scrypt_pycryptodome(password: bytes, salt: bytes, params: Dict) -> bytes:
+    """scrypt through pycryptodome."""
+    return scrypt(password, salt, params['dklen'], N=params['n'], r=params['r'], p=params['p'])
+
+# Interchangeable implementations of each key derivation function; every
+# backend of a function must produce byte-identical keys
+KDF_BACKENDS = {
+    'pbkdf2-sha1': {'hashlib': _pbkdf2_hashlib, 'pycryptodome': _pbkdf2_pycryptodome},
+    'scrypt': {'hashlib': _scrypt_hashlib, 'pycryptodome': _scrypt_pycryptodome},
+}
+
+# Backends of each function in the order they are preferred. At vault
+# cost pycryptodome's scrypt is 10-20% faster than OpenSSL's, while the
+# two PBKDF2s trade places between platforms and OpenSSL versions, so
+# OpenSSL's is used. hashlib is only used when it comes from OpenSSL,
+# since Pythons without it fall back to a slow pure-Python PBKDF2 and
+# have no scrypt at all
+KDF_BACKEND_PREFERENCE = {
+    'pbkdf2-sha1': ('hashlib', 'pycryptodome'),
+    'scrypt': ('pycryptodome', 'hashlib'),
+}
+
+# The hashlib function behind each key derivation function's hashlib backend
+_HASHLIB_FUNCTIONS = {'pbkdf2-sha1': 'pbkdf2_hmac', 'scrypt': 'scrypt'}
+
+# Parameters used to check that a backend works and agrees with
+# pycryptodome; far too cheap to time anything with
+_CHECK_PARAMS = {
+    'pbkdf2-sha1': {'name': 'pbkdf2-sha1', 'iterations': 1, 'dklen': 32, 'salt_len': 16},
+    'scrypt': {'name': 'scrypt', 'n': 2 ** 4, 'r': 8, 'p': 1, 'dklen': 32, 'salt_len': 16},
+}
+
+# Backend used for each function, chosen on first use
+_kdf_backend = {}
+
+def _preferred_backend(name: str) -> str:
+    """
+    Pick the first backend of a function in KDF_BACKEND_PREFERENCE that works.
+    
+    A backend is skipped if it is missing (hashlib without OpenSSL), fails,
+    or derives a different check key than pycryptodome.
+    """
+    backends = KDF_BACKENDS[name]
+    params = _CHECK_PARAMS[name]
+    reference = backends['pycryptodome'](b"check", b"\x00" * 16, params)
+    for backend in KDF_BACKEND_PREFERENCE[name]:
+        if backend == 'hashlib':
+            function = getattr(hashlib, _HASHLIB_FUNCTIONS[name], None)
+            if getattr(function, '__module__', None) != '_hashlib':
+                continue
+        try:
+            key = backends[backend](b"check", b"\x00" * 16, params)
+        except (ValueError, AttributeError, MemoryError):
+            continue
+        if key == reference:
+            return backend
+    return 'pycryptodome'
+
+def select_kdf_backends() -> Dict[str, str]:
+    """
+    Pick the backend of every key derivation function.
+    
+    This happens on its own the first time a function is used. The choice
+    is a fixed preference rather than a timing: timings short enough to
+    take at startup did not predict which backend is faster at a vault's
+    real cost.
+    
+    Returns:
+        Dict[str, str]: Backend name chosen for each function
+    """
+    for name in KDF_BACKENDS:
+        _kdf_backend[name] = _preferred_backend(name)
+    return dict(_kdf_backend)
+
+def get_kdf_backend(name: str) -> str:
+    """
+    Get the backend used for a key derivation function, choosing it on first use.
+    
+    Args:
+        name (str): Key derivation function name
+        
+    Returns:
+        str: Backend name
+    """
+    backend = _kdf_backend.get(name)
+    if backend is None:
+        backend = _kdf_backend[name] = _preferred_backend(name)
+    return backend
+
+def set_kdf_backend(name: str, backend: str):
+    """
+    Force a backend for a key derivation function.
+    
+    Args:
+        name (str): Key derivation function name
+        backend (str): Backend name from KDF_BACKENDS
+        
+    Raises:
+        ValueError: If the function or backend is unknown
+    """
+    if backend not in KDF_BACKENDS.get(name, {}):
+        raise ValueError(f"Unknown backend {backend!r} for {name!r}")
+    _kdf_backend[name] = backend
+
+def _password_bytes(master_password: str, name: str) -> bytes:
+    """
+    Encode the master password the way each function has always received it.
+    
+    PBKDF2 keys have been derived from the Latin-1 encoding (pycryptodome's
+    default), which cannot represent every password; those fall back to
+    UTF-8, which no earlier vault could have used. scrypt always uses UTF-8.
+    """
+    if name == 'pbkdf2-sha1':
+        try:
+            return master_password.encode('latin-1')
+        except UnicodeEncodeError:
+            pass
+    return master_password.encode('utf-8')
+
+def derive_key(master_password: str, salt: bytes = None, params: Optional[Dict] = None) -> tuple:
+    """
+    Derive a key from the master password using PBKDF2 or scrypt.
+    
+    The key is computed by the backend chosen for the function (see
+    get_kdf_backend); all backends give the same key.
     
     Args:
         master_password (str): The master password
         salt (bytes): Optional salt. If None, a new salt will be generated.
+        params (Dict): Key derivation parameters (see validate_kdf_params);
+            defaults to 100,000 rounds of PBKDF2-HMAC-SHA1
         
     Returns:
         tuple: (derived_key, salt)
     """
+    params = validate_kdf_params(params or DEFAULT_KDF_PARAMS)
     if salt is None:
-        salt = get_random_bytes(16)  # 128-bit salt
+        salt = get_random_bytes(params['salt_len'])
     
-    # Derive a 256-bit key using PBKDF2
-    key = PBKDF2(master_password, salt, dkLen=32, count=100000)
-    return key, salt
+    name = params['name']
+    function = KDF_BACKENDS[name][get_kdf_backend(name)]
+    return function(_password_bytes(master_password, name), salt, params), salt
 
-def encrypt_data(data: str, key: bytes) -> str:
+def _time_kdf(params: Dict, rounds: int = 2) -> float:
+    """Best time of a few derivations with the given parameters."""
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        derive_key("calibration", b"\x00" * params['salt_len'], params)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return max(best, 1e-6)
+
+def calibrate_kdf(target_seconds: float = DEFAULT_UNLOCK_SECONDS, name: str = 'pbkdf2-sha1',
+                  max_memory: int = 64 * 1024 * 1024) -> Dict:
     """
-    Encrypt data using AES-256 in CBC mode.
+    Pick the key derivation cost that takes about target_seconds here.
+    
+    A cheap probe derivation is timed and the cost scaled from it, so
+    calibration itself takes only a fraction of the target time. The cost
+    never drops below MIN_PBKDF2_ITERATIONS or MIN_SCRYPT_N.
     
     Args:
-        data (str): The data to encrypt
-        key (bytes): The encryption key
+        target_seconds (float): Desired unlock time on this machine
+        name (str): 'pbkdf2-sha1' or 'scrypt'
+        max_memory (int): Most memory scrypt may use, in bytes
         
     Returns:
-        str: Base64 encoded encrypted data (IV + ciphertext)
+        Dict: Parameters for derive_key
+    """
+    if name == 'pbkdf2-sha1':
+        probe = dict(DEFAULT_KDF_PARAMS, iterations=MIN_PBKDF2_ITERATIONS)
+        elapsed = _time_kdf(probe)
+        iterations = int(MIN_PBKDF2_ITERATIONS * target_seconds / elapsed) // 1000 * 1000
+        iterations = min(max(iterations, MIN_PBKDF2_ITERATIONS), MAX_PBKDF2_ITERATIONS)
+        return validate_kdf_params(dict(probe, iterations=iterations))
+    
+    if name == 'scrypt':
+        probe = {'name': 'scrypt', 'n': MIN_SCRYPT_N, 'r': 8, 'p': 1,
+                 'dklen': 32, 'salt_len': 16}
+        elapsed = _time_kdf(probe)
+        # scrypt time grows linearly with n, which must stay a power of two
+        n = MIN_SCRYPT_N
+        while (n * 2 * elapsed / MIN_SCRYPT_N <= target_seconds
+               and _scrypt_memory(n * 2, 8, 1) <= min(max_memory, MAX_SCRYPT_MEMORY)):
+            n *= 2
+        return validate_kdf_params(dict(probe, n=n))
+    
+    raise ValueError(f"Unsupported key derivation function: {name}")
+
+def make_key_verifier(key: bytes) -> str:
     """
-    # Convert data to bytes
-    data_bytes = data.encode('utf-8')
+    Build the verifier stored alongside the vault for a derived key.
     
-    # Create cipher
+    Args:
+        key (bytes): The derived key
+        
+    Returns:
+        str: Base64 encoded verifier
+    """
+    return base64.b64encode(key).decode('utf-8')
+
+def check_key_verifier(key: bytes, verifier: str) -> bool:
+    """
+    Check a derived key against a stored verifier without deriving again.
+    
+    Args:
+        key (bytes): The derived key
+        verifier (str): The stored verifier
+        
+    Returns:
+        bool: True if the key matches the verifier, False otherwise
+    """
+    return hmac.compare_digest(make_key_verifier(key), verifier)
+
+def key_check_value(key: bytes) -> bytes:
+    """
+    Compute the value stored in a vault to recognise its key.
+    
+    Unlike the legacy verifier, this is a one-way HMAC of the key, so it
+    does not reveal the key itself.
+    
+    Args:
+        key (bytes): The derived key
+        
+    Returns:
+        bytes: 32-byte check value
+    """
+    return hmac.new(key, b"wifi-password-manager key check", hashlib.sha256).digest()
+
+def encrypt_bytes(data: bytes, key: bytes) -> bytes:
+    """
+    Encrypt raw bytes using AES-256 in CBC mode.
+    
+    Args:
+        data (bytes): The data to encrypt
+        key (bytes): The encryption key
+        
+    Returns:
+        bytes: IV + ciphertext
+    """
     cipher = AES.new(key, AES.MODE_CBC)
     
     # Pad data to be multiple of 16 bytes (AES block size)
-    padding_length = 16 - (len(data_bytes) % 16)
-    data_bytes += bytes([padding_length]) * padding_length
+    padding_length = 16 - (len(data) % 16)
+    padded = data + bytes([padding_length]) * padding_length
+    
+    return cipher.iv + cipher.encrypt(padded)
+
+def decrypt_bytes(encrypted: bytes, key: bytes) -> bytes:
+    """
+    Decrypt raw bytes produced by encrypt_bytes.
+    
+    Args:
+        encrypted (bytes): IV + ciphertext (any bytes-like object)
+        key (bytes): The decryption key
+        
+    Returns:
+        bytes: Decrypted data
+        
+    Raises:
+        ValueError: If the data is not a valid ciphertext for this key
+    """
+    encrypted = memoryview(encrypted)
+    if len(encrypted) < 32 or len(encrypted) % 16:
+        raise ValueError("Invalid ciphertext length")
+    
+    cipher = AES.new(key, AES.MODE_CBC, iv=encrypted[:16])
+    return remove_padding(cipher.decrypt(encrypted[16:]))
+
+def remove_padding(decrypted: bytes) -> bytes:
+    """
+    Strip the padding encrypt_bytes adds to the last block.
+    
+    Args:
+        decrypted (bytes): Decrypted data ending with the padded last block
+        
+    Returns:
+        bytes: The data without its padding
+        
+    Raises:
+        ValueError: If the padding is invalid
+    """
+    padding_length = decrypted[-1] if decrypted else 0
+    if not 1 <= padding_length <= 16:
+        raise ValueError("Invalid padding")
+    return decrypted[:-padding_length]
+
+def cbc_decryptor(key: bytes, iv: bytes):
+    """
+    Start an AES-256-CBC decryption that is fed one piece at a time.
+    
+    Args:
+        key (bytes): The decryption key
+        iv (bytes): The IV, or when starting part way through, the
+            ciphertext block before the first piece
+        
+    Returns:
+        A cipher whose decrypt() takes whole blocks and carries the chaining
+        state from one call to the next; padding is left for remove_padding
+    """
+    return AES.new(key, AES.MODE_CBC, iv=iv)
+
+# Version byte at the start of every AEAD blob
+AEAD_VERSION = 2
+AEAD_NONCE_SIZE = 12
+AEAD_TAG_SIZE = 16
+
+def aead_encrypt(data: bytes, key: bytes, associated_data: bytes = b"") -> bytes:
+    """
+    Encrypt and authenticate data using AES-256 in GCM mode.
+    
+    Args:
+        data (bytes): The data to encrypt
+        key (bytes): The encryption key
+        associated_data (bytes): Data authenticated but not encrypted
+        
+    Returns:
+        bytes: Version byte + nonce + ciphertext + tag
+    """
+    cipher = AES.new(key, AES.MODE_GCM, nonce=get_random_bytes(AEAD_NONCE_SIZE))
+    header = bytes([AEAD_VERSION]) + cipher.nonce
+    cipher.update(header + associated_data)
+    ciphertext, tag = cipher.encrypt_and_digest(data)
+    return header + ciphertext + tag
+
+def aead_decrypt(encrypted: bytes, key: bytes, associated_data: bytes = b"") -> bytes:
+    """
+    Verify and decrypt data produced by aead_encrypt.
+    
+    The tag is checked before anything is returned, so a wrong key or any
+    corruption is rejected without handing garbage to a parser.
+    
+    Args:
+        encrypted (bytes): Version byte + nonce + ciphertext + tag
+        key (bytes): The decryption key
+        associated_data (bytes): Data that was authenticated with it
+        
+    Returns:
+        bytes: Decrypted data
+        
+    Raises:
+        ValueError: If the data is malformed, corrupted or the key is wrong
+    """
+    encrypted = memoryview(encrypted)
+    header_size = 1 + AEAD_NONCE_SIZE
+    if len(encrypted) < header_size + AEAD_TAG_SIZE or encrypted[0] != AEAD_VERSION:
+        raise ValueError("Invalid AEAD data")
+    
+    cipher = AES.new(key, AES.MODE_GCM, nonce=encrypted[1:header_size])
+    cipher.update(bytes(encrypted[:header_size]) + associated_data)
+    return cipher.decrypt_and_verify(encrypted[header_size:-AEAD_TAG_SIZE],
+                                     encrypted[-AEAD_TAG_SIZE:])
+
+AEAD_HEADER_SIZE = 1 + AEAD_NONCE_SIZE
+AEAD_OVERHEAD = AEAD_HEADER_SIZE + AEAD_TAG_SIZE
+
+def aead_encrypt_into(data: bytes, key: bytes, out: bytearray, associated_data: bytes = b"") -> int:
+    """
+    Encrypt like aead_encrypt, writing the blob into a preallocated buffer.
+    
+    The ciphertext is written straight into out, so no intermediate
+    copies of the data are made; out can be reused for every call.
     
-    # Encrypt data
-    ciphertext = cipher.encrypt(data_bytes)
+    Args:
+        data (bytes): The data to encrypt (any bytes-like object)
+        key (bytes): The encryption key
+        out (bytearray): Writable buffer of at least len(data) + AEAD_OVERHEAD
+            bytes, or a memoryview slice of one
+        associated_data (bytes): Data authenticated but not encrypted
+        
+    Returns:
+        int: Number of bytes written to the start of out
+        
+    Raises:
+        ValueError: If out is too small
+    """
+    size = len(data) + AEAD_OVERHEAD
+    out = memoryview(out)
+    if len(out) < size:
+        raise ValueError("Output buffer too small")
+    
+    nonce = get_random_bytes(AEAD_NONCE_SIZE)
+    out[0] = AEAD_VERSION
+    out[1:AEAD_HEADER_SIZE] = nonce
+    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+    cipher.update(out[:AEAD_HEADER_SIZE])
+    if associated_data:
+        cipher.update(associated_data)
+    cipher.encrypt(data, output=out[AEAD_HEADER_SIZE:size - AEAD_TAG_SIZE])
+    out[size - AEAD_TAG_SIZE:size] = cipher.digest()
+    return size
+
+def aead_decrypt_into(encrypted: bytes, key: bytes, out: bytearray,
+                      associated_data: bytes = b"") -> int:
+    """
+    Verify and decrypt like aead_decrypt, writing into a preallocated buffer.
     
-    # Combine IV and ciphertext
-    encrypted_data = cipher.iv + ciphertext
+    Args:
+        encrypted (bytes): Blob from aead_encrypt, or a memoryview slice of
+            a larger buffer
+        key (bytes): The decryption key
+        out (bytearray): Writable buffer of at least
+            len(encrypted) - AEAD_OVERHEAD bytes
+        associated_data (bytes): Data that was authenticated with it
+        
+    Returns:
+        int: Number of plaintext bytes written to the start of out
+        
+    Raises:
+        ValueError: If out is too small, or the data is malformed, corrupted
+            or the key is wrong; out then holds no plaintext
+    """
+    encrypted = memoryview(encrypted)
+    if len(encrypted) < AEAD_OVERHEAD or encrypted[0] != AEAD_VERSION:
+        raise ValueError("Invalid AEAD data")
+    size = len(encrypted) - AEAD_OVERHEAD
+    out = memoryview(out)
+    if len(out) < size:
+        raise ValueError("Output buffer too small")
+    
+    cipher = AES.new(key, AES.MODE_GCM, nonce=encrypted[1:AEAD_HEADER_SIZE])
+    cipher.update(encrypted[:AEAD_HEADER_SIZE])
+    if associated_data:
+        cipher.update(associated_data)
+    cipher.decrypt(encrypted[AEAD_HEADER_SIZE:-AEAD_TAG_SIZE], output=out[:size])
+    try:
+        cipher.verify(encrypted[-AEAD_TAG_SIZE:])
+    except ValueError:
+        # Never leave unauthenticated plaintext behind
+        out[:size] = bytes(size)
+        raise
+    return size
+
+# Size of the random key that encrypts a vault, and the associated data that
+# binds a wrapped copy of it to its purpose
+DATA_KEY_SIZE = 32
+KEY_WRAP_AAD = b"WPMV data key"
+
+def generate_data_key() -> bytes:
+    """
+    Generate a random data encryption key.
+    
+    Returns:
+        bytes: A new DATA_KEY_SIZE-byte key
+    """
+    return get_random_bytes(DATA_KEY_SIZE)
+
+def wrap_key(data_key: bytes, wrapping_key: bytes) -> bytes:
+    """
+    Encrypt a data key with a key derived from the master password.
+    
+    Args:
+        data_key (bytes): The data encryption key
+        wrapping_key (bytes): The key encryption key
+        
+    Returns:
+        bytes: The wrapped key, as produced by aead_encrypt
+    """
+    return aead_encrypt(data_key, wrapping_key, KEY_WRAP_AAD)
+
+def unwrap_key(wrapped: bytes, wrapping_key: bytes) -> bytes:
+    """
+    Decrypt a data key wrapped by wrap_key.
+    
+    Args:
+        wrapped (bytes): The wrapped key
+        wrapping_key (bytes): The key encryption key
+        
+    Returns:
+        bytes: The data encryption key
+        
+    Raises:
+        ValueError: If the wrapping key is wrong or the wrapped key is corrupt
+    """
+    data_key = aead_decrypt(wrapped, wrapping_key, KEY_WRAP_AAD)
+    if len(data_key) != DATA_KEY_SIZE:
+        raise ValueError("Invalid data key")
+    return data_key
+
+# Items handed to a worker at a time by the *_many functions
+AEAD_BATCH_SIZE = 256
+
+def _aead_encrypt_batch(items: List[bytes], key: bytes) -> List[bytes]:
+    """Encrypt a batch of items; runs in a pool worker."""
+    return [aead_encrypt(item, key) for item in items]
+
+def _aead_decrypt_batch(items: List[bytes], key: bytes) -> List[bytes]:
+    """Decrypt a batch of items; runs in a pool worker."""
+    return [aead_decrypt(item, key) for item in items]
+
+def _map_batches(function, items: Sequence[bytes], key: bytes,
+                 executor: Optional[Executor], batch_size: int) -> List[bytes]:
+    """Apply a batch function to items, in parallel if an executor is given."""
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    if executor is None or len(batches) < 2:
+        return [result for batch in batches for result in function(batch, key)]
+    # Executor.map yields in submission order and re-raises a worker's
+    # exception when its batch is reached
+    results = executor.map(function, batches, [key] * len(batches))
+    return [result for batch in results for result in batch]
+
+def aead_encrypt_many(items: Sequence[bytes], key: bytes, executor: Optional[Executor] = None,
+                      batch_size: int = AEAD_BATCH_SIZE) -> List[bytes]:
+    """
+    Encrypt many items with aead_encrypt, optionally on a worker pool.
+    
+    Items are split into batches so each task is worth sending to a
+    thread or process; results come back in input order.
+    
+    Args:
+        items (Sequence[bytes]): Data to encrypt
+        key (bytes): The encryption key
+        executor (Executor): Optional thread or process pool
+        batch_size (int): Items per task
+        
+    Returns:
+        List[bytes]: One encrypted blob per item, in order
+    """
+    return _map_batches(_aead_encrypt_batch, items, key, executor, batch_size)
+
+def aead_decrypt_many(items: Sequence[bytes], key: bytes, executor: Optional[Executor] = None,
+                      batch_size: int = AEAD_BATCH_SIZE) -> List[bytes]:
+    """
+    Decrypt many items with aead_decrypt, optionally on a worker pool.
+    
+    Args:
+        items (Sequence[bytes]): Blobs produced by aead_encrypt
+        key (bytes): The decryption key
+        executor (Executor): Optional thread or process pool
+        batch_size (int): Items per task
+        
+    Returns:
+        List[bytes]: One plaintext per item, in order
+        
+    Raises:
+        ValueError: For the first item, in input order, that fails to decrypt
+    """
+    return _map_batches(_aead_decrypt_batch, items, key, executor, batch_size)
+
+# Streams are cut into chunks that are sealed separately, so memory use
+# does not depend on the payload size. Each chunk is framed as a length,
+# a flags byte and an AEAD blob; the chunk's index and flags are
+# authenticated, so reordered, dropped or truncated chunks are detected.
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_FINAL = 0x01
+MAX_STREAM_FRAME = 16 * 1024 * 1024
+_STREAM_FRAME = struct.Struct(">I")
+_STREAM_AAD = struct.Struct(">QB")
+
+class TruncatedStreamError(ValueError):
+    """Raised when a stream ends before its final chunk."""
+
+def _read_full(src: BinaryIO, size: int) -> bytes:
+    """Read exactly size bytes unless the end of the stream comes first."""
+    data = src.read(size)
+    if len(data) == size or not data:
+        return data
+    parts = [data]
+    remaining = size - len(data)
+    while remaining:
+        data = src.read(remaining)
+        if not data:
+            break
+        parts.append(data)
+        remaining -= len(data)
+    return b''.join(parts)
+
+def _read_into(src: BinaryIO, buffer: bytearray) -> int:
+    """Fill buffer from src unless the end of the stream comes first."""
+    view = memoryview(buffer)
+    filled = 0
+    readinto = getattr(src, 'readinto', None)
+    while filled < len(view):
+        if readinto is not None:
+            count = readinto(view[filled:])
+        else:
+            data = src.read(len(view) - filled)
+            count = len(data)
+            view[filled:filled + count] = data
+        if not count:
+            break
+        filled += count
+    return filled
+
+def encrypt_stream(src: BinaryIO, dst: BinaryIO, key: bytes,
+                   chunk_size: int = STREAM_CHUNK_SIZE, associated_data: bytes = b"") -> int:
+    """
+    Encrypt everything read from src into a chunked AEAD stream on dst.
+    
+    Two plaintext buffers and one frame buffer are allocated up front and
+    reused for every chunk: src is read into them with readinto where it
+    has one, and each chunk is encrypted straight into the frame buffer.
+    One chunk is read ahead to know which chunk is the last. An empty input
+    produces a single empty final chunk.
+    
+    Args:
+        src (BinaryIO): Object with a readinto(buffer) or read(size) method
+        dst (BinaryIO): Object with a write(bytes) method
+        key (bytes): The encryption key
+        chunk_size (int): Plaintext bytes per chunk
+        associated_data (bytes): Data authenticated with every chunk
+        
+    Returns:
+        int: Number of plaintext bytes encrypted
+    """
+    if not 0 < chunk_size <= MAX_STREAM_FRAME // 2:
+        raise ValueError("Invalid chunk size")
+    
+    chunk, following = bytearray(chunk_size), bytearray(chunk_size)
+    frame = bytearray(_STREAM_FRAME.size + 1 + chunk_size + AEAD_OVERHEAD)
+    frame_view = memoryview(frame)
+    header_size = _STREAM_FRAME.size + 1
+    
+    index = 0
+    total = 0
+    length = _read_into(src, chunk)
+    while True:
+        following_length = _read_into(src, following) if length == chunk_size else 0
+        flags = 0 if following_length else STREAM_FINAL
+        size = aead_encrypt_into(memoryview(chunk)[:length], key, frame_view[header_size:],
+                                 _STREAM_AAD.pack(index, flags) + associated_data)
+        _STREAM_FRAME.pack_into(frame, 0, size + 1)
+        frame[_STREAM_FRAME.size] = flags
+        dst.write(frame_view[:header_size + size])
+        total += length
+        if flags & STREAM_FINAL:
+            return total
+        chunk, following = following, chunk
+        length = following_length
+        index += 1
+
+def iter_decrypt_stream(src: BinaryIO, key: bytes, associated_data: bytes = b"") -> Iterator[bytes]:
+    """
+    Decrypt a stream written by encrypt_stream one chunk at a time.
+    
+    Reading stops right after the final chunk, so several streams can be
+    stored back to back. Each chunk is verified before it is yielded, but
+    a later chunk can still fail, so callers must not treat the output as
+    complete until the iterator is exhausted.
+    
+    Args:
+        src (BinaryIO): Object with a readinto(buffer) or read(size) method
+        key (bytes): The decryption key
+        associated_data (bytes): Data that was authenticated with the stream
+        
+    Yields:
+        bytearray: Plaintext chunks
+        
+    Raises:
+        TruncatedStreamError: If the stream ends before its final chunk
+        ValueError: If a chunk is malformed, corrupted or the key is wrong
+    """
+    # Frames are read into one reused buffer; each chunk is decrypted into
+    # a buffer of its own, which belongs to the caller once yielded
+    payload = bytearray()
+    index = 0
+    while True:
+        prefix = _read_full(src, _STREAM_FRAME.size)
+        if len(prefix) < _STREAM_FRAME.size:
+            raise TruncatedStreamError("Stream ended before its final chunk")
+        (length,) = _STREAM_FRAME.unpack(prefix)
+        if not 2 + AEAD_NONCE_SIZE + AEAD_TAG_SIZE <= length <= MAX_STREAM_FRAME:
+            raise ValueError("Invalid stream chunk length")
+        if len(payload) < length:
+            payload = bytearray(length)
+        view = memoryview(payload)[:length]
+        if _read_into(src, view) < length:
+            raise TruncatedStreamError("Stream ended inside a chunk")
+        
+        flags = view[0]
+        chunk = bytearray(length - 1 - AEAD_OVERHEAD)
+        aead_decrypt_into(view[1:], key, chunk, _STREAM_AAD.pack(index, flags) + associated_data)
+        yield chunk
+        if flags & STREAM_FINAL:
+            return
+        index += 1
+
+def decrypt_stream(src: BinaryIO, dst: BinaryIO, key: bytes, associated_data: bytes = b"") -> int:
+    """
+    Decrypt a stream written by encrypt_stream into dst.
+    
+    Chunks are written as soon as they are verified; if an exception is
+    raised, dst holds a prefix of the plaintext and must be discarded.
+    
+    Args:
+        src (BinaryIO): Object with a readinto(buffer) or read(size) method
+        dst (BinaryIO): Object with a write(bytes) method
+        key (bytes): The decryption key
+        associated_data (bytes): Data that was authenticated with the stream
+        
+    Returns:
+        int: Number of plaintext bytes written
+    """
+    total = 0
+    for chunk in iter_decrypt_stream(src, key, associated_data):
+        dst.write(chunk)
+        total += len(chunk)
+    return total
+
+def encrypt_data(data: str, key: bytes) -> str:
+    """
+    Encrypt data using AES-256 in CBC mode.
+    
+    Args:
+        data (str): The data to encrypt
+        key (bytes): The encryption key
+        
+    Returns:
+        str: Base64 encoded encrypted data (IV + ciphertext)
+    """
+    encrypted_data = encrypt_bytes(data.encode('utf-8'), key)
     
     # Return base64 encoded result
     return base64.b64encode(encrypted_data).decode('utf-8')
@@ -67,19 +817,5 @@ def decrypt_data(encrypted_data: str, key: bytes) -> str:
     # Decode base64
     encrypted_bytes = base64.b64decode(encrypted_data)
     
-    # Extract IV and ciphertext
-    iv = encrypted_bytes[:16]
-    ciphertext = encrypted_bytes[16:]
-    
-    # Create cipher
-    cipher = AES.new(key, AES.MODE_CBC, iv=iv)
-    
-    # Decrypt data
-    decrypted_data = cipher.decrypt(ciphertext)
-    
-    # Remove padding
-    padding_length = decrypted_data[-1]
-    decrypted_data = decrypted_data[:-padding_length]
-    
     # Return decoded string
-    return decrypted_data.decode('utf-8')
\ No newline at end of file
+    return decrypt_bytes(encrypted_bytes, key).decode('utf-8')
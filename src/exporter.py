@@ -0,0 +1,135 @@
+import csv
+import json
+from fnmatch import fnmatchcase
+from typing import Dict, Iterable, Iterator, Optional, TextIO
+
+EXPORT_FORMATS = ("csv", "jsonl", "wpa_supplicant")
+
+CSV_FIELDS = ["ssid", "password", "security"]
+
+def iter_export_records(db_manager, ssids: Optional[Iterable[str]] = None,
+                        pattern: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Stream Wi-Fi credentials to export, decrypting one password at a time.
+    
+    Args:
+        db_manager (DatabaseManager): Unlocked database manager
+        ssids (Iterable[str]): Optional exact SSIDs to export
+        pattern (str): Optional shell-style pattern SSIDs must match
+    
+    Yields:
+        Dict: Credentials with 'ssid', 'password' and 'security' keys
+    """
+    if ssids is not None:
+        records = (db_manager.get_wifi(ssid) for ssid in ssids)
+        records = (record for record in records if record is not None)
+    else:
+        records = db_manager.iter_wifi(with_passwords=True)
+    
+    for record in records:
+        if pattern is None or fnmatchcase(record['ssid'], pattern):
+            yield record
+
+def write_csv(records: Iterable[Dict], fileobj: TextIO) -> int:
+    """
+    Write credentials as CSV with a header row.
+    
+    Args:
+        records (Iterable[Dict]): Credentials to write
+        fileobj (TextIO): Text file object opened with newline=''
+    
+    Returns:
+        int: Number of records written
+    """
+    writer = csv.DictWriter(fileobj, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    count = 0
+    for record in records:
+        writer.writerow(record)
+        count += 1
+    return count
+
+def write_jsonl(records: Iterable[Dict], fileobj: TextIO) -> int:
+    """
+    Write credentials as JSON Lines, one object per line.
+    
+    Args:
+        records (Iterable[Dict]): Credentials to write
+        fileobj (TextIO): Text file object
+    
+    Returns:
+        int: Number of records written
+    """
+    count = 0
+    for record in records:
+        fileobj.write(json.dumps({field: record[field] for field in CSV_FIELDS}) + "\n")
+        count += 1
+    return count
+
+def _wpa_string(value: str) -> str:
+    """Quote a wpa_supplicant string, falling back to hex when quoting is unsafe."""
+    if value.isprintable() and '"' not in value:
+        return f'"{value}"'
+    return value.encode('utf-8').hex()
+
+def _wpa_network_block(record: Dict) -> str:
+    """Format one credential as a wpa_supplicant network block."""
+    security = record['security'].upper()
+    lines = ["network={", f"\tssid={_wpa_string(record['ssid'])}"]
+    if security == "NOPASS":
+        lines.append("\tkey_mgmt=NONE")
+    elif security == "WEP":
+        password = record['password']
+        is_hex = len(password) in (10, 26) and all(c in "0123456789abcdefABCDEF" for c in password)
+        lines.append("\tkey_mgmt=NONE")
+        lines.append(f"\twep_key0={password if is_hex else _wpa_string(password)}")
+        lines.append("\twep_tx_keyidx=0")
+    else:
+        if security == "WPA":
+            lines.append("\tproto=WPA")
+        lines.append("\tkey_mgmt=WPA-PSK")
+        lines.append(f"\tpsk=\"{record['password']}\"")
+    lines.append("}")
+    return "\n".join(lines) + "\n\n"
+
+def write_wpa_supplicant(records: Iterable[Dict], fileobj: TextIO) -> int:
+    """
+    Write credentials as wpa_supplicant.conf network blocks.
+    
+    Args:
+        records (Iterable[Dict]): Credentials to write
+        fileobj (TextIO): Text file object
+    
+    Returns:
+        int: Number of records written
+    """
+    count = 0
+    for record in records:
+        fileobj.write(_wpa_network_block(record))
+        count += 1
+    return count
+
+WRITERS = {
+    "csv": write_csv,
+    "jsonl": write_jsonl,
+    "wpa_supplicant": write_wpa_supplicant,
+}
+
+def export_wifi(db_manager, fileobj: TextIO, fmt: str = "csv",
+                ssids: Optional[Iterable[str]] = None, pattern: Optional[str] = None) -> int:
+    """
+    Export Wi-Fi credentials to a file object, one record at a time.
+    
+    Args:
+        db_manager (DatabaseManager): Unlocked database manager
+        fileobj (TextIO): Text file object to write to
+        fmt (str): Output format (csv/jsonl/wpa_supplicant)
+        ssids (Iterable[str]): Optional exact SSIDs to export
+        pattern (str): Optional shell-style pattern SSIDs must match
+    
+    Returns:
+        int: Number of records written
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    return WRITERS[fmt](iter_export_records(db_manager, ssids, pattern), fileobj)
@@ -0,0 +1,311 @@
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional
+from utils import validate_ssid, validate_password, validate_security_type
+
+NM_SUFFIX = ".nmconnection"
+WPA_SUPPLICANT_SUFFIX = ".conf"
+
+# NetworkManager key-mgmt values and the security type they are stored as
+NM_KEY_MGMT = {
+    "wpa-psk": "WPA2",
+    "sae": "WPA",
+    "owe": "NOPASS",
+}
+
+# wpa_supplicant key_mgmt values and the security type they are stored as
+WPA_KEY_MGMT = {
+    "WPA-PSK": "WPA2",
+    "WPA-PSK-SHA256": "WPA2",
+    "SAE": "WPA",
+    "OWE": "NOPASS",
+}
+
+# Escapes GKeyFile allows in keyfile values, and the characters they stand for
+NM_ESCAPES = {
+    's': ' ',
+    'n': '\n',
+    't': '\t',
+    'r': '\r',
+    '\\': '\\',
+    ';': ';',
+}
+NM_ESCAPE = re.compile(r'\\(.)')
+
+def iter_config_files(paths: Iterable[str]) -> Iterator[str]:
+    """
+    Walk files and directories and yield the network config files found.
+    
+    Directories are walked lazily, one directory listing at a time, so very
+    large trees are never held in memory. Symlinked directories are
+    followed, but each directory is only walked once, so a link back up
+    the tree does not loop forever.
+    
+    Args:
+        paths (Iterable[str]): Files or directories to import from
+    
+    Yields:
+        str: Path to a NetworkManager keyfile or wpa_supplicant config
+    """
+    visited = set()
+    for path in paths:
+        yield from _walk_config_path(path, visited)
+
+def _walk_config_path(path: str, visited: set) -> Iterator[str]:
+    """Yield the config files under a path, skipping directories in visited."""
+    if not os.path.isdir(path):
+        yield path
+        return
+    info = os.stat(path)
+    if (info.st_dev, info.st_ino) in visited:
+        return
+    visited.add((info.st_dev, info.st_ino))
+    with os.scandir(path) as entries:
+        names = sorted(entry.name for entry in entries)
+    for name in names:
+        child = os.path.join(path, name)
+        if os.path.isdir(child) or name.endswith((NM_SUFFIX, WPA_SUPPLICANT_SUFFIX)):
+            yield from _walk_config_path(child, visited)
+
+def _candidate(path: str, line: int, ssid: Optional[str] = None, password: str = "",
+               security: Optional[str] = None, error: Optional[str] = None) -> Dict:
+    """Build a parsed network entry, remembering where it came from."""
+    return {
+        'ssid': ssid,
+        'password': password,
+        'security': security,
+        'file': path,
+        'line': line,
+        'error': error
+    }
+
+def _unescape_nm_value(value: str) -> str:
+    """Undo the backslash escapes GKeyFile writes in keyfile values."""
+    return NM_ESCAPE.sub(lambda match: NM_ESCAPES.get(match.group(1), match.group(0)), value)
+
+def _decode_nm_ssid(value: str) -> str:
+    """Decode a keyfile SSID, which older versions write as a byte list."""
+    parts = value.rstrip(';').split(';')
+    if len(parts) > 1 and all(part.strip().isdigit() for part in parts):
+        return bytes(int(part) for part in parts).decode('utf-8', 'replace')
+    return _unescape_nm_value(value)
+
+def parse_nmconnection(path: str) -> Iterator[Dict]:
+    """
+    Parse a NetworkManager keyfile into a network entry.
+    
+    Args:
+        path (str): Path to a *.nmconnection file
+    
+    Yields:
+        Dict: Parsed entry with 'ssid', 'password', 'security', 'file',
+            'line' and an 'error' message if it cannot be imported
+    """
+    section = None
+    values = {}
+    lines = {}
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for number, raw in enumerate(f, start=1):
+            line = raw.strip()
+            if not line or line.startswith(('#', ';')):
+                continue
+            if line.startswith('[') and line.endswith(']'):
+                section = line[1:-1].strip()
+                continue
+            key, sep, value = line.partition('=')
+            if not sep or section is None:
+                continue
+            name = f"{section}.{key.strip()}"
+            values[name] = value.strip()
+            lines[name] = number
+    
+    if values.get('connection.type', '802-11-wireless') not in ('wifi', '802-11-wireless'):
+        return
+    
+    ssid_key = 'wifi.ssid' if 'wifi.ssid' in values else '802-11-wireless.ssid'
+    line = lines.get(ssid_key, 1)
+    if ssid_key not in values:
+        yield _candidate(path, line, error="No SSID in keyfile")
+        return
+    ssid = _decode_nm_ssid(values[ssid_key])
+    
+    security_values = {name.split('.', 1)[1]: value for name, value in values.items()
+                       if name.split('.', 1)[0] in ('wifi-security', '802-11-wireless-security')}
+    key_mgmt = security_values.get('key-mgmt')
+    
+    if key_mgmt is None:
+        yield _candidate(path, line, ssid, "", "NOPASS")
+    elif key_mgmt == 'none':
+        # Static WEP keys are configured with key-mgmt=none
+        password = _unescape_nm_value(security_values.get('wep-key0', ""))
+        yield _candidate(path, line, ssid, password, "WEP" if password else "NOPASS")
+    elif key_mgmt in NM_KEY_MGMT:
+        security = NM_KEY_MGMT[key_mgmt]
+        # proto is a list, such as "wpa;" or "wpa;rsn;"; any WPA1 is stored as WPA
+        if key_mgmt == 'wpa-psk' and 'wpa' in security_values.get('proto', "").split(';'):
+            security = "WPA"
+        password = _unescape_nm_value(security_values.get('psk', ""))
+        if security != "NOPASS" and not password:
+            yield _candidate(path, line, ssid, error="Password is not stored in the keyfile")
+        else:
+            yield _candidate(path, line, ssid, password, security)
+    else:
+        yield _candidate(path, line, ssid, error=f"Unsupported key-mgmt '{key_mgmt}'")
+
+def _unquote(value: str) -> Optional[str]:
+    """Return the contents of a quoted wpa_supplicant string, or None."""
+    if len(value) >= 2 and value.startswith('"') and value.endswith('"'):
+        return value[1:-1]
+    return None
+
+def _wpa_network(path: str, line: int, values: Dict[str, str]) -> Dict:
+    """Map the fields of one wpa_supplicant network block to an entry."""
+    raw_ssid = values.get('ssid')
+    if raw_ssid is None:
+        return _candidate(path, line, error="Network block has no ssid")
+    ssid = _unquote(raw_ssid)
+    if ssid is None:
+        try:
+            ssid = bytes.fromhex(raw_ssid).decode('utf-8')
+        except ValueError:
+            return _candidate(path, line, error="Invalid hex ssid")
+    
+    key_mgmt = values.get('key_mgmt', 'WPA-PSK WPA-EAP').split()
+    if 'NONE' in key_mgmt:
+        index = values.get('wep_tx_keyidx', '0')
+        raw_key = values.get(f'wep_key{index}')
+        if raw_key is None:
+            return _candidate(path, line, ssid, "", "NOPASS")
+        key = _unquote(raw_key)
+        return _candidate(path, line, ssid, raw_key if key is None else key, "WEP")
+    
+    for mgmt in key_mgmt:
+        if mgmt in WPA_KEY_MGMT:
+            security = WPA_KEY_MGMT[mgmt]
+            if security == "NOPASS":
+                return _candidate(path, line, ssid, "", security)
+            if mgmt.startswith('WPA-PSK') and values.get('proto', '').split() == ['WPA']:
+                security = "WPA"
+            raw_psk = values.get('sae_password' if mgmt == 'SAE' and 'sae_password' in values else 'psk')
+            if raw_psk is None:
+                return _candidate(path, line, ssid, error="Network block has no psk")
+            psk = _unquote(raw_psk)
+            if psk is None:
+                return _candidate(path, line, ssid, error="Raw hex PSKs cannot be imported")
+            return _candidate(path, line, ssid, psk, security)
+    
+    return _candidate(path, line, ssid, error=f"Unsupported key_mgmt '{' '.join(key_mgmt)}'")
+
+def parse_wpa_supplicant(path: str) -> Iterator[Dict]:
+    """
+    Parse the network blocks of a wpa_supplicant.conf file.
+    
+    The file is read line by line, so only one block is held at a time.
+    
+    Args:
+        path (str): Path to a wpa_supplicant.conf file
+    
+    Yields:
+        Dict: Parsed entry per network block with 'ssid', 'password',
+            'security', 'file', 'line' and an 'error' message if it cannot
+            be imported
+    """
+    block = None
+    start = 0
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for number, raw in enumerate(f, start=1):
+            line = raw.strip()
+            if not line or line.startswith('#'):
+                continue
+            if block is None:
+                if line.replace(' ', '') == 'network={':
+                    block = {}
+                    start = number
+                continue
+            if line == '}':
+                yield _wpa_network(path, start, block)
+                block = None
+                continue
+            key, sep, value = line.partition('=')
+            if sep:
+                block[key.strip()] = value.strip()
+    
+    if block is not None:
+        yield _candidate(path, start, error="Unterminated network block")
+
+def parse_config_file(path: str) -> Iterator[Dict]:
+    """
+    Parse a config file with the parser matching its name.
+    
+    Args:
+        path (str): Path to a NetworkManager keyfile or wpa_supplicant config
+    
+    Yields:
+        Dict: Parsed network entries
+    """
+    if path.endswith(NM_SUFFIX):
+        yield from parse_nmconnection(path)
+    else:
+        yield from parse_wpa_supplicant(path)
+
+def validate_entry(entry: Dict) -> Optional[str]:
+    """
+    Validate a parsed entry the same way the Add Wi-Fi form does.
+    
+    Args:
+        entry (Dict): Parsed network entry
+    
+    Returns:
+        Optional[str]: The reason the entry is invalid, or None if valid
+    """
+    if entry['error']:
+        return entry['error']
+    if not validate_ssid(entry['ssid']):
+        return "Invalid SSID (must be 1-32 characters)"
+    if not validate_security_type(entry['security']):
+        return f"Invalid security type '{entry['security']}'"
+    if entry['security'].upper() != "NOPASS" and not validate_password(entry['password'], entry['security']):
+        return f"Invalid password for {entry['security']}"
+    return None
+
+def iter_import_records(paths: Iterable[str], skipped: List[Dict]) -> Iterator[Dict]:
+    """
+    Stream valid Wi-Fi records from config files.
+    
+    Args:
+        paths (Iterable[str]): Files or directories to import from
+        skipped (List[Dict]): Receives a {'file', 'line', 'ssid', 'reason'}
+            dict for every entry that cannot be imported
+    
+    Yields:
+        Dict: Records with 'ssid', 'password' and 'security' keys
+    """
+    for path in iter_config_files(paths):
+        try:
+            for entry in parse_config_file(path):
+                reason = validate_entry(entry)
+                if reason:
+                    skipped.append({'file': entry['file'], 'line': entry['line'],
+                                    'ssid': entry['ssid'], 'reason': reason})
+                    continue
+                yield {'ssid': entry['ssid'], 'password': entry['password'],
+                       'security': entry['security']}
+        except OSError as e:
+            skipped.append({'file': path, 'line': 0, 'ssid': None,
+                            'reason': f"Could not read file: {e}"})
+
+def import_wifi(db_manager, paths: Iterable[str]) -> Dict:
+    """
+    Import Wi-Fi networks from config files into the database in one write.
+    
+    Args:
+        db_manager (DatabaseManager): Unlocked database manager
+        paths (Iterable[str]): Files or directories to import from
+    
+    Returns:
+        Dict: 'results' with the per-record results of add_many, and
+            'skipped' with the entries that could not be imported
+    """
+    skipped = []
+    results = db_manager.add_many(iter_import_records(paths, skipped))
+    return {'results': results, 'skipped': skipped}
@@ -0,0 +1,272 @@
+from bisect import bisect_left
+from typing import Any, Callable, Collection, Dict, Iterable, List, Set
+
+# Length of the substrings kept as posting keys
+NGRAM_SIZE = 3
+
+# Postings kept for queries shorter than NGRAM_SIZE, which are built the
+# first time such a query is searched
+SHORT_POSTING_CACHE_SIZE = 64
+
+# A SortedIndex orders a subset by sorting it when it is this many times
+# smaller than the index, and by filtering the whole order otherwise
+SUBSET_SORT_RATIO = 16
+
+def _ngrams(text: str) -> Set[str]:
+    """Every distinct NGRAM_SIZE-character substring of text"""
+    return {text[start:start + NGRAM_SIZE] for start in range(len(text) - NGRAM_SIZE + 1)}
+
+class SsidSearchIndex:
+    """
+    Case-insensitive substring search over SSIDs.
+    
+    Each n-gram of the casefolded SSIDs has a posting of the SSIDs that
+    contain it, kept in the order the SSIDs were added: a query of one
+    n-gram is its posting, and a longer one is only checked against the
+    SSIDs of its rarest n-gram. Queries shorter than an n-gram match so
+    many SSIDs that they get postings of their own, built on first use and
+    kept up to date from then on. A query that extends the previous one
+    only filters the previous results.
+    """
+    
+    def __init__(self, ssids: Iterable[str] = ()):
+        """
+        Args:
+            ssids (Iterable[str]): SSIDs to index, in display order
+        """
+        self._folded = {}
+        self._postings = {}
+        self._short_postings = {}
+        
+        # The previous query and its results, valid until the index changes
+        self._last_query = None
+        self._last_results = []
+        
+        for ssid in ssids:
+            self.add(ssid)
+    
+    def __len__(self) -> int:
+        return len(self._folded)
+    
+    def __contains__(self, ssid: str) -> bool:
+        return ssid in self._folded
+    
+    def add(self, ssid: str):
+        """
+        Index an SSID after every SSID already indexed.
+        
+        Args:
+            ssid (str): SSID to index; one that is already indexed keeps its place
+        """
+        if ssid in self._folded:
+            return
+        folded = ssid.casefold()
+        self._folded[ssid] = folded
+        postings = self._postings
+        for gram in _ngrams(folded):
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = {ssid: None}
+            else:
+                posting[ssid] = None
+        for gram, posting in self._short_postings.items():
+            if gram in folded:
+                posting[ssid] = None
+        self._last_query = None
+    
+    def discard(self, ssid: str):
+        """
+        Remove an SSID from the index if it is there.
+        
+        Args:
+            ssid (str): SSID to remove
+        """
+        folded = self._folded.pop(ssid, None)
+        if folded is None:
+            return
+        postings = self._postings
+        for gram in _ngrams(folded):
+            posting = postings[gram]
+            del posting[ssid]
+            if not posting:
+                del postings[gram]
+        for posting in self._short_postings.values():
+            posting.pop(ssid, None)
+        self._last_query = None
+    
+    def search(self, query: str) -> List[str]:
+        """
+        Find the SSIDs containing a query, ignoring case.
+        
+        Args:
+            query (str): Text to look for; an empty query matches every SSID
+            
+        Returns:
+            List[str]: Matching SSIDs in the order they were added; the list
+                is kept to narrow the next search, so do not change it
+        """
+        folded = query.casefold()
+        if folded == self._last_query:
+            return self._last_results
+        
+        if not folded:
+            results = list(self._folded)
+        elif len(folded) < NGRAM_SIZE:
+            results = list(self._short_posting(folded))
+        elif len(folded) == NGRAM_SIZE:
+            results = list(self._postings.get(folded, ()))
+        else:
+            results = self._filter(folded, self._rarest_posting(folded))
+        
+        self._last_query = folded
+        self._last_results = results
+        return results
+    
+    def _rarest_posting(self, folded: str) -> Dict[str, None]:
+        """
+        Get the smallest posting among the n-grams of a query.
+        
+        Args:
+            folded (str): Casefolded query of at least NGRAM_SIZE characters
+            
+        Returns:
+            Dict[str, None]: SSIDs that may contain the query, in order
+        """
+        smallest = None
+        for start in range(len(folded) - NGRAM_SIZE + 1):
+            posting = self._postings.get(folded[start:start + NGRAM_SIZE])
+            if not posting:
+                return {}
+            if smallest is None or len(posting) < len(smallest):
+                smallest = posting
+        return smallest
+    
+    def _short_posting(self, folded: str) -> Dict[str, None]:
+        """
+        Get the posting of a query shorter than an n-gram, building it if needed.
+        
+        Args:
+            folded (str): Casefolded query
+            
+        Returns:
+            Dict[str, None]: SSIDs containing the query, in order
+        """
+        posting = self._short_postings.get(folded)
+        if posting is None:
+            if len(self._short_postings) >= SHORT_POSTING_CACHE_SIZE:
+                del self._short_postings[next(iter(self._short_postings))]
+            posting = dict.fromkeys(self._filter(folded, self._folded))
+            self._short_postings[folded] = posting
+        return posting
+    
+    def _filter(self, folded: str, candidates: Collection[str]) -> List[str]:
+        """
+        Keep the candidates that contain a query.
+        
+        Args:
+            folded (str): Casefolded query
+            candidates (Collection[str]): SSIDs in order, a superset of the matches
+            
+        Returns:
+            List[str]: Matching SSIDs in order
+        """
+        last = self._last_query
+        if last is not None and last in folded and len(self._last_results) < len(candidates):
+            # Whatever contains this query also contained the previous one
+            candidates = self._last_results
+        names = self._folded
+        return [ssid for ssid in candidates if folded in names[ssid]]
+
+
+class SortedIndex:
+    """
+    SSIDs kept in the order of a sort key, updated one record at a time.
+    
+    The index is sorted once when it is built; after that each record put
+    or deleted moves a single entry with a binary search, so reading the
+    order in either direction is a list copy rather than a sort. Ties on
+    the sort key are broken by SSID.
+    """
+    
+    def __init__(self, key: Callable[[Dict], Any], records: Iterable[Dict] = ()):
+        """
+        Args:
+            key (Callable): Builds the sort key of a record with 'ssid' and 'security'
+            records (Iterable[Dict]): Records to index
+        """
+        self.key = key
+        entries = sorted((key(record), record['ssid']) for record in records)
+        self._entries = entries
+        self._ssids = [ssid for _, ssid in entries]
+        self._entry_of = {entry[1]: entry for entry in entries}
+    
+    def __len__(self) -> int:
+        return len(self._ssids)
+    
+    def __contains__(self, ssid: str) -> bool:
+        return ssid in self._entry_of
+    
+    def add(self, record: Dict):
+        """
+        Index a record, moving it if its sort key changed.
+        
+        Args:
+            record (Dict): Record with 'ssid' and 'security'
+        """
+        ssid = record['ssid']
+        entry = (self.key(record), ssid)
+        old = self._entry_of.get(ssid)
+        if old == entry:
+            return
+        if old is not None:
+            self._remove(old)
+        index = bisect_left(self._entries, entry)
+        self._entries.insert(index, entry)
+        self._ssids.insert(index, ssid)
+        self._entry_of[ssid] = entry
+    
+    def discard(self, ssid: str):
+        """
+        Remove an SSID from the index if it is there.
+        
+        Args:
+            ssid (str): SSID to remove
+        """
+        entry = self._entry_of.pop(ssid, None)
+        if entry is not None:
+            self._remove(entry)
+    
+    def ssids(self, descending: bool = False) -> List[str]:
+        """
+        Get every indexed SSID in order.
+        
+        Args:
+            descending (bool): Whether to list them from the largest key down
+            
+        Returns:
+            List[str]: SSIDs, in a new list
+        """
+        return self._ssids[::-1] if descending else list(self._ssids)
+    
+    def order(self, ssids: Collection[str], descending: bool = False) -> List[str]:
+        """
+        Put some of the indexed SSIDs in index order.
+        
+        Args:
+            ssids (Collection[str]): Indexed SSIDs, such as search results
+            descending (bool): Whether to list them from the largest key down
+            
+        Returns:
+            List[str]: The SSIDs in order, in a new list
+        """
+        if len(ssids) * SUBSET_SORT_RATIO < len(self._ssids):
+            return sorted(ssids, key=self._entry_of.__getitem__, reverse=descending)
+        ordered = list(filter(set(ssids).__contains__, self._ssids))
+        if descending:
+            ordered.reverse()
+        return ordered
+    
+    def _remove(self, entry: tuple):
+        index = bisect_left(self._entries, entry)
+        del self._entries[index]
+        del self._ssids[index]
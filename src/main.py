@@ -6,9 +6,21 @@ import os
 # Add src directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from background import BackgroundExecutor
 from database import DatabaseManager
+from encryption import calibrate_kdf
 from qrcode_generator import generate_wifi_qr
 from utils import validate_ssid, validate_password, validate_security_type
+from widgets import VirtualTreeview
+
+# Frame interval of the login screen's busy indicator (about 60 fps)
+BUSY_ANIMATION_MS = 16
+
+# Pause in typing after which the search box filters the list
+SEARCH_DEBOUNCE_MS = 150
+
+# Tree columns whose headings sort the list, and the database order of each
+SORT_COLUMNS = {"SSID": "ssid", "Security": "security"}
 
 class WifiPasswordManagerGUI:
     def __init__(self, root):
@@ -28,6 +40,16 @@ class WifiPasswordManagerGUI:
         # Initialize database manager
         self.db_manager = DatabaseManager()
         
+        # Unlock running on a worker thread, if any
+        self.unlock_job = None
+        
+        # Database and disk work started from the pages runs on a worker
+        # thread; the page buttons are disabled while any of it is in flight
+        self.background = BackgroundExecutor(
+            root, on_error=lambda error: messagebox.showerror("Error", str(error)))
+        self.tasks_in_flight = 0
+        self.action_buttons = []
+        
         # Track current page
         self.current_page = None
         
@@ -160,7 +182,7 @@ class WifiPasswordManagerGUI:
         buttons_frame.pack(fill="x", pady=20)
         
         # Login button
-        login_btn = tk.Button(
+        self.login_btn = tk.Button(
             buttons_frame, 
             text="🔓 Unlock Database", 
             command=self.unlock_database,
@@ -172,10 +194,10 @@ class WifiPasswordManagerGUI:
             pady=8,
             font=("Arial", 10, "bold")
         )
-        login_btn.pack(side="left", padx=(0, 10))
+        self.login_btn.pack(side="left", padx=(0, 10))
         
         # Forgot password button
-        forgot_btn = tk.Button(
+        self.forgot_btn = tk.Button(
             buttons_frame, 
             text="❓ Forgot Password", 
             command=self.show_forgot_password,
@@ -187,10 +209,10 @@ class WifiPasswordManagerGUI:
             pady=8,
             font=("Arial", 10, "bold")
         )
-        forgot_btn.pack(side="left", padx=(0, 10))
+        self.forgot_btn.pack(side="left", padx=(0, 10))
         
         # Theme toggle button
-        theme_btn = tk.Button(
+        self.theme_btn = tk.Button(
             buttons_frame, 
             text="🌓 Toggle Theme", 
             command=self.toggle_theme,
@@ -202,7 +224,34 @@ class WifiPasswordManagerGUI:
             pady=8,
             font=("Arial", 10, "bold")
         )
-        theme_btn.pack(side="left")
+        self.theme_btn.pack(side="left")
+        
+        # Busy indicator and cancel button, shown while an unlock runs
+        self.busy_frame = tk.Frame(form_frame, bg=self.bg_color)
+        
+        self.busy_label = tk.Label(
+            self.busy_frame,
+            text="",
+            font=("Arial", 10),
+            bg=self.bg_color,
+            fg=self.fg_color
+        )
+        self.busy_label.pack(anchor="w")
+        
+        self.busy_progress = ttk.Progressbar(self.busy_frame, mode="indeterminate", length=300)
+        self.busy_progress.pack(side="left", fill="x", expand=True, padx=(0, 10), pady=5)
+        
+        self.cancel_btn = tk.Button(
+            self.busy_frame,
+            text="✖ Cancel",
+            command=self.cancel_unlock,
+            bg=self.button_color,
+            fg=self.fg_color,
+            relief="raised",
+            bd=1,
+            padx=10
+        )
+        self.cancel_btn.pack(side="right")
         
         # Bind Enter key to login
         self.password_entry.bind("<Return>", lambda event: self.unlock_database())
@@ -247,13 +296,7 @@ class WifiPasswordManagerGUI:
         )
         
         if result:
-            # Delete database files
-            try:
-                if os.path.exists("wifi_data.enc"):
-                    os.remove("wifi_data.enc")
-                if os.path.exists("master_key.hash"):
-                    os.remove("master_key.hash")
-                
+            def reset(_):
                 messagebox.showinfo(
                     "Reset Complete", 
                     "Master password has been reset. All saved Wi-Fi networks have been deleted.\n\n"
@@ -262,11 +305,28 @@ class WifiPasswordManagerGUI:
                 
                 # Refresh login screen
                 self.show_login_screen()
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to reset password: {str(e)}")
+            
+            def failed(error):
+                self.set_login_busy(False)
+                messagebox.showerror("Error", f"Failed to reset password: {str(error)}")
+            
+            # Locking flushes to disk, so the files are deleted on the worker thread
+            self.set_login_busy(True, "Resetting database...", cancellable=False)
+            self.background.submit(self.delete_database, on_done=reset, on_error=failed)
+    
+    def delete_database(self):
+        """Lock the database and delete its files (worker thread)"""
+        self.db_manager.lock_database()
+        for path in (self.db_manager.path, self.db_manager.master_key_path):
+            if os.path.exists(path):
+                os.remove(path)
     
     def unlock_database(self):
         """Attempt to unlock the database with the provided password"""
+        # Ignore repeated Enter presses while an unlock is running
+        if self.unlock_job is not None:
+            return
+        
         password = self.password_var.get()
         
         # Strip whitespace and check if empty
@@ -276,20 +336,137 @@ class WifiPasswordManagerGUI:
             messagebox.showerror("Error", "Please enter a master password")
             return
         
-        # Check if database exists
-        if os.path.exists("wifi_data.enc"):
-            # Try to unlock existing database
-            if self.db_manager.unlock_database(password):
-                self.show_dashboard()
+        # Key derivation and decryption take a while, so they run on the
+        # worker thread with a manager of their own; it replaces
+        # self.db_manager only if the unlock succeeds and was not cancelled.
+        # The worker runs one call at a time, so an unlock cancelled while
+        # migrating the vault finishes before this one starts
+        job = {
+            'manager': DatabaseManager(),
+            'creating': not os.path.exists("wifi_data.enc"),
+            'cancelled': False
+        }
+        self.unlock_job = job
+        self.set_login_busy(True, "Creating database..." if job['creating'] else "Unlocking database...")
+        self.background.submit(self.run_unlock, job, password,
+                               on_done=lambda success: self.finish_unlock(job, success))
+    
+    def run_unlock(self, job, password):
+        """Unlock or create the database (worker thread); returns whether it worked"""
+        try:
+            # An unlock that ran before this one may have created the vault
+            job['creating'] = not os.path.exists(job['manager'].path)
+            if job['creating']:
+                # Tune the new database to unlock quickly on this machine
+                success = job['manager'].initialize_database(password, calibrate_kdf())
             else:
-                messagebox.showerror("Error", "Invalid master password")
-        else:
-            # Initialize new database
-            if self.db_manager.initialize_database(password):
+                success = job['manager'].unlock_database(password)
+            if success:
+                # Build the SSID search index while the spinner is showing
+                job['manager'].search_ssids("")
+            return success
+        except Exception:
+            return False
+    
+    def finish_unlock(self, job, success):
+        """Open the dashboard or report a failure once an unlock finishes"""
+        if job['cancelled']:
+            if success:
+                self.background.submit(job['manager'].lock_database)
+            return
+        
+        self.unlock_job = None
+        if success:
+            self.db_manager = job['manager']
+            if job['creating']:
                 messagebox.showinfo("Success", "Database initialized successfully!")
-                self.show_dashboard()
-            else:
-                messagebox.showerror("Error", "Failed to initialize database")
+            self.show_dashboard()
+            return
+        
+        self.set_login_busy(False)
+        if job['creating']:
+            messagebox.showerror("Error", "Failed to initialize database")
+        else:
+            messagebox.showerror("Error", "Invalid master password")
+    
+    def cancel_unlock(self):
+        """Abandon a running unlock; its result is discarded when it finishes"""
+        job = self.unlock_job
+        if job is None:
+            return
+        
+        # It keeps the worker until it finishes, so work submitted after it,
+        # such as another unlock, waits for it
+        job['cancelled'] = True
+        self.unlock_job = None
+        self.set_login_busy(False)
+    
+    def set_login_busy(self, busy, message="", cancellable=True):
+        """Show or hide the busy indicator and lock the login form meanwhile"""
+        state = "disabled" if busy else "normal"
+        for widget in (self.password_entry, self.login_btn, self.forgot_btn, self.theme_btn):
+            widget.config(state=state)
+        
+        if busy:
+            self.busy_label.config(text=message)
+            self.cancel_btn.config(state="normal" if cancellable else "disabled")
+            self.busy_frame.pack(fill="x", pady=(0, 10))
+            self.busy_progress.start(BUSY_ANIMATION_MS)
+        else:
+            self.busy_progress.stop()
+            self.busy_frame.pack_forget()
+            self.password_entry.focus()
+    
+    def logout(self):
+        """Lock the database and return to the login screen"""
+        # Locking waits for work already queued and flushes to disk, so it
+        # runs on the worker thread after everything else
+        def locked(saved):
+            if not saved:
+                messagebox.showerror("Error", "Some changes could not be saved to disk and were lost.")
+            self.show_login_screen()
+        
+        self.run_task(self.db_manager.lock_database, on_done=locked,
+                      error_message="Failed to lock the database")
+    
+    def run_task(self, function, *args, on_done=None, error_message="Operation failed"):
+        """
+        Run database or disk work on the worker thread, disabling the page buttons meanwhile.
+        
+        Args:
+            function (Callable): Work to run; it must not touch widgets
+            *args: Arguments for the function
+            on_done (Callable): Called from the main loop with the result
+            error_message (str): Shown with the exception if the work raises
+        """
+        self.tasks_in_flight += 1
+        self.update_action_buttons()
+        
+        def done(result):
+            self.tasks_in_flight -= 1
+            self.update_action_buttons()
+            if on_done is not None:
+                on_done(result)
+        
+        def failed(error):
+            self.tasks_in_flight -= 1
+            self.update_action_buttons()
+            messagebox.showerror("Error", f"{error_message}: {error}")
+        
+        self.background.submit(function, *args, on_done=done, on_error=failed)
+    
+    def add_action_buttons(self, *buttons):
+        """Register buttons of the current page that start background work"""
+        self.action_buttons = [button for button in self.action_buttons if button.winfo_exists()]
+        self.action_buttons.extend(buttons)
+        self.update_action_buttons()
+    
+    def update_action_buttons(self):
+        """Disable the registered buttons while background work is in flight"""
+        state = "disabled" if self.tasks_in_flight else "normal"
+        for button in self.action_buttons:
+            if button.winfo_exists():
+                button.config(state=state)
     
     def toggle_theme(self):
         """Toggle between dark and light mode"""
@@ -352,7 +529,7 @@ class WifiPasswordManagerGUI:
         logout_btn = tk.Button(
             header_frame, 
             text="🚪 Logout", 
-            command=self.show_login_screen, 
+            command=self.logout, 
             width=10,
             bg=self.button_color,
             fg=self.fg_color,
@@ -659,6 +836,7 @@ class WifiPasswordManagerGUI:
             font=("Arial", 10, "bold")
         )
         clear_btn.pack(side="left")
+        self.add_action_buttons(save_btn)
         
         # Pack canvas and scrollbar
         canvas.pack(side="left", fill="both", expand=True)
@@ -701,12 +879,19 @@ class WifiPasswordManagerGUI:
                 messagebox.showerror("Error", "Please enter a valid password")
             return
         
-        # Save to database
-        if self.db_manager.add_wifi(ssid, password, security):
-            messagebox.showinfo("Success", f"Wi-Fi network '{ssid}' saved successfully!")
-            self.clear_wifi_form()
-        else:
-            messagebox.showerror("Error", "Failed to save Wi-Fi network")
+        # Save to database on the worker thread
+        form = self.wifi_password_entry
+        
+        def saved(success):
+            if success:
+                messagebox.showinfo("Success", f"Wi-Fi network '{ssid}' saved successfully!")
+                if form.winfo_exists():
+                    self.clear_wifi_form()
+            else:
+                messagebox.showerror("Error", "Failed to save Wi-Fi network")
+        
+        self.run_task(self.db_manager.add_wifi, ssid, password, security,
+                      on_done=saved, error_message="Failed to save Wi-Fi network")
     
     def clear_wifi_form(self):
         """Clear the Wi-Fi form"""
@@ -781,6 +966,7 @@ class WifiPasswordManagerGUI:
             font=("Arial", 10, "bold")
         )
         copy_btn.pack(side="left")
+        self.add_action_buttons(refresh_btn, delete_btn, copy_btn)
         
         # Create treeview for displaying Wi-Fi networks with scrollbar
         tree_frame = tk.Frame(self.content_frame, bg=self.bg_color)
@@ -789,12 +975,21 @@ class WifiPasswordManagerGUI:
         # Define columns
         columns = ("SSID", "Security", "Password")
         
-        # Create treeview
-        self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=15)
+        # Create a virtual treeview: rows are keyed by SSID, and only the ones
+        # in view exist as Tk items, however many networks are saved
+        self.tree_rows = self.new_tree_state()
+        self.tree = VirtualTreeview(
+            tree_frame,
+            columns,
+            lambda ssid: self.tree_row(self.tree_rows, ssid, self.wifi_row_values),
+            height=15,
+            xscroll=True,
+            bg=self.bg_color
+        )
         
         # Define headings
-        self.tree.heading("SSID", text="📡 Network Name")
-        self.tree.heading("Security", text="🛡️ Security")
+        self.add_sort_headings(self.tree, self.tree_rows,
+                               {"SSID": "📡 Network Name", "Security": "🛡️ Security"})
         self.tree.heading("Password", text="🔑 Password")
         
         # Define column widths
@@ -802,15 +997,8 @@ class WifiPasswordManagerGUI:
         self.tree.column("Security", width=120)
         self.tree.column("Password", width=250)
         
-        # Add scrollbars
-        v_scrollbar = tk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        h_scrollbar = tk.Scrollbar(tree_frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
-        
-        # Pack treeview and scrollbars
-        self.tree.pack(side="left", fill="both", expand=True)
-        v_scrollbar.pack(side="right", fill="y")
-        h_scrollbar.pack(side="bottom", fill="x")
+        self.tree.pack(fill="both", expand=True)
+        self.add_search_box(controls_frame, self.tree, self.tree_rows)
         
         # Style the treeview
         style = ttk.Style()
@@ -822,18 +1010,170 @@ class WifiPasswordManagerGUI:
     
     def load_wifi_credentials(self):
         """Load and display Wi-Fi credentials in the treeview"""
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Load credentials from database
-        credentials = self.db_manager.get_all_wifi()
-        
-        # Add credentials to treeview
-        for cred in credentials:
-            # Hide password characters for display
-            display_password = "*" * len(cred["password"]) if cred["password"] else ""
-            self.tree.insert("", "end", values=(cred["ssid"], cred["security"], display_password))
+        self.refresh_tree(self.tree, self.tree_rows)
+    
+    def wifi_row_values(self, cred):
+        """Build the View page row for a credential"""
+        # Passwords are never decrypted for display, so show a fixed mask
+        display_password = "" if cred["security"].upper() == "NOPASS" else "********"
+        return (cred["ssid"], cred["security"], display_password)
+    
+    def tree_row(self, state, ssid, row_values):
+        """Build a tree row for the credential saved under an SSID"""
+        # Security types are fetched on the worker by refresh_tree, so the
+        # main loop never waits on the database; passwords stay encrypted
+        security = state['security'].get(ssid, "")
+        return row_values({"ssid": ssid, "security": security})
+    
+    def refresh_tree(self, tree, state, reset_view=False):
+        """
+        Bring a virtual treeview keyed by SSID up to date with the database.
+        
+        The database reports which SSIDs changed since the revision the tree
+        shows. The tree only builds Tk rows for the window in view, so a
+        refresh costs a copy of the SSID list plus the visible rows that
+        changed, and the selection and scroll position survive. When the
+        changes are not known, every visible row is rebuilt. The database
+        is read on the worker thread, which may reload the vault from disk
+        or build a search or sort index, and the security type of each
+        changed SSID comes back with the keys, so rows are built on the
+        main loop without touching the database.
+        
+        Args:
+            tree (VirtualTreeview): Tree whose keys are SSIDs
+            state (dict): The 'revision' the tree shows, the 'security' of
+                each SSID, and its search and sort
+            reset_view (bool): List the SSIDs again for a new search or sort
+                and scroll back to the top
+        """
+        view = (state['query'], state['sort'], state['descending'])
+        
+        def fetch(revision):
+            revision, changes = self.db_manager.changes_since(revision)
+            security = None
+            if changes is None:
+                security = {cred['ssid']: cred['security']
+                            for cred in self.db_manager.iter_wifi()}
+            keys = None
+            if reset_view or changes is None or changes:
+                keys = self.matching_ssids(*view)
+            return revision, changes, keys, security
+        
+        def show(result):
+            if not tree.winfo_exists():
+                return  # The page was left meanwhile
+            revision, changes, keys, security = result
+            if security is not None:
+                state['security'] = security
+            else:
+                for ssid, cred in changes.items():
+                    if cred is None:
+                        state['security'].pop(ssid, None)
+                    else:
+                        state['security'][ssid] = cred['security']
+            if keys is not None:
+                tree.set_keys(keys)
+                tree.refresh_rows(changes)
+            if reset_view:
+                tree.scroll_to(0)
+            state['revision'] = revision
+        
+        self.run_task(fetch, state['revision'], on_done=show,
+                      error_message="Failed to load Wi-Fi networks")
+    
+    def new_tree_state(self):
+        """Refresh, search and sort state for a tree page"""
+        return {'revision': None, 'security': {}, 'query': "", 'search_job': None,
+                'sort': None, 'descending': False, 'headings': {}}
+    
+    def matching_ssids(self, query, sort, descending):
+        """Get the SSIDs a tree shows for a search query and sort order"""
+        if sort is not None:
+            return self.db_manager.sorted_ssids(SORT_COLUMNS[sort], descending, query)
+        if not query:
+            return self.db_manager.get_ssids()
+        return self.db_manager.search_ssids(query)
+    
+    def add_sort_headings(self, tree, state, headings):
+        """
+        Label a tree's sortable column headings and sort by one when it is clicked.
+        
+        Args:
+            tree (VirtualTreeview): Tree whose keys are SSIDs
+            state (dict): The tree's refresh state
+            headings (dict): Heading text for each column in SORT_COLUMNS
+        """
+        state['headings'] = headings
+        for column in headings:
+            tree.heading(column, command=lambda column=column: self.sort_tree(tree, state, column))
+        self.update_sort_headings(tree, state)
+    
+    def sort_tree(self, tree, state, column):
+        """Sort a tree by a column, or reverse it if it is already sorted by that column"""
+        if state['sort'] == column:
+            state['descending'] = not state['descending']
+        else:
+            state['sort'] = column
+            state['descending'] = False
+        self.update_sort_headings(tree, state)
+        self.refresh_tree(tree, state, reset_view=True)
+    
+    def update_sort_headings(self, tree, state):
+        """Mark the heading a tree is sorted by with the sort direction"""
+        for column, text in state['headings'].items():
+            if column == state['sort']:
+                text += " ▼" if state['descending'] else " ▲"
+            tree.heading(column, text=text)
+    
+    def add_search_box(self, parent, tree, state):
+        """
+        Add a search box that filters a tree by SSID as the user types.
+        
+        Keystrokes only restart a short timer; the search runs once typing
+        pauses for SEARCH_DEBOUNCE_MS.
+        
+        Args:
+            parent (tk.Widget): Frame to pack the box into, on the right
+            tree (VirtualTreeview): Tree whose keys are SSIDs
+            state (dict): The tree's refresh state, holding the 'query'
+        """
+        search_var = tk.StringVar()
+        search_entry = tk.Entry(
+            parent,
+            textvariable=search_var,
+            font=("Arial", 11),
+            bg=self.entry_bg,
+            fg=self.fg_color,
+            relief="solid",
+            bd=1,
+            width=25
+        )
+        search_entry.pack(side="right")
+        
+        tk.Label(
+            parent,
+            text="🔍 Search:",
+            font=("Arial", 10, "bold"),
+            bg=self.bg_color,
+            fg=self.fg_color
+        ).pack(side="right", padx=(10, 5))
+        
+        def schedule_search(*args):
+            if state['search_job'] is not None:
+                self.root.after_cancel(state['search_job'])
+            state['search_job'] = self.root.after(SEARCH_DEBOUNCE_MS, self.run_search,
+                                                  tree, state, search_var.get())
+        
+        search_var.trace_add("write", schedule_search)
+    
+    def run_search(self, tree, state, query):
+        """Show the SSIDs matching a search query, from the top of the list"""
+        state['search_job'] = None
+        if not tree.winfo_exists():
+            return  # The page was left while the search was pending
+        
+        state['query'] = query.strip()
+        self.refresh_tree(tree, state, reset_view=True)
     
     def delete_selected_wifi(self):
         """Delete the selected Wi-Fi network"""
@@ -842,17 +1182,23 @@ class WifiPasswordManagerGUI:
             messagebox.showwarning("Warning", "Please select a network to delete")
             return
         
-        # Get the SSID of the selected item
-        item = self.tree.item(selected_items[0])
-        ssid = item["values"][0]
+        # Rows are keyed by SSID
+        ssid = selected_items[0]
         
         # Confirm deletion
-        if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete '{ssid}'?"):
-            if self.db_manager.delete_wifi(ssid):
+        if not messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete '{ssid}'?"):
+            return
+        
+        def deleted(success):
+            if success:
                 messagebox.showinfo("Success", f"Network '{ssid}' deleted successfully!")
-                self.load_wifi_credentials()
+                if self.current_page == "view":
+                    self.load_wifi_credentials()
             else:
                 messagebox.showerror("Error", "Failed to delete network")
+        
+        self.run_task(self.db_manager.delete_wifi, ssid, on_done=deleted,
+                      error_message="Failed to delete network")
     
     def copy_selected_password(self):
         """Copy the password of the selected Wi-Fi network"""
@@ -861,26 +1207,23 @@ class WifiPasswordManagerGUI:
             messagebox.showwarning("Warning", "Please select a network to copy password")
             return
         
-        # Get the SSID of the selected item
-        item = self.tree.item(selected_items[0])
-        ssid = item["values"][0]
-        
-        # Find the actual password from the database
-        credentials = self.db_manager.get_all_wifi()
-        password = ""
-        for cred in credentials:
-            if cred["ssid"] == ssid:
-                password = cred["password"]
-                break
-        
-        if password:
-            # Copy to clipboard
-            self.root.clipboard_clear()
-            self.root.clipboard_append(password)
-            self.root.update()
-            messagebox.showinfo("Copied", "Password copied to clipboard!")
-        else:
-            messagebox.showerror("Error", "Could not find password")
+        # Rows are keyed by SSID
+        ssid = selected_items[0]
+        
+        def copy(cred):
+            password = cred["password"] if cred else ""
+            if password:
+                # Copy to clipboard
+                self.root.clipboard_clear()
+                self.root.clipboard_append(password)
+                self.root.update()
+                messagebox.showinfo("Copied", "Password copied to clipboard!")
+            else:
+                messagebox.showerror("Error", "Could not find password")
+        
+        # Look up and decrypt the actual password on the worker thread
+        self.run_task(self.db_manager.get_wifi, ssid, on_done=copy,
+                      error_message="Could not read password")
     
     def show_generate_qr(self):
         """Display the generate QR code page"""
@@ -941,6 +1284,7 @@ class WifiPasswordManagerGUI:
             font=("Arial", 10, "bold")
         )
         generate_btn.pack(side="left")
+        self.add_action_buttons(refresh_btn, generate_btn)
         
         # Create treeview for selecting network
         tree_frame = tk.Frame(self.content_frame, bg=self.bg_color)
@@ -949,24 +1293,27 @@ class WifiPasswordManagerGUI:
         # Define columns
         columns = ("SSID", "Security")
         
-        # Create treeview
-        self.qr_tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=10)
+        # Create a virtual treeview, keyed by SSID like the View page
+        self.qr_tree_rows = self.new_tree_state()
+        self.qr_tree = VirtualTreeview(
+            tree_frame,
+            columns,
+            lambda ssid: self.tree_row(self.qr_tree_rows, ssid,
+                                       lambda cred: (cred["ssid"], cred["security"])),
+            height=10,
+            bg=self.bg_color
+        )
         
         # Define headings
-        self.qr_tree.heading("SSID", text="📡 Network Name")
-        self.qr_tree.heading("Security", text="🛡️ Security")
+        self.add_sort_headings(self.qr_tree, self.qr_tree_rows,
+                               {"SSID": "📡 Network Name", "Security": "🛡️ Security"})
         
         # Define column widths
         self.qr_tree.column("SSID", width=300)
         self.qr_tree.column("Security", width=150)
         
-        # Add scrollbar
-        qr_scrollbar = tk.Scrollbar(tree_frame, orient="vertical", command=self.qr_tree.yview)
-        self.qr_tree.configure(yscrollcommand=qr_scrollbar.set)
-        
-        # Pack treeview and scrollbar
-        self.qr_tree.pack(side="left", fill="both", expand=True)
-        qr_scrollbar.pack(side="right", fill="y")
+        self.qr_tree.pack(fill="both", expand=True)
+        self.add_search_box(controls_frame, self.qr_tree, self.qr_tree_rows)
         
         # Style the treeview
         style = ttk.Style()
@@ -982,16 +1329,7 @@ class WifiPasswordManagerGUI:
     
     def load_wifi_for_qr(self):
         """Load Wi-Fi credentials for QR code generation"""
-        # Clear existing items
-        for item in self.qr_tree.get_children():
-            self.qr_tree.delete(item)
-        
-        # Load credentials from database
-        credentials = self.db_manager.get_all_wifi()
-        
-        # Add credentials to treeview
-        for cred in credentials:
-            self.qr_tree.insert("", "end", values=(cred["ssid"], cred["security"]))
+        self.refresh_tree(self.qr_tree, self.qr_tree_rows)
     
     def generate_selected_qr(self):
         """Generate QR code for the selected Wi-Fi network"""
@@ -1000,29 +1338,26 @@ class WifiPasswordManagerGUI:
             messagebox.showwarning("Warning", "Please select a network to generate QR code")
             return
         
-        # Get the SSID of the selected item
-        item = self.qr_tree.item(selected_items[0])
-        ssid = item["values"][0]
-        security = item["values"][1]
-        
-        # Find the actual password from the database
-        credentials = self.db_manager.get_all_wifi()
-        password = ""
-        for cred in credentials:
-            if cred["ssid"] == ssid:
-                password = cred["password"]
-                break
+        # Rows are keyed by SSID
+        ssid = selected_items[0]
         
-        try:
-            # Generate QR code
-            qr_path = generate_wifi_qr(ssid, password, security)
-            
+        def generated(qr_path):
             # Display QR code
-            self.display_qr_code(qr_path, ssid)
+            if self.qr_display_frame.winfo_exists():
+                self.display_qr_code(qr_path, ssid)
             
             messagebox.showinfo("Success", f"QR code generated successfully!\nSaved to: {qr_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate QR code: {str(e)}")
+        
+        self.run_task(self.make_qr_code, ssid, on_done=generated,
+                      error_message="Failed to generate QR code")
+    
+    def make_qr_code(self, ssid):
+        """Write the QR code of a saved network and return its path (worker thread)"""
+        # Look up the actual password from the database
+        cred = self.db_manager.get_wifi(ssid)
+        password = cred["password"] if cred else ""
+        security = cred["security"] if cred else ""
+        return generate_wifi_qr(ssid, password, security)
     
     def display_qr_code(self, qr_path, ssid):
         """Display the generated QR code"""
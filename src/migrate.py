@@ -0,0 +1,479 @@
+import os
+import sys
+import hmac
+import json
+import codecs
+import base64
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from itertools import islice
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+from encryption import (LEGACY_KDF_PARAMS, derive_key, check_key_verifier, key_check_value,
+                        remove_padding, cbc_decryptor, aead_encrypt_many, encrypt_stream,
+                        generate_data_key, unwrap_key, validate_kdf_params)
+from storage import (ChunkReader, file_signature, read_container_header, pack_entry,
+                     make_key_slot, pack_vault_header, atomic_write, replace_file)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# A migration writes the new vault next to the legacy one and saves a
+# checkpoint after every batch, until the new vault is renamed over it
+MIGRATING_SUFFIX = ".migrating"
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+# Locked for the whole of a migration, so a second one waits instead of
+# writing the same side file
+LOCK_SUFFIX = ".lock"
+
+# Records sealed and written as one stream between checkpoints
+MIGRATE_BATCH_SIZE = 10000
+
+# The legacy line is read in pieces of whole base64 groups: 64 characters
+# decode to 48 bytes, three AES blocks, so decryption can restart at any
+# piece given the ciphertext block before it
+_GROUP_CHARS = 64
+_READ_SIZE = 16384 * _GROUP_CHARS
+_BLOCK_SIZE = 16
+
+_WHITESPACE = " \t\r\n"
+_decoder = json.JSONDecoder()
+
+def read_master_key_file(path: str) -> Tuple[bytes, str]:
+    """
+    Read the salt and key verifier saved next to a legacy vault.
+    
+    Args:
+        path (str): Path to the master key file
+        
+    Returns:
+        Tuple[bytes, str]: (salt, verifier)
+        
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If it is not a master key file
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    try:
+        return base64.b64decode(data['salt']), data['hash']
+    except (KeyError, TypeError) as e:
+        raise ValueError("Invalid master key file") from e
+
+class LegacyVaultReader:
+    """
+    Stream the records of a legacy base64 text vault.
+    
+    A legacy vault is a single base64 AES-CBC line holding a list of every
+    record. The line is decrypted a piece at a time and the records are
+    decoded one by one, so not even a huge vault is held in memory. Records
+    are yielded as 'put' entries with plaintext passwords.
+    
+    position() describes the point after the last entry yielded; a reader
+    created with it continues from there without decrypting what came
+    before.
+    """
+    
+    def __init__(self, f: BinaryIO, key: bytes, position: Optional[Dict] = None):
+        """
+        Args:
+            f (BinaryIO): The legacy vault opened in binary mode
+            key (bytes): The key derived from the master password
+            position (Dict): A position returned by an earlier reader
+        """
+        self._f = f
+        self._key = key
+        self._start = position or {'offset': 0, 'iv': None, 'skip': 0, 'list': False}
+        self._list = None
+    
+    def position(self) -> Dict:
+        """
+        Get the position after the last entry yielded.
+        
+        Returns:
+            Dict: JSON-serializable position to resume from
+        """
+        if self._list is None:
+            return dict(self._start)
+        
+        # Restart at the last piece before this point
+        text, pos, base, anchors = self._list
+        plain = base + len(text[:pos].encode('utf-8'))
+        start, offset, iv = [anchor for anchor in anchors if anchor[0] <= plain][-1]
+        return {'offset': offset, 'iv': iv, 'skip': plain - start, 'list': True}
+    
+    def tell(self) -> int:
+        """
+        Get how far into the file the reader has read.
+        
+        Returns:
+            int: File offset
+        """
+        return self._f.tell()
+    
+    def __iter__(self) -> Iterator[Dict]:
+        resume = self._start
+        self._f.seek(resume['offset'])
+        anchors = []
+        pieces = self._decrypt_line(resume, anchors)
+        if resume['list']:
+            head = b""
+            while len(head) < resume['skip']:
+                data = next(pieces, None)
+                if data is None:
+                    raise ValueError("Invalid migration checkpoint")
+                head += data
+            yield from self._read_list(pieces, anchors, head[resume['skip']:],
+                                       resume['skip'], True)
+        else:
+            head = b""
+            for data in pieces:
+                head += data
+                if head.lstrip():
+                    break
+            else:
+                # An empty vault
+                return
+            if not head.lstrip().startswith(b"["):
+                raise ValueError("Invalid legacy vault")
+            yield from self._read_list(pieces, anchors, head, 0, False)
+        
+        if self._f.read(_READ_SIZE).strip():
+            raise ValueError("Invalid legacy vault")
+    
+    def _decrypt_line(self, resume: Dict, anchors: List) -> Iterator[bytes]:
+        """
+        Decrypt the vault's line a piece at a time, leaving the file after it.
+        
+        The last block of each piece is held back until the line is known
+        to go on, and the padding is removed at its end.
+        
+        Args:
+            resume (Dict): Position inside the line to start from
+            anchors (List): Receives (plaintext offset, file offset, hex
+                ciphertext block before it or None) for every piece read
+                
+        Yields:
+            bytes: Consecutive plaintext pieces of the line
+        """
+        iv = bytes.fromhex(resume['iv']) if resume['iv'] else None
+        cipher = None if iv is None else cbc_decryptor(self._key, iv)
+        held = b""
+        plain = 0
+        while True:
+            offset = self._f.tell()
+            text = self._f.readline(_READ_SIZE)
+            ended = len(text) < _READ_SIZE or text.endswith(b"\n")
+            raw = base64.b64decode(text.strip())
+            
+            chain = iv
+            if cipher is None:
+                if not raw and ended:
+                    return
+                if len(raw) < _BLOCK_SIZE:
+                    raise ValueError("Truncated legacy vault")
+                cipher = cbc_decryptor(self._key, raw[:_BLOCK_SIZE])
+                raw = raw[_BLOCK_SIZE:]
+            if len(raw) % _BLOCK_SIZE:
+                raise ValueError("Invalid ciphertext length")
+            if raw:
+                iv = raw[-_BLOCK_SIZE:]
+            anchors.append((plain, offset, chain.hex() if chain else None))
+            plain += len(raw)
+            
+            data = held + cipher.decrypt(raw)
+            if ended:
+                yield remove_padding(data)
+                return
+            held = data[-_BLOCK_SIZE:]
+            yield data[:-_BLOCK_SIZE]
+    
+    def _read_list(self, pieces: Iterator[bytes], anchors: List, head: bytes,
+                   base: int, resumed: bool) -> Iterator[Dict]:
+        """
+        Yield the records of the vault's list one at a time.
+        
+        Args:
+            pieces (Iterator[bytes]): The rest of the line's plaintext
+            anchors (List): Anchors filled in by the piece iterator
+            head (bytes): Plaintext already read, from the list's opening
+                bracket or the end of a record
+            base (int): Plaintext offset of head
+            resumed (bool): Whether head starts after a record
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        text = decoder.decode(head)
+        pos = 0 if resumed else text.index("[") + 1
+        expect_item = not resumed
+        first = not resumed
+        
+        while True:
+            while pos < len(text) and text[pos] in _WHITESPACE:
+                pos += 1
+            
+            if pos < len(text) and not expect_item:
+                if text[pos] == "]":
+                    break
+                if text[pos] != ",":
+                    raise ValueError("Invalid legacy vault")
+                pos += 1
+                expect_item = True
+                first = False
+                continue
+            
+            if pos < len(text) and first and text[pos] == "]":
+                break
+            if pos < len(text):
+                try:
+                    item, end = _decoder.raw_decode(text, pos)
+                except ValueError:
+                    # The record may go on in the next piece
+                    item = None
+                if item is not None and not isinstance(item, dict):
+                    raise ValueError("Invalid legacy vault")
+                if item is not None:
+                    pos = end
+                    expect_item = False
+                    self._list = (text, pos, base, anchors)
+                    yield {'op': 'put', 'ssid': item['ssid'], 'security': item['security'],
+                           'password': item['password']}
+                    continue
+            
+            # Read the next piece, dropping what has been decoded
+            data = next(pieces, None)
+            if data is None:
+                raise ValueError("Truncated legacy vault")
+            base += len(text[:pos].encode('utf-8'))
+            text = text[pos:] + decoder.decode(data)
+            pos = 0
+            while len(anchors) > 1 and anchors[1][0] <= base:
+                del anchors[0]
+        
+        if text[pos + 1:].strip() or any(data.strip() for data in pieces):
+            raise ValueError("Invalid legacy vault")
+
+def _resume_side_file(side_path: str, checkpoint_path: str, source: tuple,
+                      master_password: str) -> Optional[Tuple[BinaryIO, bytes, Dict, Dict]]:
+    """
+    Reopen a partly written vault at its last checkpoint.
+    
+    The new vault's data key is unwrapped from its key slot, as it is
+    never written down anywhere else.
+    
+    Args:
+        side_path (str): Path to the vault being written
+        checkpoint_path (str): Path to its checkpoint
+        source (tuple): Stat signature of the legacy vault
+        master_password (str): The master password
+        
+    Returns:
+        Optional[Tuple[BinaryIO, bytes, Dict, Dict]]: (file positioned at
+        the checkpoint, data key, key slot, checkpoint), or None if there
+        is nothing to resume
+    """
+    try:
+        with open(checkpoint_path, 'r') as f:
+            checkpoint = json.load(f)
+        if checkpoint['source'] != list(source):
+            return None
+        out = open(side_path, 'r+b')
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    
+    try:
+        container = read_container_header(out)
+        if container is None or os.fstat(out.fileno()).st_size < checkpoint['size']:
+            out.close()
+            return None
+        key_slot = container[1]['key_slot']
+        wrapping_key, _ = derive_key(master_password, base64.b64decode(key_slot['salt']),
+                                     validate_kdf_params(key_slot['kdf']))
+        key = unwrap_key(base64.b64decode(key_slot['key']), wrapping_key)
+        if not hmac.compare_digest(base64.b64decode(container[1]['check']), key_check_value(key)):
+            out.close()
+            return None
+    except (ValueError, KeyError, TypeError):
+        out.close()
+        return None
+    out.truncate(checkpoint['size'])
+    out.seek(checkpoint['size'])
+    return out, key, key_slot, checkpoint
+
+def _lock_file(f: BinaryIO):
+    """Take an exclusive lock on an open file, waiting for it as long as needed"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            pass  # LK_LOCK gives up after ten seconds
+
+@contextmanager
+def _migration_lock(lock_path: str):
+    """Hold the migration lock of a vault, waiting while anyone else has it"""
+    while True:
+        f = open(lock_path, 'a+b')
+        _lock_file(f)
+        # The previous holder removes the file, so a waiter may have locked
+        # one that is gone; it then starts over on the current one
+        try:
+            if os.path.samestat(os.fstat(f.fileno()), os.stat(lock_path)):
+                break
+        except FileNotFoundError:
+            pass
+        f.close()
+    
+    try:
+        yield
+    finally:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass  # Windows cannot remove an open file; the lock file stays
+        if fcntl is None:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        # Closing the file releases a flock
+        f.close()
+
+def _write_batch(out: BinaryIO, batch: List[Dict], key: bytes, executor: Optional[Executor]):
+    """Seal a batch of entries and write it durably as one stream"""
+    passwords = [entry['password'].encode('utf-8') for entry in batch if entry.get('password')]
+    sealed = iter(aead_encrypt_many(passwords, key, executor))
+    encoded = (pack_entry(entry['op'], entry['ssid'], entry.get('security', ""),
+                          next(sealed) if entry.get('password') else b"")
+               for entry in batch)
+    encrypt_stream(ChunkReader(encoded), out, key)
+    out.flush()
+    os.fsync(out.fileno())
+
+def migrate_legacy_vault(master_password: str, vault_path: str, key_path: str,
+                         progress: Optional[Callable[[int, int], None]] = None,
+                         batch_size: int = MIGRATE_BATCH_SIZE,
+                         executor: Optional[Executor] = None) -> Tuple[bytes, Dict]:
+    """
+    Convert a legacy vault and its master key file into a vault container.
+    
+    The legacy vault is streamed into a new vault next to it, one batch of
+    entries at a time, with a checkpoint saved after each batch. If the
+    migration is interrupted, the next call with the same password resumes
+    from the last checkpoint, as long as the legacy vault is unchanged. The
+    new vault is renamed over the legacy one once complete, and the master
+    key file is removed. Only one migration of a vault runs at a time: a
+    call made while another is running waits for it, and then fails with
+    FileNotFoundError if the vault was migrated meanwhile. Every record is resealed under a new random data
+    key, wrapped in a key slot with a fresh salt: the legacy key can be read
+    straight out of an old master key file, so it must not open the new
+    vault.
+    
+    Args:
+        master_password (str): The master password
+        vault_path (str): Path to the legacy vault
+        key_path (str): Path to its master key file
+        progress (Callable): Called with (bytes read, total bytes) of the
+            legacy vault after every batch
+        batch_size (int): Entries per batch
+        executor (Executor): Optional worker pool for sealing passwords
+        
+    Returns:
+        Tuple[bytes, Dict]: (data key, key slot) of the new vault
+        
+    Raises:
+        ValueError: If the password is wrong or the legacy vault is invalid
+        OSError: If a file cannot be read or written
+    """
+    with _migration_lock(vault_path + MIGRATING_SUFFIX + LOCK_SUFFIX):
+        return _migrate_locked(master_password, vault_path, key_path,
+                               progress, batch_size, executor)
+
+def _migrate_locked(master_password: str, vault_path: str, key_path: str,
+                    progress: Optional[Callable[[int, int], None]], batch_size: int,
+                    executor: Optional[Executor]) -> Tuple[bytes, Dict]:
+    """Carry out migrate_legacy_vault while holding the migration lock"""
+    salt, verifier = read_master_key_file(key_path)
+    legacy_key, _ = derive_key(master_password, salt, LEGACY_KDF_PARAMS)
+    if not check_key_verifier(legacy_key, verifier):
+        raise ValueError("Wrong master password")
+    
+    side_path = vault_path + MIGRATING_SUFFIX
+    checkpoint_path = side_path + CHECKPOINT_SUFFIX
+    source = file_signature(vault_path)
+    if source is None:
+        raise FileNotFoundError(vault_path)
+    total = os.path.getsize(vault_path)
+    
+    resumed = _resume_side_file(side_path, checkpoint_path, source, master_password)
+    if resumed is not None:
+        out, key, key_slot, checkpoint = resumed
+    else:
+        # Drop a stale checkpoint before the side file it describes
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        key = generate_data_key()
+        wrapping_key, new_salt = derive_key(master_password, params=LEGACY_KDF_PARAMS)
+        key_slot = make_key_slot(key, wrapping_key, new_salt, LEGACY_KDF_PARAMS)
+        out = open(side_path, 'w+b')
+        out.write(pack_vault_header(key, key_slot))
+        checkpoint = None
+    
+    with out, open(vault_path, 'rb') as f:
+        reader = LegacyVaultReader(f, legacy_key, checkpoint and checkpoint['position'])
+        entries = iter(reader)
+        records = checkpoint['records'] if checkpoint else 0
+        # Even an empty vault needs one stream
+        written = checkpoint is not None
+        while True:
+            batch = list(islice(entries, batch_size))
+            if batch or not written:
+                _write_batch(out, batch, key, executor)
+                written = True
+                records += len(batch)
+                atomic_write(checkpoint_path, json.dumps({
+                    'source': list(source),
+                    'size': out.tell(),
+                    'position': reader.position(),
+                    'records': records,
+                }).encode('utf-8'))
+            if progress:
+                progress(reader.tell(), total)
+            if len(batch) < batch_size:
+                break
+    
+    replace_file(side_path, vault_path)
+    os.remove(checkpoint_path)
+    os.remove(key_path)
+    return key, key_slot
+
+def main(argv=None) -> int:
+    """Migrate a legacy vault from the command line; returns the exit status"""
+    import argparse
+    import getpass
+    
+    parser = argparse.ArgumentParser(description="Migrate a legacy Wi-Fi Password Manager vault")
+    parser.add_argument("--vault", default="wifi_data.enc", help="legacy vault file")
+    parser.add_argument("--key-file", default="master_key.hash", help="legacy master key file")
+    parser.add_argument("--batch-size", type=int, default=MIGRATE_BATCH_SIZE,
+                        help=f"entries per checkpoint (default: {MIGRATE_BATCH_SIZE})")
+    args = parser.parse_args(argv)
+    
+    def report(done, total):
+        print(f"\r{done * 100 // max(total, 1):3d}% of {total} bytes", end="", flush=True)
+    
+    try:
+        migrate_legacy_vault(getpass.getpass("Master password: "), args.vault, args.key_file,
+                             report, args.batch_size)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"\nMigration failed: {e}", file=sys.stderr)
+        return 1
+    print("\nMigration complete")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,605 @@
+import os
+import json
+import time
+import atexit
+import struct
+import threading
+import weakref
+import zlib
+import base64
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
+from encryption import key_check_value, wrap_key
+
+# Default time a save may wait so that saves arriving close together share one commit
+COMMIT_DELAY = 0.05
+
+# Vault container layout: magic, format version and header length, then the
+# JSON header (cipher and key check value), followed by fixed-size key slots
+# holding the KDF parameters, salt and the data key wrapped by the key derived
+# from the master password (see pack_key_slot). The rest is a sequence of
+# encrypted streams (see encryption.encrypt_stream) of binary entries (see
+# pack_entry): a snapshot followed by one stream per journal append.
+VAULT_MAGIC = b"WPMV"
+VAULT_CIPHER = 'aes-256-gcm'
+VAULT_VERSION = 5
+MAX_HEADER_SIZE = 1024 * 1024
+_PREFIX = struct.Struct(">4sBI")
+
+# Key slot: JSON length, the JSON slot padded with zeros, and a CRC-32 of
+# everything before it. There are two copies so that one is always intact
+# while the other is rewritten in place.
+KEY_SLOT_SIZE = 512
+KEY_SLOT_COUNT = 2
+_SLOT_LENGTH = struct.Struct(">H")
+_SLOT_CRC = struct.Struct(">I")
+
+# Binary entry: operation, SSID length, security length and sealed password
+# length, followed by the three fields; the SSID and security type may be at
+# most MAX_ENTRY_FIELD bytes each
+_ENTRY = struct.Struct(">BHHI")
+MAX_ENTRY_FIELD = 0xFFFF
+ENTRY_OPS = {'put': 1, 'del': 2}
+_ENTRY_NAMES = {code: op for op, code in ENTRY_OPS.items()}
+
+_writers = weakref.WeakSet()
+
+def file_signature(path: str) -> Optional[tuple]:
+    """
+    Get the stat signature used to detect changes to a file.
+    
+    Args:
+        path (str): Path to the file
+    
+    Returns:
+        Optional[tuple]: (mtime_ns, size, inode), or None if the file is missing
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def is_container(data: bytes) -> bool:
+    """
+    Check whether file contents use the binary vault container.
+    
+    Args:
+        data (bytes): File contents
+    
+    Returns:
+        bool: True for a container, False for the legacy base64 text vault
+    """
+    return bytes(data[:len(VAULT_MAGIC)]) == VAULT_MAGIC
+
+def pack_key_slot(slot: Dict) -> bytes:
+    """
+    Encode a key slot into its fixed-size, checksummed form.
+    
+    Args:
+        slot (Dict): Slot fields, including its 'seq' number
+    
+    Returns:
+        bytes: KEY_SLOT_SIZE bytes
+    
+    Raises:
+        ValueError: If the slot does not fit
+    """
+    encoded = json.dumps(slot, sort_keys=True).encode('utf-8')
+    room = KEY_SLOT_SIZE - _SLOT_LENGTH.size - _SLOT_CRC.size
+    if len(encoded) > room:
+        raise ValueError("Key slot too large")
+    body = _SLOT_LENGTH.pack(len(encoded)) + encoded + bytes(room - len(encoded))
+    return body + _SLOT_CRC.pack(zlib.crc32(body))
+
+def unpack_key_slot(data: bytes) -> Optional[Dict]:
+    """
+    Decode a key slot written by pack_key_slot.
+    
+    Args:
+        data (bytes): KEY_SLOT_SIZE bytes
+    
+    Returns:
+        Optional[Dict]: The slot, or None if it is torn or corrupt
+    """
+    data = bytes(data)
+    if len(data) != KEY_SLOT_SIZE:
+        return None
+    body, (crc,) = data[:-_SLOT_CRC.size], _SLOT_CRC.unpack(data[-_SLOT_CRC.size:])
+    if zlib.crc32(body) != crc:
+        return None
+    (length,) = _SLOT_LENGTH.unpack_from(body)
+    try:
+        slot = json.loads(body[_SLOT_LENGTH.size:_SLOT_LENGTH.size + length].decode('utf-8'))
+    except ValueError:
+        return None
+    return slot if isinstance(slot, dict) and isinstance(slot.get('seq'), int) else None
+
+def _newest_key_slot(area: bytes) -> Dict:
+    """Pick the intact key slot with the highest sequence number."""
+    slots = [unpack_key_slot(area[i * KEY_SLOT_SIZE:(i + 1) * KEY_SLOT_SIZE])
+             for i in range(KEY_SLOT_COUNT)]
+    slots = [slot for slot in slots if slot is not None]
+    if not slots:
+        raise ValueError("No intact key slot")
+    return max(slots, key=lambda slot: slot['seq'])
+
+def pack_header(header: Dict, key_slot: Dict) -> bytes:
+    """
+    Encode the container prefix and header.
+    
+    Args:
+        header (Dict): Header fields
+        key_slot (Dict): Key slot written to every slot copy
+    
+    Returns:
+        bytes: Magic, version, header length, header and key slots
+    """
+    encoded = json.dumps(header, sort_keys=True).encode('utf-8')
+    packed = _PREFIX.pack(VAULT_MAGIC, VAULT_VERSION, len(encoded)) + encoded
+    return packed + pack_key_slot(key_slot) * KEY_SLOT_COUNT
+
+def make_key_slot(key: bytes, wrapping_key: bytes, salt: bytes,
+                  kdf_params: Dict, seq: int = 0) -> Dict:
+    """
+    Build a key slot holding a data key wrapped by a derived key.
+    
+    Args:
+        key (bytes): The data key
+        wrapping_key (bytes): The key derived from the master password
+        salt (bytes): The salt wrapping_key was derived with
+        kdf_params (Dict): The parameters wrapping_key was derived with
+        seq (int): Sequence number; the highest intact slot wins
+    
+    Returns:
+        Dict: The key slot
+    """
+    return {
+        'seq': seq,
+        'kdf': kdf_params,
+        'salt': base64.b64encode(salt).decode('utf-8'),
+        'key': base64.b64encode(wrap_key(key, wrapping_key)).decode('utf-8')
+    }
+
+def pack_vault_header(key: bytes, key_slot: Dict) -> bytes:
+    """
+    Encode the header of a current vault.
+    
+    Args:
+        key (bytes): The data key the vault is encrypted with
+        key_slot (Dict): The slot holding it wrapped by the master password
+    
+    Returns:
+        bytes: Container prefix, header and key slots
+    """
+    return pack_header({
+        'check': base64.b64encode(key_check_value(key)).decode('utf-8'),
+        'cipher': VAULT_CIPHER
+    }, key_slot)
+
+def read_container_header(f: BinaryIO) -> Optional[Tuple[int, Dict]]:
+    """
+    Read the container prefix and header, leaving f at the first frame.
+    
+    Args:
+        f (BinaryIO): Vault file opened for binary reading at its start
+    
+    Returns:
+        Optional[Tuple[int, Dict]]: (version, header), or None if the file is
+            not a container, in which case f is rewound to its start; the
+            header carries the newest intact key slot as 'key_slot' and the
+            file offset of the slots as 'key_slot_offset'
+    
+    Raises:
+        ValueError: If the version is unsupported, the header is truncated
+            or too large, or no key slot is intact
+    """
+    prefix = f.read(_PREFIX.size)
+    if not is_container(prefix):
+        f.seek(0)
+        return None
+    if len(prefix) < _PREFIX.size:
+        raise ValueError("Truncated vault header")
+    _, version, header_len = _PREFIX.unpack(prefix)
+    if version != VAULT_VERSION:
+        raise ValueError(f"Unsupported vault version: {version}")
+    if header_len > MAX_HEADER_SIZE:
+        raise ValueError("Vault header too large")
+    encoded = f.read(header_len)
+    if len(encoded) < header_len:
+        raise ValueError("Truncated vault header")
+    header = json.loads(encoded.decode('utf-8'))
+    header['key_slot'] = _newest_key_slot(f.read(KEY_SLOT_SIZE * KEY_SLOT_COUNT))
+    header['key_slot_offset'] = _PREFIX.size + header_len
+    return version, header
+
+def check_entry_fields(ssid: str, security: str):
+    """
+    Check that an SSID and security type fit in a binary entry.
+    
+    Entries are packed when the writer commits them, so callers check
+    their fields first rather than lose the save then.
+    
+    Args:
+        ssid (str): Network SSID
+        security (str): Security type
+    
+    Raises:
+        TypeError: If either is not a string
+        ValueError: If either is longer than MAX_ENTRY_FIELD bytes in UTF-8
+    """
+    for name, value in (('SSID', ssid), ('Security type', security)):
+        if not isinstance(value, str):
+            raise TypeError(f"{name} must be a string")
+        if len(value.encode('utf-8')) > MAX_ENTRY_FIELD:
+            raise ValueError(f"{name} is longer than {MAX_ENTRY_FIELD} bytes")
+
+def pack_entry(op: str, ssid: str, security: str = "", sealed: bytes = b"") -> bytes:
+    """
+    Encode a journal entry in the binary format of vault streams.
+    
+    Args:
+        op (str): 'put' or 'del'
+        ssid (str): Network SSID
+        security (str): Security type
+        sealed (bytes): Sealed password, kept as raw bytes
+    
+    Returns:
+        bytes: The encoded entry
+    """
+    ssid_bytes = ssid.encode('utf-8')
+    security_bytes = security.encode('utf-8')
+    return b''.join((_ENTRY.pack(ENTRY_OPS[op], len(ssid_bytes), len(security_bytes), len(sealed)),
+                     ssid_bytes, security_bytes, sealed))
+
+def iter_entries(chunks: Iterable[bytes]) -> Iterator[Dict]:
+    """
+    Decode binary entries from a stream of chunks, which may split entries.
+    
+    Fields are read through memoryview slices of each chunk; only the
+    decoded strings and sealed passwords are copied out.
+    
+    Args:
+        chunks (Iterable[bytes]): Decrypted chunks of a vault stream
+    
+    Yields:
+        Dict: Entries with 'op', 'ssid', 'security' and 'sealed' keys
+    
+    Raises:
+        ValueError: If an entry is malformed or cut short
+    """
+    pending = b""
+    for chunk in chunks:
+        data = pending + chunk if pending else chunk
+        with memoryview(data) as view:
+            offset = 0
+            end = len(view)
+            while end - offset >= _ENTRY.size:
+                code, ssid_len, security_len, sealed_len = _ENTRY.unpack_from(view, offset)
+                start = offset + _ENTRY.size
+                security_start = start + ssid_len
+                sealed_start = security_start + security_len
+                stop = sealed_start + sealed_len
+                if stop > end:
+                    break
+                if code not in _ENTRY_NAMES:
+                    raise ValueError(f"Unknown vault entry type: {code}")
+                yield {
+                    'op': _ENTRY_NAMES[code],
+                    'ssid': str(view[start:security_start], 'utf-8'),
+                    'security': str(view[security_start:sealed_start], 'utf-8'),
+                    'sealed': bytes(view[sealed_start:stop])
+                }
+                offset = stop
+            pending = bytes(view[offset:])
+    if pending:
+        raise ValueError("Truncated vault entry")
+
+class ChunkReader:
+    """
+    Read-only file object over an iterable of byte strings.
+    
+    The iterable is consumed lazily, so a generator of encoded records can
+    be passed to encrypt_stream without joining them first.
+    """
+    
+    def __init__(self, chunks: Iterable[bytes]):
+        """
+        Args:
+            chunks (Iterable[bytes]): Byte strings to read in order
+        """
+        self._chunks = iter(chunks)
+        self._buffer = bytearray()
+    
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read up to size bytes, or everything left if size is negative.
+        
+        Args:
+            size (int): Number of bytes wanted
+        
+        Returns:
+            bytes: The data, shorter than size only at the end
+        """
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                break
+        if size < 0:
+            size = len(self._buffer)
+        with memoryview(self._buffer) as view:
+            data = bytes(view[:size])
+        del self._buffer[:size]
+        return data
+    
+    def readinto(self, buffer) -> int:
+        """
+        Read into a writable buffer without an intermediate bytes object.
+        
+        Args:
+            buffer: Writable bytes-like object
+        
+        Returns:
+            int: Number of bytes read, 0 only at the end
+        """
+        target = memoryview(buffer).cast('B')
+        while len(self._buffer) < len(target):
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                break
+        count = min(len(target), len(self._buffer))
+        with memoryview(self._buffer) as view:
+            target[:count] = view[:count]
+        del self._buffer[:count]
+        return count
+
+def _fsync_directory(path: str):
+    """Make a rename inside a directory durable, where the platform allows it."""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def write_key_slot(path: str, offset: int, slot: Dict):
+    """
+    Overwrite the key slots of a vault in place, one copy at a time.
+    
+    The copy that is older after a torn write (the one at index seq modulo
+    KEY_SLOT_COUNT) is written and fsynced first, so at every moment one
+    copy holds either the previous or the new slot intact. The caller must
+    make sure no rewrite of the file is in progress.
+    
+    Args:
+        path (str): Path to the vault file
+        offset (int): File offset of the first key slot
+        slot (Dict): New slot, with a 'seq' higher than the current one
+    """
+    packed = pack_key_slot(slot)
+    first = slot['seq'] % KEY_SLOT_COUNT
+    with open(path, 'r+b') as f:
+        for index in [first] + [i for i in range(KEY_SLOT_COUNT) if i != first]:
+            f.seek(offset + index * KEY_SLOT_SIZE)
+            f.write(packed)
+            f.flush()
+            os.fsync(f.fileno())
+
+def atomic_write(path: str, data: Union[bytes, Callable[[BinaryIO], None]]):
+    """
+    Replace a file's contents so that a crash leaves either the old or new file.
+    
+    The data is written to a temporary file next to the target, fsynced and
+    renamed over it.
+    
+    Args:
+        path (str): Path to the file
+        data (Union[bytes, Callable]): New contents, or a function that
+            writes them to the file object it is given
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        if callable(data):
+            data(f)
+        else:
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    replace_file(tmp_path, path)
+
+def replace_file(src: str, dst: str):
+    """
+    Atomically rename a fully written and fsynced file over another.
+    
+    Args:
+        src (str): Path to the new file
+        dst (str): Path it replaces
+    """
+    os.replace(src, dst)
+    _fsync_directory(dst)
+
+class VaultWriter:
+    """
+    Group-commit writer for the vault file.
+    
+    Saves are queued and committed together by a background thread, at most
+    commit_delay seconds after the first one arrived, so a burst of changes
+    costs a single fsync. Full rewrites go through a temp file and an atomic
+    rename; appends are fsynced in place. A commit_delay of 0 commits every
+    save immediately in the calling thread.
+    """
+    
+    def __init__(self, path: str, commit_delay: float = COMMIT_DELAY):
+        """
+        Args:
+            path (str): Path to the vault file
+            commit_delay (float): Longest time a save waits to be committed
+        """
+        # Resolve now so a later change of working directory cannot redirect saves
+        self.path = os.path.abspath(path)
+        self.commit_delay = commit_delay
+        
+        self._cond = threading.Condition()
+        self._replace = None      # Pending full contents, if a rewrite is queued
+        self._appends = []        # Pending appends, applied after the rewrite
+        self._first_pending = None
+        self._flush_requested = False
+        self._committing = False
+        self._error = None
+        self._thread = None
+        
+        # Number of saves submitted and committed, and the file's stat after
+        # the last commit, so callers can recognise their own writes
+        self.submitted = 0
+        self.committed = 0
+        self.signature = None
+        
+        _writers.add(self)
+    
+    def append(self, data: bytes):
+        """
+        Queue data to be appended to the file.
+        
+        Args:
+            data (bytes): Data to append
+        """
+        self._submit(None, data)
+    
+    def replace(self, data: Union[bytes, Callable[[BinaryIO], None]]):
+        """
+        Queue a full rewrite of the file, superseding any queued saves.
+        
+        Args:
+            data (Union[bytes, Callable]): New contents, or a function that
+                writes them to the file object it is given when the rewrite
+                is committed, so they never have to be held in memory
+        """
+        self._submit(data, None)
+    
+    def busy(self) -> bool:
+        """
+        Check whether saves are queued or being committed.
+        
+        Returns:
+            bool: True if some submitted saves are not on disk yet
+        """
+        with self._cond:
+            return self.submitted != self.committed
+    
+    def flush(self):
+        """
+        Wait until every queued save is durably on disk.
+        
+        Raises:
+            Exception: The error a background commit failed with, usually OSError
+        """
+        with self._cond:
+            if self.submitted != self.committed:
+                self._flush_requested = True
+                self._cond.notify_all()
+                while self.submitted != self.committed and self._error is None:
+                    self._cond.wait()
+            self._raise_error()
+    
+    def _raise_error(self):
+        """Re-raise a failed background commit once (caller holds the lock)."""
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+    
+    def _submit(self, replace, append: Optional[bytes]):
+        """Queue a save and commit it now or hand it to the background thread."""
+        with self._cond:
+            self._raise_error()
+            if replace is not None:
+                self._replace = replace
+                self._appends = []
+            else:
+                self._appends.append(append)
+            self.submitted += 1
+            
+            if self.commit_delay > 0:
+                if self._first_pending is None:
+                    self._first_pending = time.monotonic()
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="VaultWriter", daemon=True)
+                    self._thread.start()
+                self._cond.notify_all()
+                return
+        
+        self._commit_pending()
+    
+    def _run(self):
+        """Background loop committing queued saves; exits once idle."""
+        with self._cond:
+            while self._first_pending is not None:
+                deadline = self._first_pending + self.commit_delay
+                while not self._flush_requested:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                self._cond.release()
+                try:
+                    self._commit_pending()
+                finally:
+                    self._cond.acquire()
+            self._thread = None
+    
+    def _commit_pending(self):
+        """Write every queued save with a single fsync."""
+        with self._cond:
+            while self._committing:
+                self._cond.wait()
+            replace, appends, target = self._replace, self._appends, self.submitted
+            self._replace, self._appends = None, []
+            self._first_pending = None
+            self._flush_requested = False
+            self._committing = True
+        
+        error = None
+        signature = None
+        try:
+            if replace is not None:
+                def write(f):
+                    if callable(replace):
+                        replace(f)
+                    else:
+                        f.write(replace)
+                    for data in appends:
+                        f.write(data)
+                atomic_write(self.path, write)
+            elif appends:
+                with open(self.path, 'ab') as f:
+                    f.write(b''.join(appends))
+                    f.flush()
+                    os.fsync(f.fileno())
+            signature = file_signature(self.path)
+        except Exception as e:
+            error = e
+        
+        with self._cond:
+            self._committing = False
+            self.committed = target
+            if error is not None:
+                # The file no longer matches what callers think was saved
+                self._error = error
+                self.signature = None
+            else:
+                self.signature = signature
+            self._cond.notify_all()
+        
+        if error is not None and self.commit_delay <= 0:
+            with self._cond:
+                self._raise_error()
+
+@atexit.register
+def _flush_all_writers():
+    """Commit saves still queued when the interpreter exits."""
+    for writer in list(_writers):
+        try:
+            writer.flush()
+        except Exception:
+            pass
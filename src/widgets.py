@@ -0,0 +1,274 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, Iterable, Optional, Sequence, Tuple
+
+# Rows held in the tree above and below the visible ones, so short scrolls
+# only move the tree's own view
+OVERSCAN = 20
+
+# Row height assumed when the theme does not set one
+DEFAULT_ROW_HEIGHT = 20
+
+class VirtualTreeview(tk.Frame):
+    """
+    Treeview that holds only the rows around the visible window.
+    
+    Rows come from a sequence of keys, which become the item iids, and a
+    function building a row's values from its key. Only the visible rows
+    and OVERSCAN rows on either side exist as Tk items; the scrollbar, mouse
+    wheel and arrow keys page rows in and out as the view moves, so opening
+    and scrolling cost the same whatever the number of keys. The selection
+    is kept by key, so it survives its rows being paged out.
+    """
+    
+    def __init__(self, master, columns: Sequence[str], row_values: Callable[[str], Tuple],
+                 height: int = 15, overscan: int = OVERSCAN, xscroll: bool = False, **kwargs):
+        """
+        Args:
+            master: Parent widget
+            columns (Sequence[str]): Column identifiers
+            row_values (Callable): Builds the values of the row for a key
+            height (int): Rows shown before the widget is laid out
+            overscan (int): Rows held beyond each edge of the view
+            xscroll (bool): Whether to add a horizontal scrollbar
+            **kwargs: Options for the surrounding frame
+        """
+        super().__init__(master, **kwargs)
+        self.row_values = row_values
+        self.overscan = overscan
+        
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=height,
+                                 yscrollcommand=self._on_tree_scroll)
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        if xscroll:
+            x_scrollbar = tk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
+            self.tree.configure(xscrollcommand=x_scrollbar.set)
+            x_scrollbar.grid(row=1, column=0, sticky="ew")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        
+        # Every key in order, the index of the first visible one, and the
+        # keys held in the tree starting at index _start with their values
+        self._keys = []
+        self._top = 0
+        self._start = 0
+        self._window = []
+        self._values = {}
+        self._visible = height
+        self._selection = []
+        self._rendering = False
+        
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self._scroll_units(-3))
+        self.tree.bind("<Button-5>", lambda event: self._scroll_units(3))
+        self.tree.bind("<Up>", lambda event: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda event: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda event: self._move_selection(-self._visible))
+        self.tree.bind("<Next>", lambda event: self._move_selection(self._visible))
+    
+    def heading(self, column: str, **options):
+        """Configure a column heading, as ttk.Treeview.heading"""
+        return self.tree.heading(column, **options)
+    
+    def column(self, column: str, **options):
+        """Configure a column, as ttk.Treeview.column"""
+        return self.tree.column(column, **options)
+    
+    def set_keys(self, keys: Sequence[str]):
+        """
+        Show a new sequence of keys, keeping the scroll position.
+        
+        Rows that stay in view keep their Tk items and values; use
+        refresh_rows for keys whose values changed. Selected keys that are
+        no longer shown are deselected.
+        
+        Args:
+            keys (Sequence[str]): Keys in display order; it is not copied,
+                so pass a new sequence rather than changing this one
+        """
+        self._keys = keys
+        if self._selection:
+            self._selection = [key for key in self._selection if key in keys]
+        self._scroll_to(self._top, force=True)
+    
+    def refresh_rows(self, keys: Optional[Iterable[str]] = None):
+        """
+        Rebuild the values of rows that are held in the tree.
+        
+        Args:
+            keys (Iterable[str]): Keys whose values changed, or None for all
+        """
+        for key in self._window if keys is None else keys:
+            if key in self._values:
+                values = self.row_values(key)
+                if values != self._values[key]:
+                    self.tree.item(key, values=values)
+                    self._values[key] = values
+    
+    def selection(self) -> Tuple[str, ...]:
+        """
+        Get the selected keys, whether or not their rows are in view.
+        
+        Returns:
+            Tuple[str, ...]: Selected keys
+        """
+        return tuple(self._selection)
+    
+    def scroll_to(self, index: int):
+        """
+        Scroll so that the key at an index is the first one visible.
+        
+        Args:
+            index (int): Index into the keys
+        """
+        self._scroll_to(index)
+    
+    def yview(self, *args):
+        """Scroll from a scrollbar command ('moveto' or 'scroll')"""
+        if not args:
+            return self._fractions()
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * len(self._keys)))
+        elif args[0] == "scroll":
+            count = int(args[1])
+            self._scroll_units(count * self._visible if args[2] == "pages" else count)
+    
+    def _fractions(self) -> Tuple[float, float]:
+        total = len(self._keys)
+        if not total:
+            return 0.0, 1.0
+        return self._top / total, min(1.0, (self._top + self._visible) / total)
+    
+    def _scroll_units(self, count: int):
+        self._scroll_to(self._top + count)
+        return "break"
+    
+    def _scroll_to(self, top: int, force: bool = False):
+        """
+        Move the view, paging rows in only when it leaves the held window.
+        
+        Args:
+            top (int): Index of the key to show first
+            force (bool): Rebuild the window even if it still covers the view
+        """
+        total = len(self._keys)
+        top = max(0, min(top, total - self._visible))
+        end = min(total, top + self._visible)
+        if force or top < self._start or end > self._start + len(self._window):
+            start = max(0, top - self.overscan)
+            self._render(start, min(total, end + self.overscan))
+        
+        self._top = top
+        self._rendering = True
+        try:
+            if self._window:
+                self.tree.yview_moveto((top - self._start) / len(self._window))
+        finally:
+            self._rendering = False
+        self.scrollbar.set(*self._fractions())
+    
+    def _render(self, start: int, end: int):
+        """
+        Hold the keys from start to end in the tree with the fewest Tk calls.
+        
+        Rows still in the window are kept (moved if needed), the rest are
+        deleted, and only rows entering the window are built.
+        
+        Args:
+            start (int): Index of the first key to hold
+            end (int): Index after the last key to hold
+        """
+        keys = list(self._keys[start:end])
+        wanted = set(keys)
+        self._rendering = True
+        try:
+            gone = [key for key in self._window if key not in wanted]
+            if gone:
+                self.tree.delete(*gone)
+                for key in gone:
+                    del self._values[key]
+            
+            order = [key for key in self._window if key in wanted]
+            for index, key in enumerate(keys):
+                if key in self._values:
+                    if order[index] != key:
+                        self.tree.move(key, "", index)
+                        order.remove(key)
+                        order.insert(index, key)
+                    continue
+                values = self.row_values(key)
+                self.tree.insert("", index, iid=key, values=values)
+                self._values[key] = values
+                order.insert(index, key)
+            
+            self._start = start
+            self._window = keys
+            selected = [key for key in self._selection if key in wanted]
+            self.tree.selection_set(selected)
+        finally:
+            self._rendering = False
+    
+    def _on_tree_scroll(self, first: str, last: str):
+        """Follow scrolling done by the tree itself, such as showing the focused row"""
+        if self._rendering or not self._window:
+            return
+        count = len(self._window)
+        visible = round((float(last) - float(first)) * count)
+        if float(last) < 1.0 or float(first) > 0.0:
+            self._visible = max(1, visible)
+        self._top = self._start + round(float(first) * count)
+        self.scrollbar.set(*self._fractions())
+    
+    def _on_configure(self, event):
+        """Estimate how many rows fit when the tree is resized"""
+        row_height = ttk.Style().lookup("Treeview", "rowheight")
+        try:
+            row_height = int(row_height) or DEFAULT_ROW_HEIGHT
+        except (TypeError, ValueError):
+            row_height = DEFAULT_ROW_HEIGHT
+        self._visible = max(1, event.height // row_height)
+        self._scroll_to(self._top)
+    
+    def _on_select(self, event):
+        """Keep the selection by key, including keys outside the window"""
+        if self._rendering:
+            return
+        held = set(self._window)
+        self._selection = ([key for key in self._selection if key not in held] +
+                           list(self.tree.selection()))
+    
+    def _on_mousewheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS small deltas
+        steps = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_units(-3 * steps)
+    
+    def _move_selection(self, offset: int):
+        """Move the selection by offset rows, paging the new row into view"""
+        total = len(self._keys)
+        if not total:
+            return "break"
+        focus = self.tree.focus()
+        if focus in self._values:
+            index = self._start + self._window.index(focus) + offset
+        else:
+            index = self._top if offset > 0 else self._top + self._visible - 1
+        index = max(0, min(index, total - 1))
+        
+        if index < self._top:
+            self._scroll_to(index)
+        elif index >= self._top + self._visible:
+            self._scroll_to(index - self._visible + 1)
+        key = self._keys[index]
+        self._selection = [key]
+        self._rendering = True
+        try:
+            self.tree.selection_set([key])
+            self.tree.focus(key)
+        finally:
+            self._rendering = False
+        self.tree.event_generate("<<TreeviewSelect>>")
+        return "break"
@@ -0,0 +1,90 @@
+import sys
+import os
+import time
+import threading
+import unittest
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from background import BackgroundExecutor
+
+class FakeRoot:
+    """Stands in for a Tk root, running after() callbacks when asked"""
+    
+    def __init__(self):
+        self.jobs = []
+    
+    def after(self, ms, callback, *args):
+        self.jobs.append((callback, args))
+        return len(self.jobs)
+    
+    def run_until_idle(self, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self.jobs:
+            if time.monotonic() > deadline:
+                raise TimeoutError("Background work did not finish")
+            callback, args = self.jobs.pop(0)
+            callback(*args)
+            time.sleep(0.001)
+
+class TestBackgroundExecutor(unittest.TestCase):
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.root = FakeRoot()
+        self.errors = []
+        self.executor = BackgroundExecutor(self.root, on_error=self.errors.append)
+    
+    def tearDown(self):
+        """Tear down test fixtures after each test method."""
+        self.executor.shutdown()
+    
+    def test_results_are_delivered_on_the_main_loop_in_order(self):
+        """Test that work runs off the calling thread and callbacks run from after()"""
+        main_thread = threading.get_ident()
+        results = []
+        
+        for i in range(5):
+            self.executor.submit(lambda i: (i, threading.get_ident()), i,
+                                 on_done=lambda result: results.append((result, threading.get_ident())))
+        self.assertTrue(self.executor.busy())
+        self.assertEqual(results, [])
+        
+        self.root.run_until_idle()
+        self.assertFalse(self.executor.busy())
+        self.assertEqual([result[0][0] for result in results], list(range(5)))
+        for (_, worker), caller in results:
+            self.assertNotEqual(worker, main_thread)
+            self.assertEqual(caller, main_thread)
+    
+    def test_errors_go_to_the_error_callback(self):
+        """Test that an exception reaches the call's on_error, or the executor's"""
+        def fail():
+            raise ValueError("broken")
+        
+        own = []
+        self.executor.submit(fail, on_error=own.append)
+        self.executor.submit(fail)
+        self.root.run_until_idle()
+        
+        self.assertEqual([str(error) for error in own], ["broken"])
+        self.assertEqual([str(error) for error in self.errors], ["broken"])
+    
+    def test_failing_callback_keeps_polling(self):
+        """Test that a callback that raises does not strand later results"""
+        done = []
+        release = threading.Event()
+        self.executor.submit(lambda: None, on_done=lambda result: 1 / 0)
+        self.executor.submit(release.wait, on_done=done.append)
+        
+        with self.assertRaises(ZeroDivisionError):
+            while not done:
+                callback, args = self.root.jobs.pop(0)
+                callback(*args)
+        release.set()
+        self.root.run_until_idle()
+        self.assertEqual(done, [True])
+
+if __name__ == '__main__':
+    unittest.main()
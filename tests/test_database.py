@@ -1,13 +1,43 @@
 import sys
 import os
 import unittest
+import threading
 import tempfile
 import shutil
+import json
+import base64
+import struct
+import tracemalloc
+from unittest import mock
 
 # Add src directory to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
+import database
+import storage
 from database import DatabaseManager
+from encryption import encrypt_data, KDF_BACKENDS, STREAM_FINAL, get_kdf_backend, set_kdf_backend
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'legacy_vault')
+
+def read_header():
+    """Read the container version and header of the vault in the current directory"""
+    with open("wifi_data.enc", "rb") as f:
+        return storage.read_container_header(f)
+
+def count_streams():
+    """Count the encrypted streams (snapshot and appends) in the vault in the current directory"""
+    count = 0
+    with open("wifi_data.enc", "rb") as f:
+        storage.read_container_header(f)
+        while True:
+            prefix = f.read(4)
+            if len(prefix) < 4:
+                return count
+            (length,) = struct.unpack(">I", prefix)
+            # Each frame starts with its flags; the last one of a stream is marked final
+            if f.read(length)[0] & STREAM_FINAL:
+                count += 1
 
 class TestDatabase(unittest.TestCase):
     
@@ -38,7 +68,7 @@ class TestDatabase(unittest.TestCase):
         
         # Check that database files were created
         self.assertTrue(os.path.exists("wifi_data.enc"))
-        self.assertTrue(os.path.exists("master_key.hash"))
+        self.assertFalse(os.path.exists("master_key.hash"))
     
     def test_add_and_retrieve_wifi(self):
         """Test adding and retrieving Wi-Fi credentials"""
@@ -97,6 +127,697 @@ class TestDatabase(unittest.TestCase):
         # Try to unlock with wrong password
         result = db.unlock_database("wrong_password")
         self.assertFalse(result)
+    
+    def test_reads_are_served_from_cache(self):
+        """Test that repeated reads do not decrypt the vault again"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        db.add_wifi("TestNetwork", "testpass123", "WPA")
+        
+        with mock.patch.object(database, "iter_decrypt_stream", wraps=database.iter_decrypt_stream) as spy:
+            for _ in range(5):
+                self.assertEqual(len(list(db.iter_wifi())), 1)
+            self.assertEqual(spy.call_count, 0)
+    
+    def test_cache_reloads_when_file_changes(self):
+        """Test that a change to the vault file on disk is picked up"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        db.get_all_wifi()
+        
+        other = DatabaseManager()
+        self.assertTrue(other.unlock_database("test_password"))
+        other.add_wifi("OtherNetwork", "otherpass123", "WPA2")
+        self.assertTrue(other.flush())
+        
+        networks = db.get_all_wifi()
+        self.assertEqual([n["ssid"] for n in networks], ["OtherNetwork"])
+    
+    def test_lock_database_drops_cache(self):
+        """Test that locking forgets the key and cached records"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        db.add_wifi("TestNetwork", "testpass123", "WPA")
+        
+        db.lock_database()
+        self.assertIsNone(db.key)
+        self.assertEqual(db.get_all_wifi(), [])
+    
+    def test_key_derived_once_per_unlock(self):
+        """Test that creating and unlocking each run the KDF exactly once"""
+        db = DatabaseManager()
+        with mock.patch.object(database, "derive_key", wraps=database.derive_key) as kdf:
+            self.assertTrue(db.initialize_database("test_password"))
+            self.assertEqual(kdf.call_count, 1)
+            
+            kdf.reset_mock()
+            self.assertTrue(DatabaseManager().unlock_database("test_password"))
+            self.assertEqual(kdf.call_count, 1)
+            
+            kdf.reset_mock()
+            self.assertFalse(DatabaseManager().unlock_database("wrong_password"))
+            self.assertEqual(kdf.call_count, 1)
+    
+    def test_get_has_and_upsert_wifi(self):
+        """Test keyed lookups and that updates keep insertion order"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        
+        self.assertTrue(db.upsert_wifi("First", "firstpass1", "WPA"))
+        self.assertTrue(db.upsert_wifi("Second", "secondpass", "WPA2"))
+        self.assertTrue(db.upsert_wifi("First", "changedpass", "WPA2"))
+        
+        self.assertTrue(db.has_wifi("First"))
+        self.assertFalse(db.has_wifi("Missing"))
+        self.assertIsNone(db.get_wifi("Missing"))
+        self.assertEqual(db.get_wifi("First")["password"], "changedpass")
+        self.assertEqual([n["ssid"] for n in db.get_all_wifi()], ["First", "Second"])
+        
+        self.assertFalse(db.delete_wifi("Missing"))
+    
+    def test_journal_appends_instead_of_rewriting(self):
+        """Test that changes are appended and replayed on load"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        snapshot_size = os.path.getsize("wifi_data.enc")
+        
+        db.add_wifi("First", "firstpass1", "WPA")
+        db.add_wifi("Second", "secondpass", "WPA2")
+        db.delete_wifi("First")
+        self.assertTrue(db.flush())
+        
+        # The snapshot written by initialize_database plus three appends
+        self.assertEqual(count_streams(), 4)
+        self.assertGreater(os.path.getsize("wifi_data.enc"), snapshot_size)
+        
+        other = DatabaseManager()
+        self.assertTrue(other.unlock_database("test_password"))
+        self.assertEqual([n["ssid"] for n in other.get_all_wifi()], ["Second"])
+    
+    def test_journal_compacts_dead_entries(self):
+        """Test that the journal is rewritten once dead entries pile up"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        
+        for i in range(database.JOURNAL_COMPACT_MIN_DEAD + 2):
+            db.add_wifi("Network", f"password{i:04d}", "WPA")
+        self.assertTrue(db.flush())
+        
+        self.assertLess(count_streams(), database.JOURNAL_COMPACT_MIN_DEAD)
+        self.assertEqual(db.get_wifi("Network")["password"],
+                         f"password{database.JOURNAL_COMPACT_MIN_DEAD + 1:04d}")
+    
+    def test_torn_journal_tail_is_ignored(self):
+        """Test that a partially written last entry does not lose the vault"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        db.add_wifi("First", "firstpass1", "WPA")
+        self.assertTrue(db.flush())
+        with open("wifi_data.enc", "ab") as f:
+            f.write(b"\x00\x00\x01\x00torn")
+        
+        other = DatabaseManager()
+        self.assertTrue(other.unlock_database("test_password"))
+        self.assertTrue(other.add_wifi("Second", "secondpass", "WPA2"))
+        self.assertTrue(other.flush())
+        
+        reopened = DatabaseManager()
+        self.assertTrue(reopened.unlock_database("test_password"))
+        self.assertEqual([n["ssid"] for n in reopened.get_all_wifi()], ["First", "Second"])
+    
+    def test_passwords_decrypted_on_demand(self):
+        """Test that listing skips passwords and lookups decrypt only one"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        db.add_wifi("First", "firstpass1", "WPA")
+        db.add_wifi("Open", "", "NOPASS")
+        self.assertTrue(db.flush())
+        
+        reopened = DatabaseManager()
+        self.assertTrue(reopened.unlock_database("test_password"))
+        with mock.patch.object(database, "aead_decrypt", wraps=database.aead_decrypt) as spy:
+            listed = list(reopened.iter_wifi())
+            self.assertEqual(spy.call_count, 0)
+            self.assertEqual(listed, [{"ssid": "First", "security": "WPA"},
+                                      {"ssid": "Open", "security": "NOPASS"}])
+            
+            self.assertEqual(reopened.get_wifi("First")["password"], "firstpass1")
+            self.assertEqual(spy.call_count, 1)
+        self.assertEqual(reopened.get_wifi("Open")["password"], "")
+    
+    def test_legacy_vault_is_migrated(self):
+        """Test that a base64 vault with a separate key file migrates on unlock"""
+        key, salt = database.derive_key("test_password")
+        legacy = [{"ssid": "Legacy", "password": "legacypass", "security": "WPA2"}]
+        with open("wifi_data.enc", "w") as f:
+            f.write(encrypt_data(json.dumps(legacy), key))
+        with open("master_key.hash", "w") as f:
+            json.dump({"hash": base64.b64encode(key).decode("utf-8"),
+                       "salt": base64.b64encode(salt).decode("utf-8")}, f)
+        
+        self.assertFalse(DatabaseManager().unlock_database("wrong_password"))
+        self.assertTrue(os.path.exists("master_key.hash"))
+        
+        db = DatabaseManager()
+        self.assertTrue(db.unlock_database("test_password"))
+        self.assertEqual(db.get_all_wifi(), legacy)
+        self.assertFalse(os.path.exists("master_key.hash"))
+        with open("wifi_data.enc", "rb") as f:
+            self.assertTrue(storage.is_container(f.read()))
+        self.assertEqual(count_streams(), 1)
+        
+        reopened = DatabaseManager()
+        self.assertTrue(reopened.unlock_database("test_password"))
+        self.assertEqual(reopened.get_all_wifi(), legacy)
+    
+    def test_unlock_reads_vault_once(self):
+        """Test that unlocking opens a single file"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        db.add_wifi("First", "firstpass1", "WPA")
+        self.assertTrue(db.flush())
+        
+        with mock.patch.object(database, "open", wraps=open, create=True) as opened:
+            self.assertTrue(DatabaseManager().unlock_database("test_password"))
+            self.assertEqual(opened.call_count, 1)
+    
+    def test_add_many_commits_once(self):
+        """Test that a batch of records is written with a single append"""
+        db = DatabaseManager(commit_delay=0)
+        self.assertTrue(db.initialize_database("test_password"))
+        db.add_wifi("Existing", "existing123", "WPA")
+        
+        batch = [{"ssid": f"Net{i}", "password": f"password{i}", "security": "WPA2"}
+                 for i in range(50)]
+        batch.append({"ssid": "Existing", "password": "changed123", "security": "WPA"})
+        batch.append({"ssid": "Broken"})
+        
+        results = db.add_many(batch)
+        self.assertTrue(db.flush())
+        self.assertEqual(count_streams(), 3)
+        
+        self.assertEqual([r["status"] for r in results].count("added"), 50)
+        self.assertEqual(results[50], {"ssid": "Existing", "status": "updated", "error": None})
+        self.assertEqual(results[51]["status"], "error")
+        
+        reopened = DatabaseManager()
+        self.assertTrue(reopened.unlock_database("test_password"))
+        self.assertEqual(len(reopened.get_all_wifi()), 51)
+        self.assertEqual(reopened.get_wifi("Existing")["password"], "changed123")
+    
+    def test_oversized_fields_are_rejected(self):
+        """Test that fields too long for a binary entry fail before anything is saved"""
+        db = DatabaseManager(journal=False)
+        self.assertTrue(db.initialize_database("test_password"))
+        self.assertTrue(db.add_wifi("Kept", "keptpass1", "WPA"))
+        
+        self.assertFalse(db.add_wifi("x" * 70000, "pw", "WPA"))
+        self.assertFalse(db.add_wifi("Net", "pw", "é" * 40000))
+        results = db.add_many([{"ssid": "Fine", "password": "finepass", "security": "WPA2"},
+                               {"ssid": "y" * 70000, "password": "pw", "security": "WPA"}])
+        self.assertEqual([r["status"] for r in results], ["added", "error"])
+        self.assertTrue(db.flush())
+        
+        reopened = DatabaseManager()
+        self.assertTrue(reopened.unlock_database("test_password"))
+        self.assertEqual(reopened.get_ssids(), ["Kept", "Fine"])
+    
+    def test_failed_background_commit_is_reported(self):
+        """Test that any error from the writer thread comes back as a failed save"""
+        db = DatabaseManager(journal=False)
+        self.assertTrue(db.initialize_database("test_password"))
+        
+        with mock.patch.object(database, "check_entry_fields"):
+            self.assertTrue(db.add_wifi("x" * 70000, "pw", "WPA"))
+            self.assertFalse(db.flush())
+            self.assertTrue(db.add_wifi("Later", "laterpass", "WPA"))
+            self.assertTrue(db.add_wifi("y" * 70000, "pw", "WPA"))
+        self.assertFalse(db.lock_database())
+        
+        # The failed rewrites never replaced the vault
+        self.assertTrue(db.unlock_database("test_password"))
+        self.assertEqual(db.get_ssids(), [])
+    
+    def test_transaction_rolls_back_on_error(self):
+        """Test that a failed transaction leaves memory and disk untouched"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        db.add_wifi("First", "firstpass1", "WPA")
+        size = os.path.getsize("wifi_data.enc")
+        
+        with self.assertRaises(RuntimeError):
+            with db.transaction():
+                db.add_wifi("Second", "secondpass", "WPA2")
+                db.delete_wifi("First")
+                raise RuntimeError("abort")
+        
+        self.assertEqual(os.path.getsize("wifi_data.enc"), size)
+        self.assertEqual([n["ssid"] for n in db.get_all_wifi()], ["First"])
+    
+    def test_saves_are_grouped_into_one_commit(self):
+        """Test that saves arriving together share a single commit"""
+        db = DatabaseManager(commit_delay=10)
+        self.assertTrue(db.initialize_database("test_password"))
+        
+        with mock.patch("storage.os.fsync") as fsync:
+            for i in range(20):
+                self.assertTrue(db.add_wifi(f"Net{i}", f"password{i}", "WPA2"))
+            self.assertEqual(fsync.call_count, 0)
+            self.assertTrue(db.flush())
+            self.assertEqual(fsync.call_count, 1)
+        
+        reopened = DatabaseManager()
+        self.assertTrue(reopened.unlock_database("test_password"))
+        self.assertEqual(len(reopened.get_all_wifi()), 20)
+    
+    def test_rewrite_is_atomic(self):
+        """Test that a full rewrite goes through a temp file and a rename"""
+        db = DatabaseManager(journal=False, commit_delay=0)
+        self.assertTrue(db.initialize_database("test_password"))
+        
+        with mock.patch("storage.os.replace", side_effect=OSError("disk full")):
+            self.assertFalse(db.add_wifi("Lost", "lostpass1", "WPA"))
+        
+        reopened = DatabaseManager()
+        self.assertTrue(reopened.unlock_database("test_password"))
+        self.assertEqual(reopened.get_all_wifi(), [])
+    
+    def test_vault_path_survives_directory_change(self):
+        """Test that reads and writes keep using the vault the manager was created for"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        self.assertTrue(db.add_wifi("Before", "beforepass", "WPA"))
+        
+        os.chdir(tempfile.mkdtemp(dir=self.test_dir))
+        self.assertTrue(db.add_wifi("After", "afterpass", "WPA2"))
+        self.assertTrue(db.flush())
+        db._invalidate_cache()
+        self.assertEqual(db.get_ssids(), ["Before", "After"])
+        self.assertFalse(os.path.exists("wifi_data.enc"))
+        
+        os.chdir(self.test_dir)
+        reopened = DatabaseManager()
+        self.assertTrue(reopened.unlock_database("test_password"))
+        self.assertEqual(reopened.get_ssids(), ["Before", "After"])
+    
+    def test_tampered_frame_is_rejected(self):
+        """Test that a modified frame fails authentication on unlock"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        db.add_wifi("First", "firstpass1", "WPA")
+        db.add_wifi("Second", "secondpass", "WPA2")
+        self.assertTrue(db.flush())
+        
+        with open("wifi_data.enc", "r+b") as f:
+            data = bytearray(f.read())
+            data[-40] ^= 0x01
+            f.seek(0)
+            f.write(data)
+        
+        self.assertFalse(DatabaseManager().unlock_database("test_password"))
+    
+    def test_kdf_params_stored_with_vault(self):
+        """Test that a vault records its KDF parameters and unlocks with them"""
+        params = {"name": "scrypt", "n": 2 ** 10, "r": 8, "p": 1}
+        db = DatabaseManager(kdf_params=params)
+        self.assertTrue(db.initialize_database("test_password"))
+        db.add_wifi("TestWiFi", "password123", "WPA2")
+        self.assertTrue(db.flush())
+        
+        _, header = read_header()
+        self.assertEqual(header["key_slot"]["kdf"]["name"], "scrypt")
+        self.assertEqual(header["key_slot"]["kdf"]["n"], 2 ** 10)
+        
+        # A manager configured with different defaults still opens the vault
+        reopened = DatabaseManager()
+        self.assertTrue(reopened.unlock_database("test_password"))
+        self.assertFalse(DatabaseManager().unlock_database("wrong_password"))
+        self.assertEqual(reopened.get_wifi("TestWiFi")["password"], "password123")
+    
+    def test_unknown_kdf_refuses_unlock(self):
+        """Test that a vault naming an unsupported KDF is not unlocked"""
+        db = DatabaseManager(kdf_params={"name": "pbkdf2-sha1", "iterations": 1000})
+        self.assertTrue(db.initialize_database("test_password"))
+        
+        with open("wifi_data.enc", "rb") as f:
+            _, header = storage.read_container_header(f)
+            streams = f.read()
+        key_slot = header.pop("key_slot")
+        del header["key_slot_offset"]
+        key_slot["kdf"] = {"name": "argon9", "dklen": 32}
+        with open("wifi_data.enc", "wb") as f:
+            f.write(storage.pack_header(header, key_slot) + streams)
+        
+        self.assertFalse(DatabaseManager().unlock_database("test_password"))
+    
+    def test_other_container_versions_are_refused(self):
+        """Test that a container from another format version is not unlocked"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        self.assertTrue(db.add_wifi("Home", "homepassword", "WPA2"))
+        self.assertTrue(db.lock_database())
+        
+        for version in (storage.VAULT_VERSION - 1, storage.VAULT_VERSION + 1):
+            with self.subTest(version=version):
+                with open("wifi_data.enc", "r+b") as f:
+                    f.seek(len(storage.VAULT_MAGIC))
+                    f.write(bytes([version]))
+                self.assertFalse(DatabaseManager().unlock_database("test_password"))
+    
+    def test_fixture_vault_opens_with_every_kdf_backend(self):
+        """Test that a vault written by the original release unlocks with each backend"""
+        original = get_kdf_backend("pbkdf2-sha1")
+        self.addCleanup(set_kdf_backend, "pbkdf2-sha1", original)
+        expected = [
+            {"ssid": "HomeNetwork", "password": "correcthorse", "security": "WPA2"},
+            {"ssid": "Café Guest", "password": "bonjour123", "security": "WPA"},
+            {"ssid": "OpenLobby", "password": "", "security": "NOPASS"},
+        ]
+        
+        for backend in KDF_BACKENDS["pbkdf2-sha1"]:
+            with self.subTest(backend=backend):
+                set_kdf_backend("pbkdf2-sha1", backend)
+                for name in ("wifi_data.enc", "master_key.hash"):
+                    shutil.copy(os.path.join(FIXTURE_DIR, name), name)
+                
+                db = DatabaseManager()
+                self.assertFalse(db.unlock_database("wrong-password"))
+                self.assertTrue(db.unlock_database("fixture-password"))
+                self.assertEqual(db.get_all_wifi(), expected)
+                db.lock_database()
+                os.remove("wifi_data.enc")
+    
+    def test_snapshot_is_streamed_to_disk(self):
+        """Test that a full rewrite does not hold the encrypted vault in memory"""
+        db = DatabaseManager(journal=False, commit_delay=0)
+        self.assertTrue(db.initialize_database("test_password"))
+        # Long SSIDs keep the binary records well above a pointer each
+        db.add_many({"ssid": f"Network-with-a-long-name-{i:06d}", "password": "",
+                     "security": "NOPASS"} for i in range(40000))
+        size = os.path.getsize("wifi_data.enc")
+        
+        tracemalloc.start()
+        try:
+            self.assertTrue(db.add_wifi("Last", "lastpassword", "WPA2"))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        
+        self.assertGreater(size, 1024 * 1024)
+        # Rebuilding the file in memory would need at least its full size
+        self.assertLess(peak, size // 2)
+        
+        reopened = DatabaseManager()
+        self.assertTrue(reopened.unlock_database("test_password"))
+        self.assertEqual(len(list(reopened.iter_wifi())), 40001)
+    
+    def test_parallel_workers_preserve_order(self):
+        """Test that pooled encryption and decryption keep records in order"""
+        batch = [{"ssid": f"Net{i:04d}", "password": f"password{i}" if i % 7 else "",
+                  "security": "WPA2" if i % 7 else "NOPASS"} for i in range(600)]
+        batch.insert(300, {"ssid": "Broken"})
+        
+        for pool in ("thread", "process"):
+            with self.subTest(pool=pool):
+                db = DatabaseManager(workers=2, pool=pool)
+                self.assertTrue(db.initialize_database("test_password"))
+                results = db.add_many(batch)
+                self.assertEqual([r["ssid"] for r in results], [r.get("ssid") for r in batch])
+                self.assertEqual(results[300]["status"], "error")
+                
+                expected = batch[:300] + batch[301:]
+                self.assertEqual(db.get_all_wifi(), expected)
+                self.assertTrue(db.lock_database())
+                
+                # A serial manager reads what the pool wrote
+                serial = DatabaseManager()
+                self.assertTrue(serial.unlock_database("test_password"))
+                self.assertEqual(serial.get_all_wifi(), expected)
+                serial.lock_database()
+                os.remove("wifi_data.enc")
+    
+    def test_parallel_decrypt_error_is_raised(self):
+        """Test that a corrupted password fails the pooled read instead of being skipped"""
+        db = DatabaseManager(workers=2)
+        self.assertTrue(db.initialize_database("test_password"))
+        db.add_many({"ssid": f"Net{i:04d}", "password": f"password{i}", "security": "WPA2"}
+                    for i in range(600))
+        
+        record = db._load_data()["Net0450"]
+        sealed = bytearray(record["sealed"])
+        sealed[-1] ^= 0x01
+        record["sealed"] = bytes(sealed)
+        
+        with self.assertRaises(ValueError):
+            list(db.iter_wifi(with_passwords=True))
+        db.lock_database()
+    
+    def test_change_master_password_rewraps_key_only(self):
+        """Test that a password change rewrites the key slots and nothing else"""
+        db = DatabaseManager(kdf_params={"name": "pbkdf2-sha1", "iterations": 1000})
+        self.assertTrue(db.initialize_database("old_password"))
+        db.add_many({"ssid": f"Net{i:03d}", "password": f"password{i}", "security": "WPA2"}
+                    for i in range(300))
+        self.assertTrue(db.flush())
+        with open("wifi_data.enc", "rb") as f:
+            before = f.read()
+        
+        self.assertFalse(db.change_master_password("wrong_password", "new_password"))
+        self.assertTrue(db.change_master_password("old_password", "new_password"))
+        with open("wifi_data.enc", "rb") as f:
+            after = f.read()
+        _, header = read_header()
+        start = header["key_slot_offset"]
+        end = start + storage.KEY_SLOT_SIZE * storage.KEY_SLOT_COUNT
+        self.assertEqual(len(after), len(before))
+        self.assertEqual(after[:start], before[:start])
+        self.assertEqual(after[end:], before[end:])
+        self.assertEqual(header["key_slot"]["seq"], 1)
+        
+        # The session keeps working and later rewrites keep the new slot
+        self.assertTrue(db.add_wifi("Later", "laterpassword", "WPA2"))
+        db._save_data(db._load_data())
+        self.assertTrue(db.lock_database())
+        self.assertFalse(DatabaseManager().unlock_database("old_password"))
+        reopened = DatabaseManager()
+        self.assertTrue(reopened.unlock_database("new_password"))
+        self.assertEqual(reopened.get_wifi("Net123")["password"], "password123")
+        self.assertEqual(reopened.get_wifi("Later")["password"], "laterpassword")
+    
+    def test_torn_key_slot_write_keeps_a_password(self):
+        """Test that a key slot torn by a crash falls back to the other copy"""
+        db = DatabaseManager(kdf_params={"name": "pbkdf2-sha1", "iterations": 1000})
+        self.assertTrue(db.initialize_database("old_password"))
+        db.add_wifi("Home", "homepassword", "WPA2")
+        self.assertTrue(db.flush())
+        with open("wifi_data.enc", "rb") as f:
+            _, header = storage.read_container_header(f)
+            f.seek(header["key_slot_offset"])
+            old_slot = f.read(storage.KEY_SLOT_SIZE)
+        
+        self.assertTrue(db.change_master_password("old_password", "new_password"))
+        self.assertTrue(db.lock_database())
+        
+        # A crash before the second copy was written leaves the old slot
+        # in it; the newer copy wins
+        newer = header["key_slot_offset"] + storage.KEY_SLOT_SIZE
+        older = header["key_slot_offset"]
+        with open("wifi_data.enc", "r+b") as f:
+            f.seek(older)
+            f.write(old_slot)
+        self.assertFalse(DatabaseManager().unlock_database("old_password"))
+        self.assertTrue(DatabaseManager().unlock_database("new_password"))
+        
+        # A crash while writing the first copy tears it; the older one wins
+        with open("wifi_data.enc", "r+b") as f:
+            f.seek(newer + 40)
+            f.write(b"torn")
+        self.assertFalse(DatabaseManager().unlock_database("new_password"))
+        reopened = DatabaseManager()
+        self.assertTrue(reopened.unlock_database("old_password"))
+        self.assertEqual(reopened.get_wifi("Home")["password"], "homepassword")
+    
+    def test_rotate_data_key_reencrypts_records(self):
+        """Test that rotating the data key keeps every record and the password"""
+        db = DatabaseManager(kdf_params={"name": "pbkdf2-sha1", "iterations": 1000})
+        self.assertTrue(db.initialize_database("test_password"))
+        db.add_wifi("Home", "homepassword", "WPA2")
+        db.add_wifi("Open", "", "NOPASS")
+        old_key = db.key
+        
+        self.assertFalse(db.rotate_data_key("wrong_password"))
+        self.assertTrue(db.rotate_data_key("test_password"))
+        self.assertNotEqual(db.key, old_key)
+        self.assertEqual(db.get_wifi("Home")["password"], "homepassword")
+        self.assertTrue(db.lock_database())
+        
+        reopened = DatabaseManager()
+        self.assertTrue(reopened.unlock_database("test_password"))
+        self.assertEqual(reopened.get_all_wifi(), [
+            {"ssid": "Home", "password": "homepassword", "security": "WPA2"},
+            {"ssid": "Open", "password": "", "security": "NOPASS"},
+        ])
+    
+    def test_binary_entries_split_across_chunks(self):
+        """Test that binary entries decode wherever the chunk boundaries fall"""
+        data = (storage.pack_entry("put", "Café", "WPA2", b"\x02sealed") +
+                storage.pack_entry("del", "Gone") +
+                storage.pack_entry("put", "Open", "NOPASS"))
+        expected = [
+            {"op": "put", "ssid": "Café", "security": "WPA2", "sealed": b"\x02sealed"},
+            {"op": "del", "ssid": "Gone", "security": "", "sealed": b""},
+            {"op": "put", "ssid": "Open", "security": "NOPASS", "sealed": b""},
+        ]
+        for step in (1, 3, len(data)):
+            chunks = [data[i:i + step] for i in range(0, len(data), step)]
+            self.assertEqual(list(storage.iter_entries(chunks)), expected)
+        
+        with self.assertRaises(ValueError):
+            list(storage.iter_entries([data[:-1]]))
+    
+    def test_changes_since_reports_changed_records(self):
+        """Test that changes since a revision list only the SSIDs touched since then"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        db.add_wifi("Keep", "keeppass1", "WPA")
+        db.add_wifi("Gone", "gonepass1", "WPA")
+        
+        revision, changes = db.changes_since(None)
+        self.assertIsNone(changes)
+        self.assertEqual(db.changes_since(revision), (revision, {}))
+        
+        db.add_wifi("New", "newpass12", "WPA2")
+        db.delete_wifi("Gone")
+        db.upsert_wifi("Keep", "keeppass2", "WEP")
+        latest, changes = db.changes_since(revision)
+        self.assertGreater(latest, revision)
+        self.assertEqual(list(changes.items()), [
+            ("New", {"ssid": "New", "security": "WPA2"}),
+            ("Gone", None),
+            ("Keep", {"ssid": "Keep", "security": "WEP"}),
+        ])
+        
+        # Rolled back changes are not reported
+        with self.assertRaises(RuntimeError):
+            with db.transaction():
+                db.add_wifi("Rolled", "rolledback", "WPA")
+                raise RuntimeError()
+        self.assertEqual(db.changes_since(latest), (latest, {}))
+        
+        # Changes made by another manager are not known one by one
+        other = DatabaseManager()
+        self.assertTrue(other.unlock_database("test_password"))
+        other.add_wifi("Elsewhere", "elsewhere1", "WPA")
+        self.assertTrue(other.flush())
+        _, changes = db.changes_since(latest)
+        self.assertIsNone(changes)
+    
+    def test_changes_since_forgets_old_revisions(self):
+        """Test that a view too far behind the change log is told to compare everything"""
+        with mock.patch.object(database, "CHANGELOG_SIZE", 4):
+            db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        revision, _ = db.changes_since(None)
+        
+        with db.transaction():
+            for i in range(3):
+                db.add_wifi(f"Net{i}", "password1", "WPA")
+        latest, changes = db.changes_since(revision)
+        self.assertEqual(list(changes), ["Net0", "Net1", "Net2"])
+        
+        with db.transaction():
+            for i in range(3, 6):
+                db.add_wifi(f"Net{i}", "password1", "WPA")
+        self.assertIsNone(db.changes_since(revision)[1])
+        self.assertEqual(list(db.changes_since(latest)[1]), ["Net3", "Net4", "Net5"])
+    
+    def test_get_ssids_and_public_record(self):
+        """Test listing SSIDs and reading a record without its password"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        db.add_wifi("Net1", "password1", "WPA")
+        db.add_wifi("Net2", "password2", "WPA2")
+        
+        self.assertEqual(db.get_ssids(), ["Net1", "Net2"])
+        self.assertEqual(db.get_wifi("Net2", with_password=False),
+                         {"ssid": "Net2", "security": "WPA2"})
+        self.assertEqual(db.get_wifi("Net2")["password"], "password2")
+    
+    def test_search_ssids_follows_changes(self):
+        """Test that SSID search follows adds, deletes, rollbacks and reloads"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        for ssid in ("Home", "Office 2G", "Office 5G"):
+            db.add_wifi(ssid, "password1", "WPA")
+        self.assertEqual(db.search_ssids("OFFICE"), ["Office 2G", "Office 5G"])
+        
+        db.delete_wifi("Office 2G")
+        db.add_wifi("Back office", "password1", "WPA")
+        self.assertEqual(db.search_ssids("office"), ["Office 5G", "Back office"])
+        self.assertEqual(db.search_ssids(""), db.get_ssids())
+        
+        with self.assertRaises(RuntimeError):
+            with db.transaction():
+                db.add_wifi("Office 6G", "password1", "WPA")
+                raise RuntimeError()
+        self.assertEqual(db.search_ssids("office"), ["Office 5G", "Back office"])
+        
+        # Changes from another manager are picked up with the reloaded vault
+        other = DatabaseManager()
+        self.assertTrue(other.unlock_database("test_password"))
+        other.add_wifi("Office 7G", "password1", "WPA")
+        other.lock_database()
+        self.assertEqual(db.search_ssids("office"), ["Office 5G", "Back office", "Office 7G"])
+    
+    def test_sorted_ssids_follow_changes(self):
+        """Test listing SSIDs by column as records are added, changed and deleted"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        for ssid, security in (("office", "WPA2"), ("Attic", "WPA"), ("Lab", "WPA2")):
+            db.add_wifi(ssid, "password1", security)
+        self.assertEqual(db.sorted_ssids("ssid"), ["Attic", "Lab", "office"])
+        self.assertEqual(db.sorted_ssids("security", descending=True), ["office", "Lab", "Attic"])
+        
+        db.upsert_wifi("Attic", "password1", "WPA3")
+        db.delete_wifi("Lab")
+        db.add_wifi("Basement", "", "NOPASS")
+        self.assertEqual(db.sorted_ssids("ssid", descending=True), ["office", "Basement", "Attic"])
+        self.assertEqual(db.sorted_ssids("security"), ["Basement", "office", "Attic"])
+        self.assertEqual(db.sorted_ssids("security", query="T"), ["Basement", "Attic"])
+        self.assertEqual(db.sorted_ssids("missing"), [])
+    
+    def test_manager_is_shared_between_threads(self):
+        """Test that changes and reads from several threads do not interfere"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        errors = []
+        
+        def writer(prefix):
+            try:
+                for i in range(50):
+                    self.assertTrue(db.add_wifi(f"{prefix}{i}", "password1", "WPA"))
+                    db.search_ssids(prefix)
+                    db.changes_since(0)
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=writer, args=(f"T{n}-",)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(len(db.get_ssids()), 200)
+        self.assertEqual(len(db.search_ssids("t2-")), 50)
+        db.lock_database()
+        self.assertTrue(db.unlock_database("test_password"))
+        self.assertEqual(len(db.get_all_wifi()), 200)
+    
+    def test_unknown_pool_rejected(self):
+        """Test that an unknown worker pool type is refused"""
+        with self.assertRaises(ValueError):
+            DatabaseManager(workers=2, pool="gpu")
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
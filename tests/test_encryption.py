@@ -1,11 +1,24 @@
 import sys
 import os
 import unittest
+import io
+import tempfile
+import tracemalloc
+import hashlib
+from unittest import mock
 
 # Add src directory to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from encryption import derive_key, encrypt_data, decrypt_data
+from encryption import (derive_key, encrypt_data, decrypt_data,
+                        make_key_verifier, check_key_verifier,
+                        aead_encrypt, aead_decrypt, validate_kdf_params,
+                        calibrate_kdf, MIN_PBKDF2_ITERATIONS, MIN_SCRYPT_N,
+                        KDF_BACKENDS, get_kdf_backend, set_kdf_backend, select_kdf_backends,
+                        encrypt_stream, decrypt_stream, TruncatedStreamError,
+                        aead_encrypt_many, aead_decrypt_many,
+                        aead_encrypt_into, aead_decrypt_into, AEAD_OVERHEAD)
+from concurrent.futures import ThreadPoolExecutor
 
 class TestEncryption(unittest.TestCase):
     
@@ -49,6 +62,177 @@ class TestEncryption(unittest.TestCase):
         key2, _ = derive_key(password2)
         
         self.assertNotEqual(key1, key2)
+    
+    def test_key_verifier(self):
+        """Test that a verifier accepts its own key and rejects others"""
+        key, salt = derive_key("password1")
+        other, _ = derive_key("password2", salt)
+        verifier = make_key_verifier(key)
+        
+        self.assertTrue(check_key_verifier(key, verifier))
+        self.assertFalse(check_key_verifier(other, verifier))
+    
+    def test_aead_round_trip_and_tamper(self):
+        """Test that AES-GCM data round-trips and rejects tampering or wrong keys"""
+        key, salt = derive_key("password1")
+        other, _ = derive_key("password2", salt)
+        encrypted = aead_encrypt(b"secret data", key)
+        
+        self.assertEqual(aead_decrypt(encrypted, key), b"secret data")
+        with self.assertRaises(ValueError):
+            aead_decrypt(encrypted, other)
+        
+        tampered = bytearray(encrypted)
+        tampered[15] ^= 0x01
+        with self.assertRaises(ValueError):
+            aead_decrypt(bytes(tampered), key)
+    
+    def test_derive_key_with_scrypt(self):
+        """Test that scrypt parameters are honoured and change the key"""
+        params = {"name": "scrypt", "n": 2 ** 10, "r": 8, "p": 1, "salt_len": 24}
+        key, salt = derive_key("password1", params=params)
+        self.assertEqual((len(key), len(salt)), (32, 24))
+        self.assertEqual(derive_key("password1", salt, params)[0], key)
+        
+        pbkdf2_key, _ = derive_key("password1", salt, {"name": "pbkdf2-sha1", "iterations": 1000})
+        self.assertNotEqual(pbkdf2_key, key)
+    
+    def test_invalid_kdf_params_rejected(self):
+        """Test that unknown or unbounded key derivation parameters are refused"""
+        for params in ({"name": "md5"}, {"name": "pbkdf2-sha1"},
+                       {"name": "pbkdf2-sha1", "iterations": 0},
+                       {"name": "scrypt", "n": 1000},
+                       {"name": "scrypt", "n": 2 ** 30, "r": 8}):
+            with self.assertRaises(ValueError):
+                validate_kdf_params(params)
+    
+    def test_calibrate_kdf(self):
+        """Test that calibration returns usable parameters within bounds"""
+        params = calibrate_kdf(0.01)
+        self.assertEqual(params["name"], "pbkdf2-sha1")
+        self.assertGreaterEqual(params["iterations"], MIN_PBKDF2_ITERATIONS)
+        
+        params = calibrate_kdf(0.01, name="scrypt")
+        self.assertEqual(params["name"], "scrypt")
+        self.assertGreaterEqual(params["n"], MIN_SCRYPT_N)
+        self.assertEqual(len(derive_key("password1", params=params)[0]), 32)
+    
+    def test_kdf_backends_agree(self):
+        """Test that every backend derives byte-identical keys"""
+        salt = b"0123456789abcdef"
+        for name, params in (("pbkdf2-sha1", {"name": "pbkdf2-sha1", "iterations": 1000}),
+                             ("scrypt", {"name": "scrypt", "n": 2 ** 10})):
+            original = get_kdf_backend(name)
+            self.addCleanup(set_kdf_backend, name, original)
+            keys = set()
+            for backend in KDF_BACKENDS[name]:
+                set_kdf_backend(name, backend)
+                for password in ("test_password_123", "pässwörd", "密码"):
+                    keys.add((password, derive_key(password, salt, params)[0]))
+            self.assertEqual(len(keys), 3)
+        
+        with self.assertRaises(ValueError):
+            set_kdf_backend("pbkdf2-sha1", "missing")
+    
+    def test_kdf_backend_preference(self):
+        """Test the fixed backend choice, and the fallback when a backend is missing"""
+        self.addCleanup(select_kdf_backends)
+        openssl = getattr(hashlib.pbkdf2_hmac, '__module__', None) == '_hashlib'
+        self.assertEqual(select_kdf_backends(),
+                         {"pbkdf2-sha1": "hashlib" if openssl else "pycryptodome",
+                          "scrypt": "pycryptodome"})
+        
+        # A pure-Python PBKDF2, as hashlib has without OpenSSL, is passed over
+        with mock.patch.object(hashlib, "pbkdf2_hmac", lambda *args: b"\x00" * 32):
+            self.assertEqual(select_kdf_backends()["pbkdf2-sha1"], "pycryptodome")
+    
+    def test_stream_round_trip(self):
+        """Test that streams of any length round-trip through chunked encryption"""
+        key = os.urandom(32)
+        for size in (0, 1, 4095, 4096, 4097, 3 * 4096):
+            data = os.urandom(size)
+            encrypted = io.BytesIO()
+            self.assertEqual(encrypt_stream(io.BytesIO(data), encrypted, key, chunk_size=4096), size)
+            
+            decrypted = io.BytesIO()
+            encrypted.seek(0)
+            self.assertEqual(decrypt_stream(encrypted, decrypted, key), size)
+            self.assertEqual(decrypted.getvalue(), data)
+    
+    def test_stream_detects_truncation_and_reordering(self):
+        """Test that dropped, cut or swapped chunks are rejected"""
+        key = os.urandom(32)
+        encrypted = io.BytesIO()
+        encrypt_stream(io.BytesIO(os.urandom(3 * 100)), encrypted, key, chunk_size=100)
+        data = encrypted.getvalue()
+        frame = len(data) // 3
+        
+        for broken in (data[:2 * frame], data[:-1]):
+            with self.assertRaises(TruncatedStreamError):
+                decrypt_stream(io.BytesIO(broken), io.BytesIO(), key)
+        
+        swapped = data[frame:2 * frame] + data[:frame] + data[2 * frame:]
+        with self.assertRaises(ValueError):
+            decrypt_stream(io.BytesIO(swapped), io.BytesIO(), key)
+    
+    def test_stream_memory_is_constant(self):
+        """Test that streaming a large file needs only a few chunks of memory"""
+        key = os.urandom(32)
+        with tempfile.TemporaryFile() as plain, tempfile.TemporaryFile() as sealed, \
+                tempfile.TemporaryFile() as opened:
+            for _ in range(16):
+                plain.write(os.urandom(1024 * 1024))
+            plain.seek(0)
+            
+            tracemalloc.start()
+            try:
+                encrypt_stream(plain, sealed, key)
+                sealed.seek(0)
+                decrypt_stream(sealed, opened, key)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            
+            self.assertEqual(opened.tell(), 16 * 1024 * 1024)
+            self.assertLess(peak, 1024 * 1024)
+    
+    def test_aead_many_keeps_order_and_errors(self):
+        """Test that batch encryption on a pool keeps order and raises failures"""
+        key = os.urandom(32)
+        items = [f"item {i}".encode("utf-8") for i in range(250)]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            encrypted = aead_encrypt_many(items, key, executor, batch_size=16)
+            self.assertEqual(aead_decrypt_many(encrypted, key, executor, batch_size=16), items)
+            
+            encrypted[200] = encrypted[200][:-1] + bytes([encrypted[200][-1] ^ 0x01])
+            with self.assertRaises(ValueError):
+                aead_decrypt_many(encrypted, key, executor, batch_size=16)
+        
+        self.assertEqual(aead_decrypt_many(encrypted[:200], key), items[:200])
+    
+    def test_aead_into_preallocated_buffers(self):
+        """Test that the buffer APIs match aead_encrypt and wipe rejected output"""
+        key = os.urandom(32)
+        data = b"zero-copy payload" * 10
+        sealed = bytearray(len(data) + AEAD_OVERHEAD + 8)
+        
+        size = aead_encrypt_into(memoryview(data), key, memoryview(sealed)[8:], b"aad")
+        self.assertEqual(size, len(data) + AEAD_OVERHEAD)
+        blob = bytes(sealed[8:8 + size])
+        self.assertEqual(aead_decrypt(blob, key, b"aad"), data)
+        
+        opened = bytearray(len(data))
+        self.assertEqual(aead_decrypt_into(memoryview(sealed)[8:8 + size], key, opened, b"aad"), len(data))
+        self.assertEqual(bytes(opened), data)
+        
+        with self.assertRaises(ValueError):
+            aead_encrypt_into(data, key, bytearray(len(data)))
+        
+        sealed[8 + size - 1] ^= 0x01
+        opened = bytearray(len(data))
+        with self.assertRaises(ValueError):
+            aead_decrypt_into(memoryview(sealed)[8:8 + size], key, opened, b"aad")
+        self.assertEqual(opened, bytearray(len(data)))
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,73 @@
+import sys
+import os
+import io
+import csv
+import json
+import unittest
+import tempfile
+import shutil
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from database import DatabaseManager
+from exporter import export_wifi
+from importer import parse_wpa_supplicant
+
+class TestExporter(unittest.TestCase):
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_dir = tempfile.mkdtemp()
+        self.original_cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        
+        self.db = DatabaseManager()
+        self.db.initialize_database("test_password")
+        self.db.add_many([
+            {"ssid": "HomeNet", "password": "homepassword", "security": "WPA2"},
+            {"ssid": "Office \"5G\"", "password": "officepass1", "security": "WPA"},
+            {"ssid": "OldRouter", "password": "abcdef1234", "security": "WEP"},
+            {"ssid": "Guest", "password": "", "security": "NOPASS"},
+        ])
+    
+    def tearDown(self):
+        """Tear down test fixtures after each test method."""
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+    
+    def test_export_csv(self):
+        """Test exporting credentials as CSV"""
+        out = io.StringIO(newline="")
+        self.assertEqual(export_wifi(self.db, out, "csv"), 4)
+        
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual(rows[0], {"ssid": "HomeNet", "password": "homepassword", "security": "WPA2"})
+        self.assertEqual(rows[1]["ssid"], "Office \"5G\"")
+    
+    def test_export_jsonl_with_filters(self):
+        """Test exporting selected SSIDs as JSON Lines"""
+        out = io.StringIO()
+        self.assertEqual(export_wifi(self.db, out, "jsonl", pattern="*Net*"), 1)
+        self.assertEqual(json.loads(out.getvalue()),
+                         {"ssid": "HomeNet", "password": "homepassword", "security": "WPA2"})
+        
+        out = io.StringIO()
+        self.assertEqual(export_wifi(self.db, out, "jsonl", ssids=["Guest", "Missing"]), 1)
+        self.assertEqual(json.loads(out.getvalue())["ssid"], "Guest")
+    
+    def test_export_wpa_supplicant_round_trip(self):
+        """Test that exported network blocks import back unchanged"""
+        with open("wpa_supplicant.conf", "w") as f:
+            self.assertEqual(export_wifi(self.db, f, "wpa_supplicant"), 4)
+        
+        parsed = [(e["ssid"], e["password"], e["security"]) for e in parse_wpa_supplicant("wpa_supplicant.conf")]
+        self.assertEqual(parsed, [(r["ssid"], r["password"], r["security"]) for r in self.db.get_all_wifi()])
+    
+    def test_unknown_format(self):
+        """Test that an unknown format is rejected"""
+        with self.assertRaises(ValueError):
+            export_wifi(self.db, io.StringIO(), "xml")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import sys
+import os
+import unittest
+import tempfile
+import shutil
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from database import DatabaseManager
+from importer import import_wifi, iter_config_files, parse_nmconnection, parse_wpa_supplicant
+
+WPA_SUPPLICANT_CONF = """ctrl_interface=/run/wpa_supplicant
+update_config=1
+
+network={
+    ssid="HomeNet"
+    psk="homepassword"
+    key_mgmt=WPA-PSK
+}
+
+# Open guest network
+network={
+    ssid="Guest"
+    key_mgmt=NONE
+}
+
+network={
+    ssid=4f6666696365
+    psk="short"
+}
+
+network={
+    ssid="Corp"
+    key_mgmt=WPA-EAP
+    eap=PEAP
+}
+"""
+
+NM_KEYFILE = """[connection]
+id=Cafe
+type=wifi
+
+[wifi]
+mode=infrastructure
+ssid=Cafe
+
+[wifi-security]
+key-mgmt=wpa-psk
+psk=cafepassword
+"""
+
+class TestImporter(unittest.TestCase):
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_dir = tempfile.mkdtemp()
+        self.original_cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        
+        os.makedirs("configs/system-connections")
+        with open("configs/wpa_supplicant.conf", "w") as f:
+            f.write(WPA_SUPPLICANT_CONF)
+        with open("configs/system-connections/Cafe.nmconnection", "w") as f:
+            f.write(NM_KEYFILE)
+    
+    def tearDown(self):
+        """Tear down test fixtures after each test method."""
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+    
+    def test_parse_wpa_supplicant(self):
+        """Test mapping wpa_supplicant network blocks to records"""
+        entries = list(parse_wpa_supplicant("configs/wpa_supplicant.conf"))
+        
+        self.assertEqual(len(entries), 4)
+        self.assertEqual((entries[0]["ssid"], entries[0]["password"], entries[0]["security"]),
+                         ("HomeNet", "homepassword", "WPA2"))
+        self.assertEqual(entries[0]["line"], 4)
+        self.assertEqual(entries[1]["security"], "NOPASS")
+        self.assertEqual(entries[2]["ssid"], "Office")
+        self.assertIn("WPA-EAP", entries[3]["error"])
+    
+    def test_parse_nmconnection(self):
+        """Test mapping a NetworkManager keyfile to a record"""
+        entries = list(parse_nmconnection("configs/system-connections/Cafe.nmconnection"))
+        
+        self.assertEqual(len(entries), 1)
+        self.assertEqual((entries[0]["ssid"], entries[0]["password"], entries[0]["security"]),
+                         ("Cafe", "cafepassword", "WPA2"))
+        self.assertEqual(entries[0]["line"], 7)
+    
+    def test_nmconnection_proto_list_and_escapes(self):
+        """Test reading proto as a list and undoing keyfile escapes"""
+        protos = {"wpa;": "WPA", "wpa;rsn;": "WPA", "rsn;": "WPA2", "wpa": "WPA"}
+        for proto, security in protos.items():
+            with self.subTest(proto=proto):
+                with open("configs/Proto.nmconnection", "w") as f:
+                    f.write("[wifi]\nssid=\\sCafe\\;Bar\n\n[wifi-security]\n"
+                            f"key-mgmt=wpa-psk\nproto={proto}\npsk=pass\\\\word\\s\n")
+                entry, = parse_nmconnection("configs/Proto.nmconnection")
+                self.assertEqual((entry["ssid"], entry["password"], entry["security"]),
+                                 (" Cafe;Bar", "pass\\word ", security))
+    
+    def test_symlinked_directory_cycle_is_walked_once(self):
+        """Test that a symlink back up the tree does not recurse forever"""
+        try:
+            os.symlink(os.path.abspath("configs"), "configs/system-connections/loop")
+        except (OSError, NotImplementedError):
+            self.skipTest("Symlinks are not supported here")
+        
+        files = list(iter_config_files(["configs"]))
+        self.assertEqual(sorted(os.path.basename(path) for path in files),
+                         ["Cafe.nmconnection", "wpa_supplicant.conf"])
+    
+    def test_import_wifi(self):
+        """Test importing a directory tree and reporting skipped entries"""
+        db = DatabaseManager()
+        self.assertTrue(db.initialize_database("test_password"))
+        
+        report = import_wifi(db, ["configs"])
+        
+        self.assertEqual([r["ssid"] for r in report["results"]], ["Cafe", "HomeNet", "Guest"])
+        self.assertEqual([(s["line"], s["ssid"]) for s in report["skipped"]], [(16, "Office"), (21, "Corp")])
+        self.assertTrue(all(s["file"].endswith("wpa_supplicant.conf") for s in report["skipped"]))
+        self.assertEqual(db.get_wifi("HomeNet")["password"], "homepassword")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import sys
+import os
+import unittest
+from unittest import mock
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import indexes
+from indexes import SortedIndex, SsidSearchIndex
+
+SSIDS = ["HomeNet", "Office-5G", "Guest Office", "CAFÉ Wi-Fi", "lab", "Straße 12"]
+
+def security_key(record):
+    return (record['security'], record['ssid'].casefold())
+
+class TestSsidSearchIndex(unittest.TestCase):
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.index = SsidSearchIndex(SSIDS)
+    
+    def expected(self, query, ssids=SSIDS):
+        return [ssid for ssid in ssids if query.casefold() in ssid.casefold()]
+    
+    def test_every_substring_matches_like_a_scan(self):
+        """Test that searches agree with a case-insensitive scan, in order"""
+        queries = {""}
+        for ssid in SSIDS:
+            for start in range(len(ssid)):
+                for end in range(start + 1, len(ssid) + 1):
+                    queries.add(ssid[start:end])
+                    queries.add(ssid[start:end].upper())
+        queries.update(["zzz", "q", "office-5g!", "FFICE"])
+        
+        for query in sorted(queries):
+            with self.subTest(query=query):
+                self.assertEqual(self.index.search(query), self.expected(query))
+    
+    def test_casefolded_matching(self):
+        """Test that matching ignores case beyond ASCII"""
+        self.assertEqual(self.index.search("café"), ["CAFÉ Wi-Fi"])
+        self.assertEqual(self.index.search("STRASSE"), ["Straße 12"])
+    
+    def test_add_and_discard_update_results(self):
+        """Test that added and removed SSIDs show up in the next search"""
+        self.assertEqual(self.index.search("off"), ["Office-5G", "Guest Office"])
+        self.assertEqual(self.index.search("o"), self.expected("o"))
+        
+        self.index.add("Back Office")
+        self.index.discard("Office-5G")
+        self.index.discard("missing")
+        self.assertEqual(self.index.search("off"), ["Guest Office", "Back Office"])
+        self.assertEqual(self.index.search("o"), self.expected("o", SSIDS[:1] + SSIDS[2:] + ["Back Office"]))
+        
+        # Adding an SSID twice keeps its place
+        self.index.add("HomeNet")
+        self.assertEqual(self.index.search("ne")[0], "HomeNet")
+        self.assertEqual(len(self.index), len(SSIDS))
+        self.assertNotIn("Office-5G", self.index)
+    
+    def test_discarded_ngrams_are_dropped(self):
+        """Test that removing every SSID leaves no postings behind"""
+        for ssid in SSIDS:
+            self.index.discard(ssid)
+        self.assertEqual(self.index._postings, {})
+        self.assertEqual(self.index.search(""), [])
+    
+    def test_narrowing_search_checks_previous_results(self):
+        """Test that extending a query only filters the previous results"""
+        # Every n-gram of "abcdx" is in 150 SSIDs, but "abcd" only in 50
+        index = SsidSearchIndex([f"abcdx{i}" for i in range(50)] + [f"abc-{i}" for i in range(100)] +
+                                [f"-bcd-{i}" for i in range(100)] + [f"cdx-{i}" for i in range(100)])
+        self.assertEqual(len(index.search("abcd")), 50)
+        
+        checked = []
+        folded = index._folded
+        
+        class Recorder(dict):
+            def __getitem__(self, ssid):
+                checked.append(ssid)
+                return folded[ssid]
+        
+        index._folded = Recorder(folded)
+        self.assertEqual(index.search("ABCDX"), [f"abcdx{i}" for i in range(50)])
+        self.assertEqual(len(checked), 50)
+    
+    def test_short_postings_are_bounded(self):
+        """Test that postings for short queries are evicted oldest first"""
+        with mock.patch.object(indexes, "SHORT_POSTING_CACHE_SIZE", 2):
+            for query in ("a", "b", "c"):
+                self.index.search(query)
+        self.assertEqual(list(self.index._short_postings), ["b", "c"])
+        self.assertEqual(self.index.search("a"), self.expected("a"))
+
+class TestSortedIndex(unittest.TestCase):
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.records = [{'ssid': ssid, 'security': "WPA2" if i % 2 else "WPA"}
+                        for i, ssid in enumerate(SSIDS)]
+        self.index = SortedIndex(security_key, self.records)
+    
+    def expected(self, records):
+        return [record['ssid'] for record in sorted(records, key=security_key)]
+    
+    def test_built_in_key_order(self):
+        """Test that the index lists SSIDs by key in both directions"""
+        self.assertEqual(self.index.ssids(), self.expected(self.records))
+        self.assertEqual(self.index.ssids(descending=True), self.expected(self.records)[::-1])
+        self.assertEqual(len(self.index), len(SSIDS))
+    
+    def test_changes_keep_the_order(self):
+        """Test that adding, moving and removing records keeps the index sorted"""
+        changed = {'ssid': "HomeNet", 'security': "WPA2"}
+        added = {'ssid': "Attic", 'security': "NOPASS"}
+        self.index.add(changed)
+        self.index.add(added)
+        self.index.add(added)
+        self.index.discard("lab")
+        self.index.discard("missing")
+        
+        records = [changed, added] + [record for record in self.records
+                                      if record['ssid'] not in ("HomeNet", "lab")]
+        self.assertEqual(self.index.ssids(), self.expected(records))
+        self.assertNotIn("lab", self.index)
+        self.assertEqual(len(self.index._entries), len(records))
+    
+    def test_order_of_a_subset(self):
+        """Test ordering search results both by sorting them and by filtering the index"""
+        subset = ["Straße 12", "HomeNet", "Guest Office"]
+        expected = [ssid for ssid in self.expected(self.records) if ssid in subset]
+        for ratio in (1, 100):
+            with self.subTest(ratio=ratio), mock.patch.object(indexes, "SUBSET_SORT_RATIO", ratio):
+                self.assertEqual(self.index.order(subset), expected)
+                self.assertEqual(self.index.order(subset, descending=True), expected[::-1])
+        
+        ssids = self.index.ssids()
+        ssids.clear()
+        self.assertEqual(len(self.index.ssids()), len(SSIDS))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,240 @@
+import sys
+import os
+import unittest
+import tempfile
+import shutil
+import json
+import base64
+import struct
+import threading
+from unittest import mock
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import migrate
+import storage
+from database import DatabaseManager
+from encryption import derive_key, encrypt_data, make_key_verifier, iter_decrypt_stream
+from migrate import LegacyVaultReader, migrate_legacy_vault
+
+SIDE_FILE = "wifi_data.enc" + migrate.MIGRATING_SUFFIX
+CHECKPOINT_FILE = SIDE_FILE + migrate.CHECKPOINT_SUFFIX
+
+class Interrupted(Exception):
+    pass
+
+def write_legacy_vault(records, password="test_password"):
+    """Write a legacy vault holding a list of records and return its key"""
+    key, salt = derive_key(password, params=migrate.LEGACY_KDF_PARAMS)
+    with open("wifi_data.enc", "w") as f:
+        f.write(encrypt_data(json.dumps(records, ensure_ascii=False), key))
+    with open("master_key.hash", "w") as f:
+        json.dump({"hash": make_key_verifier(key),
+                   "salt": base64.b64encode(salt).decode("utf-8")}, f)
+    return key
+
+def stop_after(calls):
+    """Build a progress callback that interrupts the migration after a number of calls"""
+    seen = []
+    
+    def progress(done, total):
+        seen.append((done, total))
+        if len(seen) == calls:
+            raise Interrupted()
+    return progress
+
+class TestMigrate(unittest.TestCase):
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_dir = tempfile.mkdtemp()
+        self.original_cwd = os.getcwd()
+        os.chdir(self.test_dir)
+    
+    def tearDown(self):
+        """Tear down test fixtures after each test method."""
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+    
+    def unlocked_records(self):
+        db = DatabaseManager()
+        self.assertTrue(db.unlock_database("test_password"))
+        return db.get_all_wifi()
+    
+    def test_snapshot_vault_is_migrated_with_progress(self):
+        """Test migrating a single snapshot line, reporting progress to the end"""
+        records = [{"ssid": f"Net{i}", "password": f"password{i}", "security": "WPA2"}
+                   for i in range(25)]
+        records.append({"ssid": "Open", "password": "", "security": "NOPASS"})
+        write_legacy_vault(records)
+        size = os.path.getsize("wifi_data.enc")
+        
+        calls = []
+        migrate_legacy_vault("test_password", "wifi_data.enc", "master_key.hash",
+                             lambda done, total: calls.append((done, total)), batch_size=10)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(calls[-1], (size, size))
+        self.assertEqual([total for _, total in calls], [size] * 3)
+        self.assertFalse(os.path.exists("master_key.hash"))
+        self.assertFalse(os.path.exists(SIDE_FILE))
+        self.assertFalse(os.path.exists(CHECKPOINT_FILE))
+        
+        self.assertEqual(self.unlocked_records(), records)
+    
+    def test_wrong_password_leaves_vault_untouched(self):
+        """Test that a wrong password fails before anything is written"""
+        write_legacy_vault([{"ssid": "Net", "password": "password1", "security": "WPA"}])
+        with open("wifi_data.enc", "rb") as f:
+            legacy = f.read()
+        
+        with self.assertRaises(ValueError):
+            migrate_legacy_vault("wrong_password", "wifi_data.enc", "master_key.hash")
+        with open("wifi_data.enc", "rb") as f:
+            self.assertEqual(f.read(), legacy)
+        self.assertTrue(os.path.exists("master_key.hash"))
+        self.assertFalse(os.path.exists(SIDE_FILE))
+    
+    def test_interrupted_migration_resumes_inside_snapshot(self):
+        """Test that a migration resumes mid-snapshot without resealing finished batches"""
+        records = [{"ssid": f"Réseau {i}", "password": f"mot de passe {i}", "security": "WPA2"}
+                   for i in range(60)]
+        write_legacy_vault(records)
+        with open("wifi_data.enc", "rb") as f:
+            legacy = f.read()
+        
+        # Small pieces so the checkpoints fall between pieces of the line
+        with mock.patch.object(migrate, "_READ_SIZE", 4 * migrate._GROUP_CHARS):
+            with self.assertRaises(Interrupted):
+                migrate_legacy_vault("test_password", "wifi_data.enc", "master_key.hash",
+                                     stop_after(2), batch_size=16)
+            
+            with open("wifi_data.enc", "rb") as f:
+                self.assertEqual(f.read(), legacy)
+            with open(CHECKPOINT_FILE) as f:
+                checkpoint = json.load(f)
+            self.assertEqual(checkpoint["records"], 32)
+            self.assertTrue(checkpoint["position"]["list"])
+            self.assertIsNotNone(checkpoint["position"]["iv"])
+            
+            with mock.patch.object(migrate, "aead_encrypt_many",
+                                   wraps=migrate.aead_encrypt_many) as sealed:
+                migrate_legacy_vault("test_password", "wifi_data.enc", "master_key.hash",
+                                     batch_size=16)
+            self.assertEqual(sum(len(call.args[0]) for call in sealed.call_args_list), 28)
+        
+        self.assertFalse(os.path.exists(CHECKPOINT_FILE))
+        self.assertEqual(self.unlocked_records(), records)
+    
+    def test_changed_legacy_vault_restarts_migration(self):
+        """Test that a checkpoint is ignored once the legacy vault has changed"""
+        write_legacy_vault([{"ssid": f"Net{i}", "password": "password1", "security": "WPA"}
+                            for i in range(10)])
+        with self.assertRaises(Interrupted):
+            migrate_legacy_vault("test_password", "wifi_data.enc", "master_key.hash",
+                                 stop_after(1), batch_size=4)
+        
+        records = [{"ssid": "Replaced", "password": "password2", "security": "WPA2"}]
+        write_legacy_vault(records)
+        migrate_legacy_vault("test_password", "wifi_data.enc", "master_key.hash")
+        self.assertEqual(self.unlocked_records(), records)
+    
+    def test_reader_position_round_trips(self):
+        """Test that a reader created at any position yields the remaining entries"""
+        key = write_legacy_vault([{"ssid": f"Net{i}", "password": f"password{i}", "security": "WPA"}
+                                  for i in range(12)])
+        
+        with mock.patch.object(migrate, "_READ_SIZE", 2 * migrate._GROUP_CHARS):
+            with open("wifi_data.enc", "rb") as f:
+                everything = list(LegacyVaultReader(f, key))
+                self.assertEqual(len(everything), 12)
+                
+                for count in range(len(everything) + 1):
+                    first = LegacyVaultReader(f, key)
+                    entries = iter(first)
+                    for _ in range(count):
+                        next(entries)
+                    position = json.loads(json.dumps(first.position()))
+                    self.assertEqual(list(LegacyVaultReader(f, key, position)), everything[count:])
+    
+    def test_trailing_data_is_rejected(self):
+        """Test that a vault with more than its single line is not migrated"""
+        key = write_legacy_vault([{"ssid": "Net", "password": "password1", "security": "WPA"}])
+        with open("wifi_data.enc", "a") as f:
+            f.write("\n" + encrypt_data(json.dumps({"op": "del", "ssid": "Net"}), key))
+        
+        with self.assertRaises(ValueError):
+            migrate_legacy_vault("test_password", "wifi_data.enc", "master_key.hash")
+        self.assertTrue(os.path.exists("master_key.hash"))
+    
+    def test_empty_vault_is_migrated(self):
+        """Test that an empty legacy vault migrates to a vault with one stream"""
+        write_legacy_vault([])
+        migrate_legacy_vault("test_password", "wifi_data.enc", "master_key.hash")
+        with open("wifi_data.enc", "rb") as f:
+            self.assertIsNotNone(storage.read_container_header(f))
+            # One stream of a single final frame
+            (length,) = struct.unpack(">I", f.read(4))
+            self.assertEqual(len(f.read(length)), length)
+            self.assertEqual(f.read(), b"")
+        self.assertEqual(self.unlocked_records(), [])
+
+    def test_legacy_key_cannot_open_migrated_vault(self):
+        """Test that a leftover master key file does not open the migrated vault"""
+        legacy_key = write_legacy_vault([{"ssid": "HomeNetwork", "password": "correcthorse",
+                                          "security": "WPA2"}])
+        with open("master_key.hash") as f:
+            self.assertEqual(base64.b64decode(json.load(f)["hash"]), legacy_key)
+        
+        key, _ = migrate_legacy_vault("test_password", "wifi_data.enc", "master_key.hash")
+        self.assertNotEqual(key, legacy_key)
+        db = DatabaseManager()
+        self.assertTrue(db.unlock_database("test_password"))
+        self.assertTrue(db.change_master_password("test_password", "new_password"))
+        self.assertTrue(db.lock_database())
+        
+        with open("wifi_data.enc", "rb") as f:
+            storage.read_container_header(f)
+            with self.assertRaises(ValueError):
+                list(iter_decrypt_stream(f, legacy_key))
+        self.assertTrue(db.unlock_database("new_password"))
+        self.assertEqual(db.get_wifi("HomeNetwork")["password"], "correcthorse")
+    
+    def test_overlapping_migrations_run_one_at_a_time(self):
+        """Test that an unlock during a migration waits for it, then opens its result"""
+        records = [{"ssid": f"Net{i}", "password": f"password{i}", "security": "WPA2"}
+                   for i in range(30)]
+        write_legacy_vault(records)
+        started = threading.Event()
+        release = threading.Event()
+        self.addCleanup(release.set)
+        results = []
+        
+        def progress(done, total):
+            started.set()
+            release.wait(10)
+        
+        # Absolute paths, so a thread outliving a failed test stays in its directory
+        first = threading.Thread(target=lambda: results.append(migrate_legacy_vault(
+            "test_password", os.path.abspath("wifi_data.enc"), os.path.abspath("master_key.hash"),
+            progress, batch_size=10)))
+        first.start()
+        self.assertTrue(started.wait(10))
+        
+        db = DatabaseManager()
+        second = threading.Thread(target=lambda: results.append(db.unlock_database("test_password")))
+        second.start()
+        second.join(0.3)
+        self.assertTrue(second.is_alive())
+        self.assertTrue(os.path.exists(CHECKPOINT_FILE))
+        
+        release.set()
+        first.join(10)
+        second.join(10)
+        self.assertEqual(len(results), 2)
+        self.assertIs(results[1], True)
+        self.assertEqual(self.unlocked_records(), records)
+        self.assertEqual(os.listdir("."), ["wifi_data.enc"])
+
+if __name__ == '__main__':
+    unittest.main()